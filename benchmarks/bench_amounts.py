@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Amount Representation Benchmark
+Compares float64 dollars with int64 cents on the two hot operations in the
+pipeline: the exact-match join (date + amount) and the per-category groupby.
+
+Usage:
+    python benchmarks/bench_amounts.py [rows] [repeats]
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'skill', 'scripts'))
+
+import numpy as np
+import pandas as pd
+from ledger_io import to_cents
+
+CATEGORIES = [
+    'Sales / Service', 'Subcontractors', 'Software & Tools', 'Payroll & Benefits',
+    'Marketing & Advertising', 'Travel & Meals', 'Office Expenses', 'Other OpEx',
+]
+
+
+def make_ledger(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a synthetic ledger with two-decimal amounts and an int64 cents column."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'category': pd.Categorical(rng.choice(CATEGORIES, rows)),
+        'amount': rng.normal(0, 500, rows).round(2),
+    })
+    df['amount_cents'] = to_cents(df['amount'])
+    return df
+
+
+def best_of(repeats: int, func) -> float:
+    """Fastest wall-clock time over several runs."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(rows: int, repeats: int):
+    statement = make_ledger(rows, seed=1)
+    books = statement.sample(frac=1.0, random_state=2).reset_index(drop=True)
+
+    def join(column):
+        return lambda: statement[['date', column]].merge(books[['date', column]], on=['date', column])
+
+    def groupby(column):
+        return lambda: statement.groupby('category', observed=True)[column].sum()
+
+    # Float sums drift with summation order; cents sums are exact
+    float_drift = abs(statement['amount'].sum() - books['amount'].sum())
+    cents_drift = abs(int(statement['amount_cents'].sum()) - int(books['amount_cents'].sum()))
+
+    print(f"Benchmarking {rows:,} rows (best of {repeats})")
+    print(f"{'Operation':<12} {'float64 s':>10} {'int64 s':>10} {'Speedup':>9}")
+    print("-" * 44)
+    for name, bench in (('join', join), ('groupby', groupby)):
+        float_time = best_of(repeats, bench('amount'))
+        cents_time = best_of(repeats, bench('amount_cents'))
+        print(f"{name:<12} {float_time:>10.4f} {cents_time:>10.4f} {float_time / cents_time:>8.2f}x")
+
+    print(f"\nTotal drift after reordering: float ${float_drift:.3g}, cents {cents_drift}")
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    run(rows, repeats)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Categorization Benchmark
+Measures how TransactionCategorizer.categorize_batch scales with worker count.
+
+Usage:
+    python benchmarks/bench_categorization.py [rows] [max_workers]
+"""
+
+import sys
+import os
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'skill', 'scripts'))
+
+import numpy as np
+import pandas as pd
+from categorize_transactions import TransactionCategorizer
+
+MERCHANTS = [
+    ('Stripe', 'Payout'), ('AWS', 'Cloud hosting'), ('Gusto', 'Payroll run'),
+    ('Upwork', 'Design contract'), ('Uber', 'Ride to client'), ('Staples', 'Printer paper'),
+    ('Google Ads', 'Campaign'), ('WeWork', 'Desk rent'), ('Corner Cafe', 'Team lunch'),
+]
+
+
+def make_transactions(rows: int, seed: int = 42) -> pd.DataFrame:
+    """Build a synthetic ledger with a long tail of distinct payees."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(MERCHANTS), rows)
+    # Roughly one row in five gets a unique payee so the rules still have work to do
+    suffix = np.where(rng.random(rows) < 0.2, rng.integers(0, rows, rows).astype(str), '')
+    return pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'),
+        'payee': [f"{MERCHANTS[p][0]} {s}".strip() for p, s in zip(picks, suffix)],
+        'description': [MERCHANTS[p][1] for p in picks],
+        'amount': rng.normal(0, 500, rows).round(2),
+    })
+
+
+def run(rows: int, max_workers: int):
+    df = make_transactions(rows)
+    categorizer = TransactionCategorizer()
+    for i in range(200):
+        categorizer.add_custom_rule(rf'vendor-{i}\b', f'Custom {i}')
+
+    worker_counts = [w for w in (1, 2, 4, 8, 16, 32) if w <= max_workers]
+    if max_workers not in worker_counts:
+        worker_counts.append(max_workers)
+
+    print(f"Categorizing {rows:,} rows ({os.cpu_count()} CPUs available)")
+    print(f"{'Workers':>8} {'Seconds':>10} {'Rows/s':>14} {'Speedup':>9}")
+    print("-" * 44)
+
+    baseline = None
+    expected = None
+    for workers in worker_counts:
+        # Warm-up call starts the pool so start-up cost isn't counted
+        categorizer.categorize_batch(df.head(workers * 5000).copy(), workers=workers)
+
+        start = time.perf_counter()
+        result = categorizer.categorize_batch(df.copy(), workers=workers)
+        elapsed = time.perf_counter() - start
+
+        if expected is None:
+            expected = result['category']
+        assert result['category'].equals(expected), "parallel output differs from serial"
+
+        baseline = baseline or elapsed
+        print(f"{workers:>8} {elapsed:>10.3f} {rows / elapsed:>14,.0f} {baseline / elapsed:>8.2f}x")
+
+    categorizer.close()
+
+
+if __name__ == "__main__":
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    run(rows, max_workers)
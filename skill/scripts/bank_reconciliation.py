@@ -4,31 +4,260 @@ Bank Reconciliation Script
 Matches bank statement transactions with accounting records.
 """
 
+import os
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import List, Dict, Tuple
-import hashlib
+from collections import deque
+from datetime import datetime
+from typing import List, Dict, Optional, Tuple
+from ledger_io import STATEMENT_COLUMNS, amount_cents, amount_to_cents, format_date, load_transactions
+from payee_similarity import PayeeSimilarity
+from duplicate_detection import DuplicateDetector, UnionFind
+from payout_matching import PayoutMatcher
+from reconciliation_result import ReconciliationResult
+
+try:
+    from scipy.optimize import linear_sum_assignment
+    HAS_SCIPY = True
+except ImportError:
+    HAS_SCIPY = False
+
+ASSIGNMENT_METHODS = ('greedy', 'hungarian')
+
+# Largest component (statement lines x book lines) solved with the Hungarian method
+MAX_HUNGARIAN_CELLS = 1_000_000
+
+def match_window_days(days_window: int = 3, payout_days: int = 7, slack_days: int = 1) -> int:
+    """
+    Days after which an open item can no longer be matched by newer lines:
+    the fuzzy window plus the longer of the fuzzy and payout windows, plus
+    slack for lines posted late.
+    """
+    return days_window + max(days_window, payout_days) + slack_days
+
+
+class ReconciliationState:
+    """
+    Open items and matched pairs carried between reconciliation runs.
+
+    Every statement and book line gets a stable id when it is first added.
+    Lines stay open until they are matched; open lines are also indexed by
+    their exact-match hash, so a new line finds its partner with a dict
+    lookup instead of a join against the whole history. The running book
+    balance is kept so the balance check never needs old rows.
+
+    Items with a pending fuzzy proposal are remembered, so a later run does
+    not propose them again; they leave that set when they are matched or
+    expire. Book items that expire still count as outstanding checks or
+    deposits in transit through running sums.
+    """
+
+    VERSION = 3
+    SIDES = ('statement', 'books')
+    COLUMNS = ['date', 'payee', 'amount', 'amount_cents', 'txn_hash']
+
+    def __init__(self, path: Optional[str] = None, keep_matches: bool = True):
+        """
+        Initialize the state, loading it from disk if the file exists.
+
+        Args:
+            path: Pickle file the state is loaded from and saved to (optional)
+            keep_matches: Keep matched pairs in `matches`; turn off when the
+                caller consumes them as they are made (streaming)
+        """
+        self.path = path
+        self.keep_matches = keep_matches
+        self.open = {side: self._empty_items() for side in self.SIDES}
+        self.matches = pd.DataFrame({
+            'statement_id': pd.Series(dtype='int64'),
+            'books_id': pd.Series(dtype='int64'),
+            'kind': pd.Series(dtype='object'),
+        })
+        self.next_id = {side: 0 for side in self.SIDES}
+        self.book_balance_cents = 0
+        self.proposed = {side: set() for side in self.SIDES}
+        self.expired_cents = {'outstanding_checks': 0, 'deposits_in_transit': 0}
+
+        if path and os.path.exists(path):
+            saved = pd.read_pickle(path)
+            if saved.get('version') == self.VERSION:
+                self.open = saved['open']
+                self.matches = saved['matches']
+                self.next_id = saved['next_id']
+                self.book_balance_cents = saved['book_balance_cents']
+                self.proposed = saved['proposed']
+                self.expired_cents = saved['expired_cents']
+
+        self._build_index()
+
+    def _empty_items(self) -> pd.DataFrame:
+        return pd.DataFrame({
+            'date': pd.Series(dtype='datetime64[ns]'),
+            'payee': pd.Series(dtype='object'),
+            'amount': pd.Series(dtype='float64'),
+            'amount_cents': pd.Series(dtype='int64'),
+            'txn_hash': pd.Series(dtype='uint64'),
+        }, index=pd.Index([], dtype='int64', name='item_id'))
+
+    def _build_index(self):
+        """Hash -> open ids (oldest first) for each side."""
+        self._index = {side: {} for side in self.SIDES}
+        self._open_ids = {side: set() for side in self.SIDES}
+        for side in self.SIDES:
+            for item_id, txn_hash in zip(self.open[side].index.tolist(), self.open[side]['txn_hash'].tolist()):
+                self.register(side, item_id, txn_hash)
+
+    def register(self, side: str, item_id: int, txn_hash: int):
+        """Make an open item findable by its exact-match hash."""
+        self._index[side].setdefault(txn_hash, deque()).append(item_id)
+        self._open_ids[side].add(item_id)
+
+    def add(self, side: str, df: pd.DataFrame, txn_hashes: pd.Series) -> pd.DataFrame:
+        """
+        Add new lines as open items (not yet indexed for matching).
+
+        Returns:
+            The new items, indexed by their ids
+        """
+        start = self.next_id[side]
+        items = pd.DataFrame({
+            'date': pd.to_datetime(df['date']).to_numpy(),
+            'payee': df['payee'].astype(object).to_numpy(),
+            'amount': df['amount'].to_numpy(dtype='float64'),
+            'amount_cents': amount_cents(df).to_numpy(),
+            'txn_hash': txn_hashes.to_numpy(),
+        }, index=pd.Index(np.arange(start, start + len(df), dtype='int64'), name='item_id'))
+        self.next_id[side] = start + len(df)
+        self.open[side] = pd.concat([self.open[side], items]) if len(self.open[side]) else items
+        if side == 'books':
+            self.book_balance_cents += int(items['amount_cents'].sum())
+        return items
+
+    def take(self, side: str, txn_hash: int) -> Optional[int]:
+        """Oldest open id on one side with this hash, removed from the index."""
+        ids = self._index[side].get(txn_hash)
+        while ids:
+            item_id = ids.popleft()
+            if item_id in self._open_ids[side]:
+                self._open_ids[side].discard(item_id)
+                return item_id
+        return None
+
+    def propose(self, statement_ids: List[int], books_ids: List[int]):
+        """Mark items as having a fuzzy proposal pending review."""
+        self.proposed['statement'].update(statement_ids)
+        self.proposed['books'].update(books_ids)
+
+    def close(self, side: str, ids: List[int]):
+        """Remove matched items from the open set and the hash index."""
+        if len(ids):
+            self._open_ids[side].difference_update(ids)
+            self.proposed[side].difference_update(ids)
+            index, open_ids = self._index[side], self._open_ids[side]
+            for txn_hash in set(self.open[side].loc[ids, 'txn_hash'].tolist()):
+                remaining = deque(item_id for item_id in index.get(txn_hash, ()) if item_id in open_ids)
+                if remaining:
+                    index[txn_hash] = remaining
+                else:
+                    index.pop(txn_hash, None)
+            self.open[side] = self.open[side].drop(ids)
+
+    def record(self, statement_ids: List[int], books_ids: List[int], kind: str):
+        """Store matched pairs and close both sides."""
+        if self.keep_matches:
+            self.matches = pd.concat([self.matches, pd.DataFrame({
+                'statement_id': np.asarray(statement_ids, dtype='int64'),
+                'books_id': np.asarray(books_ids, dtype='int64'),
+                'kind': kind,
+            })], ignore_index=True)
+        self.close('statement', sorted(set(statement_ids)))
+        self.close('books', list(books_ids))
+
+    def expire(self, before) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Drop open items dated before a cut-off (e.g. written off or carried
+        to another process) so the open set stays bounded.
+
+        Returns:
+            Tuple of (expired statement items, expired book items)
+        """
+        cutoff = pd.Timestamp(before)
+        expired = []
+        for side in self.SIDES:
+            old = self.open[side][self.open[side]['date'] < cutoff]
+            self.close(side, old.index.tolist())
+            expired.append(old)
+        cents = expired[1]['amount_cents']
+        self.expired_cents['outstanding_checks'] += int(cents[cents < 0].sum())
+        self.expired_cents['deposits_in_transit'] += int(cents[cents > 0].sum())
+        return expired[0], expired[1]
+
+    def save(self):
+        """Write the state to disk."""
+        if self.path:
+            pd.to_pickle({
+                'version': self.VERSION,
+                'open': self.open,
+                'matches': self.matches,
+                'next_id': self.next_id,
+                'book_balance_cents': self.book_balance_cents,
+                'proposed': self.proposed,
+                'expired_cents': self.expired_cents,
+            }, self.path)
+
 
 class BankReconciliation:
     """Performs bank reconciliation between statement and books."""
     
-    def __init__(self, tolerance: float = 0.01):
+    def __init__(self, tolerance: float = 0.01, assignment: str = 'greedy'):
         """
         Initialize reconciliation.
         
         Args:
             tolerance: Amount tolerance for matching (default $0.01)
+            assignment: How fuzzy candidates are paired one-to-one:
+                'greedy' (best score first) or 'hungarian' (needs scipy)
         """
+        if assignment not in ASSIGNMENT_METHODS:
+            raise ValueError(f"assignment must be one of {ASSIGNMENT_METHODS}, got {assignment!r}")
+        
         self.tolerance = tolerance
+        self.assignment = assignment
+        self.tolerance_cents = amount_to_cents(tolerance)
+        self.similarity = PayeeSimilarity()
         self.matches = []
         self.statement_only = []
         self.books_only = []
         self.duplicates = []
         
-    def _generate_txn_hash(self, date: str, amount: float, payee: str) -> str:
-        """Generate a hash for transaction matching."""
-        key = f"{date}_{amount:.2f}_{payee}".lower()
-        return hashlib.md5(key.encode()).hexdigest()
+    def _txn_hashes(self, df: pd.DataFrame) -> pd.Series:
+        """
+        Hash each transaction's (day, amount in cents, lowercased payee) key.
+        
+        The day is hashed as an integer and the cents as float64, so the key
+        does not depend on the datetime unit or integer type the frame was
+        loaded with (whole file, chunks, Parquet or pd.to_datetime).
+        """
+        keys = pd.DataFrame({
+            'day': pd.to_datetime(df['date']).to_numpy(dtype='datetime64[D]').astype('int64'),
+            'amount_cents': amount_cents(df).to_numpy(dtype='float64', na_value=np.nan),
+            'payee': df['payee'].astype(str).str.lower().to_numpy(dtype=object),
+        }, index=df.index)
+        return pd.util.hash_pandas_object(keys, index=False)
+    
+    def _match_keys(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Join keys for exact matching.
+        
+        Repeated transactions are numbered by occurrence, so the k-th copy on
+        one side can only pair with the k-th copy on the other.
+        """
+        hashes = self._txn_hashes(df).to_numpy()
+        return pd.DataFrame({
+            'txn_hash': hashes,
+            'occurrence': pd.Series(hashes).groupby(hashes).cumcount().to_numpy(),
+            'row': np.arange(len(df)),
+        })
     
     def find_exact_matches(self, statement_df: pd.DataFrame, books_df: pd.DataFrame) -> Tuple[List, pd.DataFrame, pd.DataFrame]:
         """
@@ -41,39 +270,125 @@ class BankReconciliation:
         Returns:
             Tuple of (matches, unmatched_statement, unmatched_books)
         """
-        # Add transaction hashes
-        statement_df['txn_hash'] = statement_df.apply(
-            lambda row: self._generate_txn_hash(row['date'], row['amount'], row['payee']),
-            axis=1
-        )
-        books_df['txn_hash'] = books_df.apply(
-            lambda row: self._generate_txn_hash(row['date'], row['amount'], row['payee']),
-            axis=1
-        )
-        
-        # Find matches
-        matched_hashes = set(statement_df['txn_hash']) & set(books_df['txn_hash'])
-        
-        matches = []
-        for txn_hash in matched_hashes:
-            stmt_row = statement_df[statement_df['txn_hash'] == txn_hash].iloc[0]
-            book_row = books_df[books_df['txn_hash'] == txn_hash].iloc[0]
-            
-            matches.append({
-                'date': stmt_row['date'],
-                'payee': stmt_row['payee'],
-                'amount': stmt_row['amount'],
-                'statement_id': stmt_row.get('id', ''),
-                'books_id': book_row.get('id', ''),
+        # One hash join on (key, occurrence); the inputs are not modified
+        pairs = self._match_keys(statement_df).merge(
+            self._match_keys(books_df),
+            on=['txn_hash', 'occurrence'],
+            suffixes=('_statement', '_books')
+        ).sort_values('row_statement')
+        stmt_rows = pairs['row_statement'].to_numpy()
+        book_rows = pairs['row_books'].to_numpy()
+        
+        matched = statement_df.iloc[stmt_rows]
+        no_ids = [''] * len(pairs)
+        statement_ids = matched['id'].tolist() if 'id' in statement_df.columns else no_ids
+        books_ids = books_df['id'].iloc[book_rows].tolist() if 'id' in books_df.columns else no_ids
+        
+        matches = [
+            {
+                'date': date,
+                'payee': payee,
+                'amount': amount,
+                'statement_id': statement_id,
+                'books_id': books_id,
                 'status': 'Matched'
-            })
+            }
+            for date, payee, amount, statement_id, books_id in zip(
+                matched['date'].tolist(), matched['payee'].tolist(), matched['amount'].tolist(),
+                statement_ids, books_ids
+            )
+        ]
         
         # Unmatched transactions
-        unmatched_statement = statement_df[~statement_df['txn_hash'].isin(matched_hashes)]
-        unmatched_books = books_df[~books_df['txn_hash'].isin(matched_hashes)]
+        stmt_matched = np.zeros(len(statement_df), dtype=bool)
+        stmt_matched[stmt_rows] = True
+        book_matched = np.zeros(len(books_df), dtype=bool)
+        book_matched[book_rows] = True
+        
+        unmatched_statement = statement_df[~stmt_matched]
+        unmatched_books = books_df[~book_matched]
         
         return matches, unmatched_statement, unmatched_books
     
+    def _fuzzy_candidates(
+        self,
+        statement_df: pd.DataFrame,
+        books_df: pd.DataFrame,
+        days_window: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate pairs within the amount tolerance and date window.
+        
+        Books are sorted once by (amount bucket, day), with buckets one
+        tolerance wide, so every partner of a statement line lies in its own
+        or a neighbouring bucket within +/- days_window. Each of those three
+        ranges is found with searchsorted, then the exact tolerance and
+        timestamp window are checked on the (small) candidate set.
+        
+        Returns:
+            Tuple of (statement positions, books positions), in statement
+            order and then books order
+        """
+        stmt_dates = pd.to_datetime(statement_df['date']).to_numpy(dtype='datetime64[ns]')
+        book_dates = pd.to_datetime(books_df['date']).to_numpy(dtype='datetime64[ns]')
+        stmt_cents = amount_cents(statement_df).to_numpy(dtype='float64', na_value=np.nan)
+        book_cents = amount_cents(books_df).to_numpy(dtype='float64', na_value=np.nan)
+        
+        # Rows without a date or amount can't match anything
+        stmt_ok = ~(np.isnat(stmt_dates) | np.isnan(stmt_cents))
+        book_ok = ~(np.isnat(book_dates) | np.isnan(book_cents))
+        empty = np.array([], dtype=np.int64)
+        if not stmt_ok.any() or not book_ok.any():
+            return empty, empty
+        
+        stmt_days = stmt_dates.astype('datetime64[D]').astype(np.int64)
+        book_days = book_dates.astype('datetime64[D]').astype(np.int64)
+        width = self.tolerance_cents + 1
+        stmt_bucket = np.floor_divide(np.where(stmt_ok, stmt_cents, 0), width).astype(np.int64)
+        book_bucket = np.floor_divide(np.where(book_ok, book_cents, 0), width).astype(np.int64)
+        
+        # Composite (bucket, day) key; the day span leaves room for the window
+        first_day = min(stmt_days[stmt_ok].min(), book_days[book_ok].min()) - days_window - 1
+        span = max(stmt_days[stmt_ok].max(), book_days[book_ok].max()) + days_window + 2 - first_day
+        book_positions = np.flatnonzero(book_ok)
+        book_keys = book_bucket[book_positions] * span + (book_days[book_positions] - first_day)
+        order = np.argsort(book_keys, kind='stable')
+        book_keys, book_positions = book_keys[order], book_positions[order]
+        
+        stmt_positions = np.flatnonzero(stmt_ok)
+        day_offset = stmt_days[stmt_positions] - first_day
+        pair_stmt, pair_book = [], []
+        for neighbour in (-1, 0, 1):
+            base = (stmt_bucket[stmt_positions] + neighbour) * span
+            lo = np.searchsorted(book_keys, base + day_offset - days_window - 1, side='left')
+            hi = np.searchsorted(book_keys, base + day_offset + days_window + 1, side='right')
+            counts = hi - lo
+            
+            # Expand each [lo, hi) range into explicit pairs
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+            pair_stmt.append(np.repeat(stmt_positions, counts))
+            pair_book.append(book_positions[starts + np.arange(total)])
+        
+        if not pair_stmt:
+            return empty, empty
+        pair_stmt = np.concatenate(pair_stmt)
+        pair_book = np.concatenate(pair_book)
+        
+        # Exact checks: amount tolerance in cents and the timestamp window
+        window = np.timedelta64(days_window, 'D')
+        keep = (
+            (np.abs(book_cents[pair_book] - stmt_cents[pair_stmt]) <= self.tolerance_cents) &
+            (book_dates[pair_book] >= stmt_dates[pair_stmt] - window) &
+            (book_dates[pair_book] <= stmt_dates[pair_stmt] + window)
+        )
+        pair_stmt, pair_book = pair_stmt[keep], pair_book[keep]
+        
+        order = np.lexsort((pair_book, pair_stmt))
+        return pair_stmt[order], pair_book[order]
+    
     def find_fuzzy_matches(self, statement_df: pd.DataFrame, books_df: pd.DataFrame, days_window: int = 3) -> List[Dict]:
         """
         Find fuzzy matches (same amount, nearby dates, similar payee).
@@ -84,90 +399,346 @@ class BankReconciliation:
             days_window: Days to look forward/backward for date matching
             
         Returns:
-            List of potential matches for review
+            List of potential matches for review. 'statement_index' and
+            'books_index' hold the index labels of the two rows.
         """
         potential_matches = []
         
-        for _, stmt_row in statement_df.iterrows():
-            stmt_date = pd.to_datetime(stmt_row['date'])
-            stmt_amount = float(stmt_row['amount'])
+        # Payee similarity is only scored for pairs that pass amount and date
+        stmt_rows, book_rows = self._fuzzy_candidates(statement_df, books_df, days_window)
+        if len(stmt_rows) == 0:
+            return potential_matches
+        
+        stmt = statement_df.iloc[stmt_rows]
+        books = books_df.iloc[book_rows]
+        scores = self.similarity.score_pairs(stmt['payee'].to_numpy(), books['payee'].to_numpy())
+        
+        for stmt_index, stmt_date, stmt_payee, stmt_amount, book_index, book_date, book_payee, book_amount, similarity_score in zip(
+            stmt.index, stmt['date'].tolist(), stmt['payee'].tolist(), stmt['amount'].tolist(),
+            books.index, books['date'].tolist(), books['payee'].tolist(), books['amount'].tolist(),
+            scores.tolist()
+        ):
+            if similarity_score > 0.6:  # 60% similar
+                potential_matches.append({
+                    'statement_index': stmt_index,
+                    'statement_date': stmt_date,
+                    'statement_payee': stmt_payee,
+                    'statement_amount': float(stmt_amount),
+                    'books_index': book_index,
+                    'books_date': book_date,
+                    'books_payee': book_payee,
+                    'books_amount': float(book_amount),
+                    'similarity': similarity_score,
+                    'status': 'Potential Match - Review Needed'
+                })
+        
+        return potential_matches
+    
+    def assign_matches(self, potential_matches: List[Dict], method: str = None) -> List[Dict]:
+        """
+        Keep at most one proposal per statement line and per book line.
+        
+        Candidates form a sparse bipartite graph (statement lines vs. book
+        lines). Each connected component is solved on its own, preferring
+        higher similarity and then fewer days apart, so the work stays
+        proportional to the candidates rather than to the ledger size.
+        
+        Args:
+            potential_matches: Output of find_fuzzy_matches
+            method: 'greedy' or 'hungarian' (default: self.assignment).
+                Hungarian needs scipy and falls back to greedy without it or
+                for components above MAX_HUNGARIAN_CELLS.
             
-            # Find transactions with same amount within date window
-            date_min = stmt_date - timedelta(days=days_window)
-            date_max = stmt_date + timedelta(days=days_window)
+        Returns:
+            The chosen proposals, in their original order
+        """
+        method = method or self.assignment
+        if method not in ASSIGNMENT_METHODS:
+            raise ValueError(f"method must be one of {ASSIGNMENT_METHODS}, got {method!r}")
+        if not potential_matches:
+            return []
+        
+        stmt_nodes, stmt_labels = pd.factorize(pd.Series([m['statement_index'] for m in potential_matches]))
+        book_nodes, _ = pd.factorize(pd.Series([m['books_index'] for m in potential_matches]))
+        scores = np.array([m['similarity'] for m in potential_matches], dtype='float64')
+        days_apart = (
+            pd.to_datetime(pd.Series([m['books_date'] for m in potential_matches])) -
+            pd.to_datetime(pd.Series([m['statement_date'] for m in potential_matches]))
+        ).abs().dt.days.to_numpy()
+        
+        # Connected components of the candidate graph
+        n_stmt = len(stmt_labels)
+        union_find = UnionFind(n_stmt + int(book_nodes.max()) + 1)
+        for stmt_node, book_node in zip(stmt_nodes.tolist(), book_nodes.tolist()):
+            union_find.union(stmt_node, n_stmt + book_node)
+        components: Dict[int, List[int]] = {}
+        for edge, stmt_node in enumerate(stmt_nodes.tolist()):
+            components.setdefault(union_find.find(stmt_node), []).append(edge)
+        
+        chosen = []
+        for edges in components.values():
+            edges = np.array(edges)
+            if len(edges) == 1:
+                chosen.append(edges)
+            elif method == 'hungarian' and HAS_SCIPY and self._component_cells(edges, stmt_nodes, book_nodes) <= MAX_HUNGARIAN_CELLS:
+                chosen.append(self._assign_hungarian(edges, stmt_nodes, book_nodes, scores, days_apart))
+            else:
+                chosen.append(self._assign_greedy(edges, stmt_nodes, book_nodes, scores, days_apart))
+        
+        return [potential_matches[i] for i in np.sort(np.concatenate(chosen))]
+    
+    @staticmethod
+    def _component_cells(edges: np.ndarray, stmt_nodes: np.ndarray, book_nodes: np.ndarray) -> int:
+        return len(np.unique(stmt_nodes[edges])) * len(np.unique(book_nodes[edges]))
+    
+    @staticmethod
+    def _assign_greedy(
+        edges: np.ndarray,
+        stmt_nodes: np.ndarray,
+        book_nodes: np.ndarray,
+        scores: np.ndarray,
+        days_apart: np.ndarray
+    ) -> np.ndarray:
+        """Take edges best-first (score, then days apart, then input order) while both ends are free."""
+        order = edges[np.lexsort((edges, days_apart[edges], -scores[edges]))]
+        used_stmt, used_books, picked = set(), set(), []
+        for edge in order.tolist():
+            stmt_node, book_node = stmt_nodes[edge], book_nodes[edge]
+            if stmt_node not in used_stmt and book_node not in used_books:
+                used_stmt.add(stmt_node)
+                used_books.add(book_node)
+                picked.append(edge)
+        return np.array(picked, dtype=np.int64)
+    
+    @staticmethod
+    def _assign_hungarian(
+        edges: np.ndarray,
+        stmt_nodes: np.ndarray,
+        book_nodes: np.ndarray,
+        scores: np.ndarray,
+        days_apart: np.ndarray
+    ) -> np.ndarray:
+        """Maximum-total-score assignment for one component (ties broken by days apart)."""
+        rows, row_of = np.unique(stmt_nodes[edges], return_inverse=True)
+        cols, col_of = np.unique(book_nodes[edges], return_inverse=True)
+        
+        # Non-edges get a cost no real edge can reach; they're dropped afterwards
+        no_edge = 1.0 + len(edges)
+        cost = np.full((len(rows), len(cols)), no_edge)
+        edge_at = np.full((len(rows), len(cols)), -1, dtype=np.int64)
+        weight = -scores[edges] + days_apart[edges] * 1e-6
+        for r, c, w, edge in zip(row_of.tolist(), col_of.tolist(), weight.tolist(), edges.tolist()):
+            if edge_at[r, c] == -1 or w < cost[r, c]:
+                cost[r, c] = w
+                edge_at[r, c] = edge
+        
+        assigned_rows, assigned_cols = linear_sum_assignment(cost)
+        picked = edge_at[assigned_rows, assigned_cols]
+        return picked[picked >= 0]
+    
+    def find_payout_matches(
+        self,
+        statement_df: pd.DataFrame,
+        books_df: pd.DataFrame,
+        days_window: int = 7,
+        time_budget: float = 1.0,
+        total_budget: Optional[float] = 10.0
+    ) -> List[Dict]:
+        """
+        Find deposits that settle several book entries at once (processor payouts).
+        
+        Args:
+            statement_df: Unmatched statement transactions
+            books_df: Unmatched books transactions
+            days_window: Book entries up to this many days before a deposit can be in it
+            time_budget: Seconds of subset-sum search per deposit
+            total_budget: Seconds of search for all deposits together (None: no cap)
             
-            candidates = books_df[
-                (pd.to_datetime(books_df['date']) >= date_min) &
-                (pd.to_datetime(books_df['date']) <= date_max) &
-                (abs(books_df['amount'] - stmt_amount) <= self.tolerance)
-            ]
+        Returns:
+            List of many-to-one matches (see PayoutMatcher.find_matches)
+        """
+        matcher = PayoutMatcher(
+            days_window=days_window, time_budget=time_budget, total_budget=total_budget, similarity=self.similarity
+        )
+        return matcher.find_matches(statement_df, books_df)
+    
+    def reconcile_incremental(
+        self,
+        statement_df: pd.DataFrame,
+        books_df: pd.DataFrame,
+        state: ReconciliationState,
+        days_window: int = 3,
+        expire_days: Optional[int] = None
+    ) -> Dict:
+        """
+        Reconcile new statement and book lines against the open items only.
+        
+        New lines are matched exactly through the state's hash index, fuzzy
+        proposals are made between new lines and open lines on the other
+        side, and new deposits without a proposal are tried as batched
+        payouts (the same order as the full report). Exact and payout
+        matches close the items in the state; fuzzy proposals are only
+        returned for review, once: items with a pending proposal are left
+        out of later runs' fuzzy and payout searches.
+        
+        Args:
+            statement_df: New statement lines since the last run
+            books_df: New book lines since the last run
+            state: ReconciliationState to update (call state.save() after)
+            days_window: Days to look forward/backward for fuzzy matching
+            expire_days: Expire open items dated this many days before the
+                newest new line (see match_window_days); None keeps them all
             
-            for _, book_row in candidates.iterrows():
-                similarity_score = self._calculate_similarity(
-                    stmt_row['payee'], 
-                    book_row['payee']
-                )
-                
-                if similarity_score > 0.6:  # 60% similar
-                    potential_matches.append({
-                        'statement_date': stmt_row['date'],
-                        'statement_payee': stmt_row['payee'],
-                        'statement_amount': stmt_amount,
-                        'books_date': book_row['date'],
-                        'books_payee': book_row['payee'],
-                        'books_amount': float(book_row['amount']),
-                        'similarity': similarity_score,
-                        'status': 'Potential Match - Review Needed'
-                    })
+        Returns:
+            Dict with the run's 'exact_matches' (statement id, books id) pairs,
+            'payout_matches', 'fuzzy_matches', 'expired_statement' /
+            'expired_books' frames, and the open item counts
+        """
+        # New statement lines against open book lines
+        new_stmt = state.add('statement', statement_df, self._txn_hashes(statement_df))
+        exact_stmt, exact_books = [], []
+        for item_id, txn_hash in zip(new_stmt.index.tolist(), new_stmt['txn_hash'].tolist()):
+            partner = state.take('books', txn_hash)
+            if partner is None:
+                state.register('statement', item_id, txn_hash)
+            else:
+                exact_stmt.append(item_id)
+                exact_books.append(partner)
+        
+        # New book lines against open statement lines (old and new)
+        new_books = state.add('books', books_df, self._txn_hashes(books_df))
+        for item_id, txn_hash in zip(new_books.index.tolist(), new_books['txn_hash'].tolist()):
+            partner = state.take('statement', txn_hash)
+            if partner is None:
+                state.register('books', item_id, txn_hash)
+            else:
+                exact_stmt.append(partner)
+                exact_books.append(item_id)
+        state.record(exact_stmt, exact_books, 'exact')
+        
+        # Fuzzy proposals: new lines on either side against open lines on the
+        # other, skipping items already proposed in an earlier run
+        open_stmt = state.open['statement']
+        open_stmt = open_stmt[~open_stmt.index.isin(list(state.proposed['statement']))]
+        open_books = state.open['books']
+        open_books = open_books[~open_books.index.isin(list(state.proposed['books']))]
+        is_new_stmt = open_stmt.index.isin(new_stmt.index)
+        is_new_books = open_books.index.isin(new_books.index)
+        fuzzy_matches = self.assign_matches(
+            self.find_fuzzy_matches(open_stmt[is_new_stmt], open_books, days_window) +
+            self.find_fuzzy_matches(open_stmt[~is_new_stmt], open_books[is_new_books], days_window)
+        )
         
-        return potential_matches
+        # New deposits without a proposal that settle several open book lines
+        proposed_stmt = [m['statement_index'] for m in fuzzy_matches]
+        proposed_books = [m['books_index'] for m in fuzzy_matches]
+        state.propose(proposed_stmt, proposed_books)
+        payout_matches = self.find_payout_matches(
+            open_stmt[is_new_stmt & ~open_stmt.index.isin(proposed_stmt)],
+            open_books[~open_books.index.isin(proposed_books)]
+        )
+        for match in payout_matches:
+            state.record([match['statement_index']] * match['books_count'], match['books_index'], 'payout')
+        
+        # Items no later line can match any more
+        newest = pd.concat([new_stmt['date'], new_books['date']]).max()
+        if expire_days is None or pd.isna(newest):
+            expired_stmt, expired_books = state.open['statement'].iloc[:0], state.open['books'].iloc[:0]
+        else:
+            expired_stmt, expired_books = state.expire(newest - pd.Timedelta(days=expire_days))
+        
+        return {
+            'new_statement': len(new_stmt),
+            'new_books': len(new_books),
+            'exact_matches': list(zip(exact_stmt, exact_books)),
+            'payout_matches': payout_matches,
+            'fuzzy_matches': fuzzy_matches,
+            'expired_statement': expired_stmt,
+            'expired_books': expired_books,
+            'open_statement': len(state.open['statement']),
+            'open_books': len(state.open['books']),
+        }
     
     def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """Calculate string similarity (simple implementation)."""
-        text1 = text1.lower()
-        text2 = text2.lower()
-        
-        # Exact match
-        if text1 == text2:
-            return 1.0
+        """Calculate string similarity (see PayeeSimilarity.score)."""
+        return self.similarity.score(text1, text2)
+    
+    def detect_duplicates(self, df: pd.DataFrame, days_window: int = 1) -> List[Dict]:
+        """
+        Detect potential duplicate transactions.
         
-        # Contains match
-        if text1 in text2 or text2 in text1:
-            return 0.8
+        Args:
+            df: Transactions to check
+            days_window: Max days between two postings of the same charge
+            
+        Returns:
+            One dict per cluster of duplicates (see DuplicateDetector.find_clusters)
+        """
+        detector = DuplicateDetector(days_window=days_window, similarity=self.similarity)
+        return detector.find_clusters(df)
+    
+    def reconcile(
+        self,
+        statement_df: pd.DataFrame,
+        books_df: pd.DataFrame,
+        statement_ending_balance: float
+    ) -> ReconciliationResult:
+        """
+        Run the full reconciliation and compute the balance check.
         
-        # Word overlap
-        words1 = set(text1.split())
-        words2 = set(text2.split())
+        Args:
+            statement_df: Bank statement transactions
+            books_df: Books transactions
+            statement_ending_balance: Ending balance from the bank statement
+            
+        Returns:
+            ReconciliationResult with the matches, unmatched frames,
+            duplicates and the balance components in cents; render it with
+            to_text(), to_json(), to_csv() or to_excel()
+        """
+        # Perform reconciliation
+        exact_matches, unmatched_stmt, unmatched_books = self.find_exact_matches(statement_df, books_df)
         
-        if not words1 or not words2:
-            return 0.0
+        # One proposal per statement line and per book line
+        fuzzy_matches = self.assign_matches(self.find_fuzzy_matches(unmatched_stmt, unmatched_books))
         
-        overlap = len(words1 & words2)
-        return overlap / max(len(words1), len(words2))
-    
-    def detect_duplicates(self, df: pd.DataFrame) -> List[Dict]:
-        """Detect potential duplicate transactions."""
-        duplicates = []
-        
-        # Group by date and amount
-        grouped = df.groupby(['date', 'amount'])
-        
-        for (date, amount), group in grouped:
-            if len(group) > 1:
-                # Check if payees are similar
-                payees = group['payee'].tolist()
-                for i in range(len(payees)):
-                    for j in range(i + 1, len(payees)):
-                        if self._calculate_similarity(payees[i], payees[j]) > 0.7:
-                            duplicates.append({
-                                'date': date,
-                                'amount': amount,
-                                'payee_1': payees[i],
-                                'payee_2': payees[j],
-                                'flag': 'Potential Duplicate'
-                            })
-        
-        return duplicates
+        # Deposits settling several book entries, among lines without a proposal
+        proposed_stmt = {m['statement_index'] for m in fuzzy_matches}
+        proposed_books = {m['books_index'] for m in fuzzy_matches}
+        payout_matches = self.find_payout_matches(
+            unmatched_stmt[~unmatched_stmt.index.isin(proposed_stmt)],
+            unmatched_books[~unmatched_books.index.isin(proposed_books)]
+        )
+        if payout_matches:
+            unmatched_stmt = unmatched_stmt.drop([m['statement_index'] for m in payout_matches])
+            unmatched_books = unmatched_books.drop([i for m in payout_matches for i in m['books_index']])
+        
+        # Balances are summed in integer cents so the variance check is exact
+        unmatched_cents = amount_cents(unmatched_books)
+        outstanding_checks = int(unmatched_cents[unmatched_cents < 0].sum())
+        deposits_in_transit = int(unmatched_cents[unmatched_cents > 0].sum())
+        adjusted_balance = amount_to_cents(statement_ending_balance) + outstanding_checks + deposits_in_transit
+        book_balance = int(amount_cents(books_df).sum())
+        
+        return ReconciliationResult(
+            period_start=statement_df['date'].min(),
+            period_end=statement_df['date'].max(),
+            statement_count=len(statement_df),
+            books_count=len(books_df),
+            exact_matches=exact_matches,
+            fuzzy_matches=fuzzy_matches,
+            payout_matches=payout_matches,
+            unmatched_statement=unmatched_stmt,
+            unmatched_books=unmatched_books,
+            statement_duplicates=self.detect_duplicates(statement_df),
+            books_duplicates=self.detect_duplicates(books_df),
+            statement_ending_balance=statement_ending_balance,
+            outstanding_checks_cents=outstanding_checks,
+            deposits_in_transit_cents=deposits_in_transit,
+            adjusted_balance_cents=adjusted_balance,
+            book_balance_cents=book_balance,
+            variance_cents=adjusted_balance - book_balance,
+        )
     
     def generate_reconciliation_report(
         self, 
@@ -175,112 +746,60 @@ class BankReconciliation:
         books_df: pd.DataFrame,
         statement_ending_balance: float
     ) -> str:
-        """Generate a comprehensive reconciliation report."""
-        
-        # Perform reconciliation
-        exact_matches, unmatched_stmt, unmatched_books = self.find_exact_matches(
-            statement_df.copy(), 
-            books_df.copy()
-        )
-        
-        fuzzy_matches = self.find_fuzzy_matches(unmatched_stmt, unmatched_books)
-        
-        # Detect duplicates
-        stmt_duplicates = self.detect_duplicates(statement_df)
-        book_duplicates = self.detect_duplicates(books_df)
-        
-        # Build report
-        report = []
-        report.append("=" * 60)
-        report.append("BANK RECONCILIATION REPORT")
-        report.append("=" * 60)
-        report.append(f"Statement Period: {statement_df['date'].min()} to {statement_df['date'].max()}")
-        report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append("")
-        
-        # Summary
-        report.append("SUMMARY")
-        report.append("-" * 60)
-        report.append(f"Statement Transactions: {len(statement_df):>10}")
-        report.append(f"Books Transactions:     {len(books_df):>10}")
-        report.append(f"Exact Matches:          {len(exact_matches):>10}")
-        report.append(f"Potential Matches:      {len(fuzzy_matches):>10}")
-        report.append(f"Statement Only:         {len(unmatched_stmt):>10}")
-        report.append(f"Books Only:             {len(unmatched_books):>10}")
-        report.append("")
-        
-        # Balance reconciliation
-        report.append("BALANCE RECONCILIATION")
-        report.append("-" * 60)
-        report.append(f"Statement Ending Balance:     ${statement_ending_balance:>12,.2f}")
-        
-        # Outstanding checks (in books but not statement)
-        outstanding_checks = unmatched_books[unmatched_books['amount'] < 0]['amount'].sum()
-        report.append(f"Less: Outstanding Checks:     ${outstanding_checks:>12,.2f}")
-        
-        # Deposits in transit (in books but not statement)  
-        deposits_in_transit = unmatched_books[unmatched_books['amount'] > 0]['amount'].sum()
-        report.append(f"Plus: Deposits in Transit:    ${deposits_in_transit:>12,.2f}")
-        
-        adjusted_balance = statement_ending_balance + outstanding_checks + deposits_in_transit
-        report.append(f"Adjusted Balance:             ${adjusted_balance:>12,.2f}")
-        report.append("")
-        
-        book_balance = books_df['amount'].sum()
-        report.append(f"Book Balance:                 ${book_balance:>12,.2f}")
-        
-        variance = adjusted_balance - book_balance
-        report.append(f"Variance:                     ${variance:>12,.2f}")
-        
-        if abs(variance) < 0.01:
-            report.append("\n✅ Books are RECONCILED")
-        else:
-            report.append("\n⚠️  VARIANCE DETECTED - Investigation Needed")
-        
-        report.append("")
-        
-        # Items needing attention
-        if len(unmatched_stmt) > 0:
-            report.append("⚠️  TRANSACTIONS ON STATEMENT BUT NOT IN BOOKS")
-            report.append("-" * 60)
-            for _, row in unmatched_stmt.head(10).iterrows():
-                report.append(f"  {row['date']} | {row['payee']:30} | ${row['amount']:>10,.2f}")
-            if len(unmatched_stmt) > 10:
-                report.append(f"  ... and {len(unmatched_stmt) - 10} more")
-            report.append("")
-        
-        if len(unmatched_books) > 0:
-            report.append("⚠️  TRANSACTIONS IN BOOKS BUT NOT ON STATEMENT")
-            report.append("-" * 60)
-            for _, row in unmatched_books.head(10).iterrows():
-                report.append(f"  {row['date']} | {row['payee']:30} | ${row['amount']:>10,.2f}")
-            if len(unmatched_books) > 10:
-                report.append(f"  ... and {len(unmatched_books) - 10} more")
-            report.append("")
-        
-        if len(fuzzy_matches) > 0:
-            report.append("🔍 POTENTIAL MATCHES FOR REVIEW")
-            report.append("-" * 60)
-            for match in fuzzy_matches[:10]:
-                report.append(f"  Statement: {match['statement_date']} | {match['statement_payee']}")
-                report.append(f"  Books:     {match['books_date']} | {match['books_payee']}")
-                report.append(f"  Amount: ${match['statement_amount']:.2f} | Similarity: {match['similarity']:.1%}")
-                report.append("")
-            if len(fuzzy_matches) > 10:
-                report.append(f"  ... and {len(fuzzy_matches) - 10} more")
-        
-        if stmt_duplicates or book_duplicates:
-            report.append("⚠️  POTENTIAL DUPLICATES DETECTED")
-            report.append("-" * 60)
-            for dup in (stmt_duplicates + book_duplicates)[:5]:
-                report.append(f"  {dup['date']} | ${dup['amount']:.2f}")
-                report.append(f"    {dup['payee_1']} vs {dup['payee_2']}")
-            report.append("")
-        
-        return "\n".join(report)
-
-
-def reconcile_from_csv(statement_file: str, books_file: str, ending_balance: float):
+        """Generate a comprehensive reconciliation report (see ReconciliationResult.to_text)."""
+        return self.reconcile(statement_df, books_df, statement_ending_balance).to_text()
+
+
+def generate_incremental_report(result: Dict, state: ReconciliationState, statement_ending_balance: float) -> str:
+    """Summary of one reconcile_incremental run plus the balance check on the open and expired items."""
+    open_books = state.open['books']['amount_cents']
+    outstanding_checks = int(open_books[open_books < 0].sum()) + state.expired_cents['outstanding_checks']
+    deposits_in_transit = int(open_books[open_books > 0].sum()) + state.expired_cents['deposits_in_transit']
+    adjusted_balance = amount_to_cents(statement_ending_balance) + outstanding_checks + deposits_in_transit
+    variance = adjusted_balance - state.book_balance_cents
+    
+    report = []
+    report.append("=" * 60)
+    report.append("INCREMENTAL RECONCILIATION")
+    report.append("=" * 60)
+    report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    report.append("")
+    report.append(f"New Statement Lines:    {result['new_statement']:>10}")
+    report.append(f"New Books Lines:        {result['new_books']:>10}")
+    report.append(f"Exact Matches:          {len(result['exact_matches']):>10}")
+    report.append(f"Batched Payouts:        {len(result['payout_matches']):>10}")
+    report.append(f"Potential Matches:      {len(result['fuzzy_matches']):>10}")
+    report.append(f"Open Statement Items:   {result['open_statement']:>10}")
+    report.append(f"Open Books Items:       {result['open_books']:>10}")
+    report.append(f"Expired Statement:      {len(result['expired_statement']):>10}")
+    report.append(f"Expired Books:          {len(result['expired_books']):>10}")
+    report.append("")
+    report.append(f"Statement Ending Balance:     ${statement_ending_balance:>12,.2f}")
+    report.append(f"Less: Outstanding Checks:     ${outstanding_checks / 100:>12,.2f}")
+    report.append(f"Plus: Deposits in Transit:    ${deposits_in_transit / 100:>12,.2f}")
+    report.append(f"Adjusted Balance:             ${adjusted_balance / 100:>12,.2f}")
+    report.append(f"Book Balance:                 ${state.book_balance_cents / 100:>12,.2f}")
+    report.append(f"Variance:                     ${variance / 100:>12,.2f}")
+    report.append("")
+    
+    for match in result['fuzzy_matches'][:10]:
+        report.append(f"  🔍 {format_date(match['statement_date'])} | {match['statement_payee']} ~ {match['books_payee']} "
+                      f"| ${match['statement_amount']:.2f} | {match['similarity']:.1%}")
+    
+    for side, label in (('statement', 'Statement'), ('books', 'Books')):
+        for _, row in result[f'expired_{side}'].head(10).iterrows():
+            report.append(f"  ⌛ {label} {format_date(row['date'])} | {row['payee']} | ${row['amount']:.2f}")
+    
+    return "\n".join(report)
+
+
+def reconcile_from_csv(
+    statement_file: str,
+    books_file: str,
+    ending_balance: float,
+    state_file: Optional[str] = None,
+    output_files: Optional[List[str]] = None
+):
     """
     Reconcile bank statement and books from CSV files.
     
@@ -288,20 +807,36 @@ def reconcile_from_csv(statement_file: str, books_file: str, ending_balance: flo
         statement_file: Path to bank statement CSV
         books_file: Path to accounting books CSV  
         ending_balance: Ending balance from bank statement
+        state_file: Reconcile incrementally: the CSVs hold only new lines,
+            matched against the open items saved here by earlier runs
+        output_files: Also render the result to these files, by extension
+            (.txt, .json, .csv for open items, .xlsx); full runs only
     """
-    # Read files
-    statement_df = pd.read_csv(statement_file)
-    books_df = pd.read_csv(books_file)
+    # Read files (validated, dates parsed once, payees dictionary-encoded, amounts in cents)
+    statement_df = load_transactions(statement_file, STATEMENT_COLUMNS, report_memory=True, cents=True)
+    books_df = load_transactions(books_file, STATEMENT_COLUMNS, report_memory=True, cents=True)
     
     # Perform reconciliation
     reconciler = BankReconciliation()
-    report = reconciler.generate_reconciliation_report(
+    if state_file:
+        state = ReconciliationState(state_file)
+        result = reconciler.reconcile_incremental(statement_df, books_df, state, expire_days=match_window_days())
+        state.save()
+        print(generate_incremental_report(result, state, ending_balance))
+        return reconciler
+    
+    result = reconciler.reconcile(
         statement_df, 
         books_df, 
         ending_balance
     )
     
-    print(report)
+    print(result.to_text())
+    
+    # Every format renders from the same result; nothing is recomputed
+    for output_file in output_files or []:
+        result.save(output_file)
+        print(f"✅ Saved: {output_file}")
     
     return reconciler
 
@@ -310,12 +845,17 @@ if __name__ == "__main__":
     import sys
     
     if len(sys.argv) < 4:
-        print("Usage: python bank_reconciliation.py <statement.csv> <books.csv> <ending_balance>")
+        print("Usage: python bank_reconciliation.py <statement.csv> <books.csv> <ending_balance> [state.pkl] [output ...]")
         print("\nBoth CSVs must have columns: date, payee, amount")
+        print("With a state file (.pkl), the CSVs hold only new lines since the last run")
+        print("Outputs are rendered by extension: .txt, .json, .csv (open items), .xlsx")
         sys.exit(1)
     
     statement_file = sys.argv[1]
     books_file = sys.argv[2]
     ending_balance = float(sys.argv[3])
+    extra = sys.argv[4:]
+    state_file = next((arg for arg in extra if arg.endswith('.pkl')), None)
+    output_files = [arg for arg in extra if not arg.endswith('.pkl')]
     
-    reconcile_from_csv(statement_file, books_file, ending_balance)
+    reconcile_from_csv(statement_file, books_file, ending_balance, state_file, output_files)
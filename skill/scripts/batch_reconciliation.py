@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Batch Reconciliation
+Reconciles many accounts in one run, in a pool of worker processes.
+
+A manifest lists one job per account (statement file, books file, ending
+balance). Each worker imports pandas and builds its BankReconciliation once,
+then takes jobs until the manifest is done. A job that fails is reported
+with its error; the other accounts are unaffected, even when a job kills
+its worker process.
+"""
+
+import os
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import EXTRA_QUEUED_CALLS, BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+from ledger_io import STATEMENT_COLUMNS, load_transactions
+from bank_reconciliation import BankReconciliation
+
+# Required manifest columns ('account' is optional)
+MANIFEST_COLUMNS = ['statement', 'books', 'ending_balance']
+
+
+def load_manifest(path: str) -> List[Dict]:
+    """
+    Read a batch manifest CSV.
+
+    Args:
+        path: CSV with columns statement, books, ending_balance and optionally
+            account; relative file paths are resolved against the manifest's
+            directory
+
+    Returns:
+        One job dict per row
+    """
+    manifest = pd.read_csv(path, dtype={'statement': str, 'books': str, 'account': str})
+    missing = [col for col in MANIFEST_COLUMNS if col not in manifest.columns]
+    if missing:
+        raise ValueError(f"Manifest must contain columns: {MANIFEST_COLUMNS} (missing: {missing})")
+
+    base = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for position, row in enumerate(manifest.to_dict('records')):
+        statement = os.path.join(base, row['statement'])
+        account = row.get('account')
+        jobs.append({
+            'account': account if isinstance(account, str) and account else os.path.splitext(os.path.basename(statement))[0],
+            'statement': statement,
+            'books': os.path.join(base, row['books']),
+            'ending_balance': float(row['ending_balance']),
+            'position': position,
+        })
+    return jobs
+
+
+def run_job(job: Dict, reconciler: Optional[BankReconciliation] = None) -> Dict:
+    """
+    Reconcile one account and summarize the result.
+
+    Exceptions are caught and returned as a failed result, so one bad file
+    does not stop the batch.
+
+    Args:
+        job: Job dict from load_manifest
+        reconciler: BankReconciliation to use (a new one if None)
+
+    Returns:
+        Result dict with 'status' ('ok' or 'failed'), timings in seconds,
+        match counts and the balance components in cents
+    """
+    result = {
+        'account': job['account'],
+        'position': job.get('position', 0),
+        'status': 'ok',
+        'error': None,
+        'pid': os.getpid(),
+    }
+    start = time.perf_counter()
+    try:
+        statement_df = load_transactions(job['statement'], STATEMENT_COLUMNS, columns=STATEMENT_COLUMNS, cents=True)
+        books_df = load_transactions(job['books'], STATEMENT_COLUMNS, columns=STATEMENT_COLUMNS, cents=True)
+        result['load_seconds'] = time.perf_counter() - start
+
+        reconciliation = (reconciler or BankReconciliation()).reconcile(statement_df, books_df, job['ending_balance'])
+        result.update({
+            'statement_count': reconciliation.statement_count,
+            'books_count': reconciliation.books_count,
+            'exact_matches': len(reconciliation.exact_matches),
+            'potential_matches': len(reconciliation.fuzzy_matches),
+            'batched_payouts': len(reconciliation.payout_matches),
+            'statement_only': len(reconciliation.unmatched_statement),
+            'books_only': len(reconciliation.unmatched_books),
+            'duplicates': len(reconciliation.statement_duplicates) + len(reconciliation.books_duplicates),
+            'outstanding_checks_cents': reconciliation.outstanding_checks_cents,
+            'deposits_in_transit_cents': reconciliation.deposits_in_transit_cents,
+            'adjusted_balance_cents': reconciliation.adjusted_balance_cents,
+            'book_balance_cents': reconciliation.book_balance_cents,
+            'variance_cents': reconciliation.variance_cents,
+            'reconciled': reconciliation.reconciled,
+        })
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = f"{type(e).__name__}: {e}"
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _failed_result(job: Dict, error: Exception) -> Dict:
+    """Result for a job whose worker process failed before run_job returned."""
+    return {
+        'account': job['account'],
+        'position': job.get('position', 0),
+        'status': 'failed',
+        'error': f"{type(error).__name__}: {error}",
+        'pid': None,
+        'seconds': None,
+    }
+
+
+_worker_reconciler = None
+
+
+def _init_worker():
+    """Process pool initializer: one reconciler (and payee cache) per worker."""
+    global _worker_reconciler
+    _worker_reconciler = BankReconciliation()
+
+
+def _run_pooled_job(job: Dict) -> Dict:
+    """Process pool task: reconcile one account with the worker's reconciler."""
+    return run_job(job, _worker_reconciler)
+
+
+def _run_isolated(job: Dict) -> Dict:
+    """Run one job in a worker process of its own, so a crash fails only this job."""
+    with ProcessPoolExecutor(max_workers=1, initializer=_init_worker) as pool:
+        try:
+            return pool.submit(_run_pooled_job, job).result()
+        except Exception as e:
+            return _failed_result(job, e)
+
+
+def _run_pool(jobs: List[Dict], workers: int) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Run jobs in one process pool.
+
+    Returns:
+        Tuple of (results, jobs left unfinished because a worker died, in
+        submission order)
+    """
+    results, unfinished = [], []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {pool.submit(_run_pooled_job, job): order for order, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            job = jobs[futures[future]]
+            try:
+                results.append(future.result())
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory) and broke the pool for
+                # every job still queued or running, not just its own
+                unfinished.append(futures[future])
+            except Exception as e:
+                results.append(_failed_result(job, e))
+    return results, [jobs[order] for order in sorted(unfinished)]
+
+
+def run_batch(jobs: List[Dict], workers: Optional[int] = None) -> List[Dict]:
+    """
+    Reconcile every job in the manifest.
+
+    Args:
+        jobs: Job dicts from load_manifest
+        workers: Worker processes (default: CPU count, at most one per job);
+            1 runs the jobs in this process
+
+    Returns:
+        One result dict per job, in manifest order
+    """
+    if not jobs:
+        return []
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+
+    if workers == 1:
+        reconciler = BankReconciliation()
+        return [run_job(job, reconciler) for job in jobs]
+
+    results, pending = [], list(jobs)
+    while pending:
+        finished, unfinished = _run_pool(pending, workers)
+        results.extend(finished)
+
+        # The pool hands jobs to workers in submission order, at most
+        # workers + EXTRA_QUEUED_CALLS at a time, so only the first few
+        # unfinished jobs can have been in the worker that died. They are
+        # retried alone; the rest never started and go to a fresh pool.
+        suspects = unfinished[:workers + EXTRA_QUEUED_CALLS]
+        results.extend(_run_isolated(job) for job in suspects)
+        pending = unfinished[len(suspects):]
+
+    results.sort(key=lambda result: result['position'])
+    return results
+
+
+def summarize_batch(results: List[Dict], wall_seconds: Optional[float] = None) -> str:
+    """
+    Consolidated summary of a batch: one line per account, then totals.
+
+    Args:
+        results: Result dicts from run_batch
+        wall_seconds: Elapsed time for the whole batch (optional)
+
+    Returns:
+        Formatted summary text
+    """
+    ok = [r for r in results if r['status'] == 'ok']
+    failed = [r for r in results if r['status'] != 'ok']
+    reconciled = [r for r in ok if r['reconciled']]
+
+    report = []
+    report.append("=" * 78)
+    report.append("BATCH RECONCILIATION SUMMARY")
+    report.append("=" * 78)
+    report.append(f"{'Account':<24} {'Status':<8} {'Exact':>7} {'Review':>7} {'Open':>7} {'Variance':>14} {'Secs':>6}")
+    report.append("-" * 78)
+    for r in results:
+        seconds = f"{r['seconds']:>6.2f}" if r.get('seconds') is not None else f"{'-':>6}"
+        if r['status'] == 'ok':
+            status = 'OK' if r['reconciled'] else 'VARIANCE'
+            open_items = r['statement_only'] + r['books_only']
+            report.append(
+                f"{r['account'][:24]:<24} {status:<8} {r['exact_matches']:>7} {r['potential_matches']:>7} "
+                f"{open_items:>7} ${r['variance_cents'] / 100:>13,.2f} {seconds}"
+            )
+        else:
+            report.append(f"{r['account'][:24]:<24} {'FAILED':<8} {r['error'][:38]:>38} {seconds}")
+    report.append("")
+
+    report.append(f"Accounts:               {len(results):>10}")
+    report.append(f"Reconciled:             {len(reconciled):>10}")
+    report.append(f"With Variance:          {len(ok) - len(reconciled):>10}")
+    report.append(f"Failed:                 {len(failed):>10}")
+    if ok:
+        report.append(f"Total Absolute Variance:      ${sum(abs(r['variance_cents']) for r in ok) / 100:>12,.2f}")
+    job_seconds = sum(r['seconds'] for r in results if r.get('seconds') is not None)
+    report.append(f"Job Time:               {job_seconds:>9.2f}s")
+    if wall_seconds is not None:
+        report.append(f"Wall Time:              {wall_seconds:>9.2f}s")
+
+    if failed:
+        report.append("")
+        report.append("❌ FAILED ACCOUNTS")
+        report.append("-" * 78)
+        for r in failed:
+            report.append(f"  {r['account']}: {r['error']}")
+
+    return "\n".join(report)
+
+
+def reconcile_batch_from_manifest(
+    manifest_file: str,
+    workers: Optional[int] = None,
+    results_file: Optional[str] = None
+) -> List[Dict]:
+    """
+    Reconcile every account in a manifest and print the summary.
+
+    Args:
+        manifest_file: Manifest CSV (see load_manifest)
+        workers: Worker processes (default: CPU count)
+        results_file: Also write the per-account results to this CSV
+
+    Returns:
+        Per-account result dicts
+    """
+    jobs = load_manifest(manifest_file)
+    start = time.perf_counter()
+    results = run_batch(jobs, workers)
+    print(summarize_batch(results, time.perf_counter() - start))
+
+    if results_file:
+        pd.DataFrame(results).drop(columns=['position', 'pid'], errors='ignore').convert_dtypes().to_csv(results_file, index=False)
+        print(f"\n✅ Results saved to: {results_file}")
+
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python batch_reconciliation.py <manifest.csv> [workers] [results.csv]")
+        print("\nManifest columns: statement, books, ending_balance (optional: account)")
+        sys.exit(1)
+
+    manifest_file = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 and int(sys.argv[2]) > 0 else None
+    results_file = sys.argv[3] if len(sys.argv) > 3 else None
+
+    reconcile_batch_from_manifest(manifest_file, workers, results_file)
@@ -4,17 +4,663 @@ Transaction Categorization Script
 Automatically categorizes financial transactions based on payee, amount, and patterns.
 """
 
+import numpy as np
 import pandas as pd
+import hashlib
+import os
 import re
-from typing import Dict, List, Tuple
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_right
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
 from datetime import datetime
+from ledger_io import TRANSACTION_COLUMNS, amount_to_cents, content_hashes, format_date, load_transactions
+from ledger_store import LedgerWriter, write_ledger
+
+UNCATEGORIZED = 'Uncategorized - Review Needed'
+
+_REGEX_METACHARS = set('\\.^$*+?{}[]|()#')
+
+# Sign classes used to segment transactions by amount
+_NEGATIVE, _ZERO, _POSITIVE, _UNKNOWN = range(4)
+
+
+class AmountRange(NamedTuple):
+    """
+    Amount condition attached to a rule.
+
+    ``min_amount`` (inclusive) and ``max_amount`` (exclusive) bound the
+    absolute amount; ``sign`` is 'positive' (money in) or 'negative' (money
+    out). Any of them may be None.
+    """
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    sign: Optional[str] = None
+
+
+class _KeywordAutomaton:
+    """
+    Aho-Corasick automaton over literal keywords.
+
+    Each keyword carries the index of the rule it came from; every state
+    remembers the lowest rule index among the keywords ending there (including
+    through failure links), so one pass over the text yields the earliest
+    matching rule regardless of how many keywords are loaded.
+    """
+
+    def __init__(self, keywords: List[Tuple[str, int]]):
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]
+
+        for keyword, rule_index in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                state = nxt
+            if self.best[state] is None or rule_index < self.best[state]:
+                self.best[state] = rule_index
+
+        # Breadth-first pass to wire failure links and fold in suffix outputs
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                inherited = self.best[self.fail[nxt]]
+                if inherited is not None and (self.best[nxt] is None or inherited < self.best[nxt]):
+                    self.best[nxt] = inherited
+
+    def match(self, text: str) -> Optional[int]:
+        """Return the lowest rule index of any keyword found in the text."""
+        goto, fail, best_at = self.goto, self.fail, self.best
+        state = 0
+        best = None
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found = best_at[state]
+            if found is not None and (best is None or found < best):
+                best = found
+        return best
+
+
+class RuleMatcher:
+    """
+    Compiled first-match-wins matcher over an ordered list of rules.
+
+    Rules that are plain alternations of literal keywords (the common case,
+    e.g. ``stripe|paypal|square``) are loaded into a keyword automaton, so the
+    per-row cost depends on the text length rather than the rule count. Any
+    remaining regex rules are folded into one pattern of the form
+    ``(?=(?:(?P<r0>p0)|(?P<r1>p1)|...))``: the zero-width lookahead lets the
+    engine try every rule at every position in a single scan, and since
+    alternation is tried left to right, the lowest rule index over all
+    positions is exactly the rule a sequential ``re.search`` loop would pick.
+    """
+
+    def __init__(self, rules: List[Tuple]):
+        """
+        Compile the matcher.
+
+        Args:
+            rules: Ordered list of (pattern, category) or
+                (pattern, category, AmountRange) tuples
+        """
+        self.rules = list(rules)
+        self.categories = [rule[1] for rule in self.rules]
+        self.patterns = [re.compile(rule[0], re.IGNORECASE) for rule in self.rules]
+        self.conditions = [rule[2] if len(rule) > 2 else None for rule in self.rules]
+        self.fingerprint = hashlib.sha256(repr(self.rules).encode()).hexdigest()
+        self.has_amount_rules = any(self.conditions)
+
+        if self.has_amount_rules:
+            self._init_amount_index()
+            return
+
+        keywords = []
+        regex_rules = []
+        for i, rule in enumerate(self.rules):
+            literals = self._literal_alternatives(rule[0])
+            if literals is None:
+                regex_rules.append(i)
+            else:
+                keywords.extend((literal, i) for literal in literals)
+
+        self._automaton = _KeywordAutomaton(keywords) if keywords else None
+        self._regex_rules = regex_rules
+        self._regex = self._compile_combined(regex_rules)
+        # Used for non-ASCII text, where IGNORECASE folding goes beyond lower()
+        self._all_regex = (
+            self._compile_combined(range(len(self.rules))) if keywords else self._regex
+        )
+
+    def _init_amount_index(self):
+        """
+        Build the interval index over amount conditions.
+
+        Every range boundary cuts the absolute-amount axis, and each piece is
+        crossed with the sign classes. Any rule's condition either covers a
+        whole segment or none of it, so which rules are eligible is resolved
+        once per segment (``segment_rules``), and each row only needs a binary
+        search to find its segment, however many range rules there are.
+        """
+        boundaries = set()
+        for condition in self.conditions:
+            if condition:
+                boundaries.update(
+                    bound for bound in (condition.min_amount, condition.max_amount) if bound is not None
+                )
+        self.boundaries = sorted(boundaries)
+        self._n_buckets = len(self.boundaries) + 1
+        self.n_segments = 4 * self._n_buckets
+
+        self.segment_rules = np.ones((len(self.rules), self.n_segments), dtype=bool)
+        for segment in range(self.n_segments):
+            sign_class, bucket = divmod(segment, self._n_buckets)
+            low = self.boundaries[bucket - 1] if bucket > 0 else -np.inf
+            high = self.boundaries[bucket] if bucket < len(self.boundaries) else np.inf
+            for i, condition in enumerate(self.conditions):
+                if condition:
+                    self.segment_rules[i, segment] = self._segment_allowed(
+                        condition, sign_class, low, high
+                    )
+
+        self._segment_matchers = {}
+
+    @staticmethod
+    def _segment_allowed(condition: AmountRange, sign_class: int, low: float, high: float) -> bool:
+        """Whether a condition holds for every amount in a segment."""
+        if sign_class == _UNKNOWN:
+            return False
+        if condition.sign == 'positive' and sign_class != _POSITIVE:
+            return False
+        if condition.sign == 'negative' and sign_class != _NEGATIVE:
+            return False
+        if condition.min_amount is not None and low < condition.min_amount:
+            return False
+        if condition.max_amount is not None and high > condition.max_amount:
+            return False
+        return True
+
+    def segment(self, amount) -> int:
+        """Segment number of a single amount."""
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            return _UNKNOWN * self._n_buckets
+        if amount != amount:  # NaN
+            return _UNKNOWN * self._n_buckets
+
+        sign_class = _NEGATIVE if amount < 0 else _POSITIVE if amount > 0 else _ZERO
+        return sign_class * self._n_buckets + bisect_right(self.boundaries, abs(amount))
+
+    def segments(self, amounts: pd.Series) -> np.ndarray:
+        """Vectorized segment numbers for a column of amounts."""
+        values = pd.to_numeric(amounts, errors='coerce').to_numpy(dtype=float)
+        buckets = np.searchsorted(self.boundaries, np.abs(values), side='right')
+        sign_class = np.select(
+            [values < 0, values == 0, values > 0], [_NEGATIVE, _ZERO, _POSITIVE], _UNKNOWN
+        )
+        buckets[sign_class == _UNKNOWN] = 0
+        return sign_class * self._n_buckets + buckets
+
+    def _segment_matcher(self, segment: int) -> Tuple['RuleMatcher', np.ndarray]:
+        """Text matcher over the rules eligible in a segment, built on first use."""
+        cached = self._segment_matchers.get(segment)
+        if cached is None:
+            eligible = np.flatnonzero(self.segment_rules[:, segment])
+            key = eligible.tobytes()
+            # Segments with the same eligible rules share one compiled matcher
+            for other in self._segment_matchers.values():
+                if other[1].tobytes() == key:
+                    cached = other
+                    break
+            else:
+                cached = (RuleMatcher([self.rules[i][:2] for i in eligible]), eligible)
+            self._segment_matchers[segment] = cached
+        return cached
+
+    @staticmethod
+    def _literal_alternatives(pattern: str) -> Optional[List[str]]:
+        """Split a pattern into lowercase literals, or None if it uses regex syntax."""
+        pieces = pattern.split('|')
+        for piece in pieces:
+            if not piece or not piece.isascii() or _REGEX_METACHARS & set(piece):
+                return None
+        return [piece.lower() for piece in pieces]
+
+    def _compile_combined(self, rule_indices) -> Optional[Tuple]:
+        """
+        Fold the given rules into one lookahead alternation.
+
+        Returns:
+            (compiled pattern, {group index: rule index}) or None if there is
+            nothing to compile or the rules can't be merged safely
+        """
+        rule_indices = list(rule_indices)
+        if not rule_indices:
+            return None
+
+        # Patterns with their own groups may carry numbered backreferences that
+        # would point at the wrong group once merged; keep those sequential.
+        if any(self.patterns[i].groups for i in rule_indices):
+            return None
+
+        alternatives = "|".join(f"(?P<r{i}>{self.rules[i][0]})" for i in rule_indices)
+        try:
+            combined = re.compile(f"(?=(?:{alternatives}))", re.IGNORECASE)
+        except re.error:
+            # e.g. inline global flags that are only legal at the very start
+            return None
+
+        group_to_rule = {combined.groupindex[f"r{i}"]: i for i in rule_indices}
+        return combined, group_to_rule
+
+    def _sequential_match(self, text: str, rule_indices, best: Optional[int]) -> Optional[int]:
+        """Plain rule-by-rule search, used when the rules can't be combined."""
+        for i in rule_indices:
+            if best is not None and i >= best:
+                break
+            if self.patterns[i].search(text):
+                return i
+        return best
+
+    @staticmethod
+    def _combined_match(combined: Tuple, text: str, best: Optional[int]) -> Optional[int]:
+        """Lower ``best`` to the earliest rule the combined pattern finds."""
+        pattern, group_to_rule = combined
+        for m in pattern.finditer(text):
+            rule_index = group_to_rule[m.lastindex]
+            if best is None or rule_index < best:
+                best = rule_index
+                if best == 0:
+                    break
+        return best
+
+    def match(self, text: str, amount=None) -> Optional[int]:
+        """
+        Find the first rule matching the text.
+
+        Args:
+            text: Text to match (already lowercased)
+            amount: Transaction amount, checked against amount conditions
+
+        Returns:
+            Index of the winning rule, or None if nothing matches
+        """
+        if self.has_amount_rules:
+            matcher, eligible = self._segment_matcher(self.segment(amount))
+            rule_index = matcher.match(text)
+            return None if rule_index is None else int(eligible[rule_index])
+
+        if not text.isascii():
+            if self._all_regex is None:
+                return self._sequential_match(text, range(len(self.rules)), None)
+            return self._combined_match(self._all_regex, text, None)
+
+        best = self._automaton.match(text) if self._automaton else None
+        if not self._regex_rules or (best is not None and best < self._regex_rules[0]):
+            return best
+
+        if self._regex is None:
+            return self._sequential_match(text, self._regex_rules, best)
+        return self._combined_match(self._regex, text, best)
+
+    def categorize(self, text: str, amount=None) -> str:
+        """Return the category of the first matching rule, or UNCATEGORIZED."""
+        rule_index = self.match(text, amount)
+        return UNCATEGORIZED if rule_index is None else self.categories[rule_index]
+
+    def cache_key(self, text: str, amount=None) -> str:
+        """Key for CategoryCache: the text, plus the amount segment if it matters."""
+        if not self.has_amount_rules:
+            return text
+        return f"{self.segment(amount)}\x00{text}"
+
+
+class CategoryCache:
+    """
+    Two-tier memo of categorization results, keyed on the normalized
+    (lowercased) ``payee + description`` text.
+
+    The first tier is a bounded in-memory LRU. The optional second tier is a
+    SQLite file, so results survive process restarts. Entries are namespaced
+    by the fingerprint of the rule set that produced them; binding the cache
+    to a new fingerprint (which the categorizer does whenever its rules
+    change) drops everything computed under the old rules.
+    """
+
+    _COMMIT_EVERY = 1000
+
+    def __init__(self, max_size: int = 10000, db_path: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            db_path: Path to a SQLite file for the on-disk tier (optional)
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+
+        self.max_size = max_size
+        self.db_path = db_path
+        self.fingerprint = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._memory = OrderedDict()
+        self._pending_writes = 0
+
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS category_cache ("
+                " rules_fingerprint TEXT NOT NULL,"
+                " text TEXT NOT NULL,"
+                " category TEXT NOT NULL,"
+                " PRIMARY KEY (rules_fingerprint, text))"
+            )
+            self._conn.commit()
+
+    def bind(self, fingerprint: str):
+        """Point the cache at a rule set, invalidating entries from any other."""
+        if fingerprint == self.fingerprint:
+            return
+
+        self.fingerprint = fingerprint
+        self._memory.clear()
+        if self._conn is not None:
+            self._conn.execute(
+                "DELETE FROM category_cache WHERE rules_fingerprint != ?", (fingerprint,)
+            )
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def _remember(self, text: str, category: str):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[text] = category
+        self._memory.move_to_end(text)
+        if len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, text: str) -> Optional[str]:
+        """Look up one text; returns None on a miss."""
+        category = self._memory.get(text)
+        if category is not None:
+            self._memory.move_to_end(text)
+            self.hits += 1
+            return category
+
+        if self._conn is not None:
+            row = self._conn.execute(
+                "SELECT category FROM category_cache WHERE rules_fingerprint = ? AND text = ?",
+                (self.fingerprint, text),
+            ).fetchone()
+            if row is not None:
+                self._remember(text, row[0])
+                self.hits += 1
+                self.disk_hits += 1
+                return row[0]
+
+        self.misses += 1
+        return None
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, str]:
+        """
+        Look up many distinct texts at once.
+
+        Returns:
+            Dictionary of {text: category} for the texts that were cached
+        """
+        texts = list(texts)
+        found = {}
+        missing = []
+        for text in texts:
+            category = self._memory.get(text)
+            if category is None:
+                missing.append(text)
+            else:
+                self._memory.move_to_end(text)
+                found[text] = category
+
+        if self._conn is not None and missing:
+            from_disk = {}
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    "SELECT text, category FROM category_cache "
+                    f"WHERE rules_fingerprint = ? AND text IN ({placeholders})",
+                    [self.fingerprint, *batch],
+                ).fetchall()
+                from_disk.update(rows)
+            for text, category in from_disk.items():
+                self._remember(text, category)
+            found.update(from_disk)
+            self.disk_hits += len(from_disk)
+
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put(self, text: str, category: str):
+        """Store one result in both tiers."""
+        self.put_many({text: category})
+
+    def put_many(self, results: Dict[str, str]):
+        """Store many results in both tiers."""
+        for text, category in results.items():
+            self._remember(text, category)
+
+        if self._conn is not None and results:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO category_cache (rules_fingerprint, text, category) "
+                "VALUES (?, ?, ?)",
+                [(self.fingerprint, text, category) for text, category in results.items()],
+            )
+            self._pending_writes += len(results)
+            if self._pending_writes >= self._COMMIT_EVERY:
+                self.flush()
+
+    def flush(self):
+        """Commit pending writes to the on-disk tier."""
+        if self._conn is not None and self._pending_writes:
+            self._conn.commit()
+            self._pending_writes = 0
+
+    def close(self):
+        """Flush and close the on-disk tier."""
+        if self._conn is not None:
+            self.flush()
+            self._conn.close()
+            self._conn = None
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss/eviction counters and the current memory tier size."""
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._memory),
+        }
+
+
+class CategorizationSummary:
+    """
+    Running totals behind the categorization report.
+
+    Built incrementally, one categorized chunk at a time, so the report for
+    a file of any size only needs per-category sums/counts, the date range
+    and a bounded sample of uncategorized rows.
+    """
+
+    SAMPLE_SIZE = 10
+
+    def __init__(self):
+        self.total = 0
+        self.date_min = np.nan
+        self.date_max = np.nan
+        self.category_sums = {}
+        self.category_counts = {}
+        self.uncategorized_sample = []
+        self.uncategorized_count = 0
+
+    def update(self, categorized_df: pd.DataFrame, uncategorized: List[Dict]):
+        """
+        Fold one categorized chunk into the running totals.
+
+        Args:
+            categorized_df: Chunk with 'date', 'amount' and 'category' columns
+            uncategorized: The chunk's uncategorized rows as records
+        """
+        self.total += len(categorized_df)
+
+        dates = categorized_df['date'].dropna()
+        if len(dates) > 0:
+            chunk_min, chunk_max = dates.min(), dates.max()
+            if pd.isna(self.date_min) or chunk_min < self.date_min:
+                self.date_min = chunk_min
+            if pd.isna(self.date_max) or chunk_max > self.date_max:
+                self.date_max = chunk_max
+
+        grouped = categorized_df.groupby('category', observed=True)['amount'].agg(['sum', 'count'])
+        for category, amount_sum, amount_count in zip(grouped.index, grouped['sum'], grouped['count']):
+            self.category_sums[category] = self.category_sums.get(category, 0.0) + amount_sum
+            self.category_counts[category] = self.category_counts.get(category, 0) + amount_count
+
+        room = self.SAMPLE_SIZE - len(self.uncategorized_sample)
+        if room > 0:
+            self.uncategorized_sample.extend(uncategorized[:room])
+        self.uncategorized_count += len(uncategorized)
+
+    def category_table(self) -> pd.DataFrame:
+        """Per-category sum and count, sorted by category and rounded like the report."""
+        return pd.DataFrame({
+            'sum': pd.Series(self.category_sums, dtype=float),
+            'count': pd.Series(self.category_counts, dtype='int64'),
+        }).sort_index().round(2)
+
+
+class CategorizationState:
+    """
+    Per-row content hashes and their categories from previous runs.
+
+    Each row is hashed over its input columns (everything but 'category').
+    A later run against the same rule fingerprint reuses the stored category
+    for every row whose hash is known, so only new or edited rows go through
+    the rules; when the fingerprint changes, every row is categorized again.
+    Rows seen in the current run replace the stored set on save().
+    """
+
+    VERSION = 2
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialize the state, loading it from disk if the file exists.
+
+        Args:
+            path: Pickle file the state is loaded from and saved to (optional)
+        """
+        self.path = path
+        self.rules_fingerprint = None
+        self._previous = pd.Series(dtype=object, index=pd.Index([], dtype='uint64'))
+        self._pending = []
+
+        if path and os.path.exists(path):
+            saved = pd.read_pickle(path)
+            if saved.get('version') == self.VERSION:
+                self.rules_fingerprint = saved['rules_fingerprint']
+                self._previous = pd.Series(
+                    saved['categories'], index=pd.Index(saved['row_hashes'], dtype='uint64')
+                )
+
+    @staticmethod
+    def hash_rows(transactions_df: pd.DataFrame) -> np.ndarray:
+        """Vectorized 64-bit content hash of each row's input columns (see ledger_io.content_hashes)."""
+        columns = [col for col in transactions_df.columns if col != 'category']
+        return content_hashes(transactions_df[columns])
+
+    def lookup(self, row_hashes: np.ndarray, rules_fingerprint: str) -> np.ndarray:
+        """
+        Categories remembered for the given hashes.
+
+        Returns:
+            Object array with the stored category, or None for rows that are
+            new, changed, or were categorized under a different rule set
+        """
+        categories = np.full(len(row_hashes), None, dtype=object)
+        if rules_fingerprint != self.rules_fingerprint or self._previous.empty:
+            return categories
+
+        positions = self._previous.index.get_indexer(row_hashes)
+        known = positions >= 0
+        categories[known] = self._previous.to_numpy(dtype=object)[positions[known]]
+        return categories
+
+    def record(self, row_hashes: np.ndarray, categories: np.ndarray):
+        """Remember this run's rows; takes effect on save()."""
+        self._pending.append((row_hashes, categories))
+
+    def save(self, rules_fingerprint: str):
+        """Replace the stored rows with this run's and write them to disk."""
+        if self._pending:
+            row_hashes = np.concatenate([hashes for hashes, _ in self._pending])
+            categories = np.concatenate([cats for _, cats in self._pending])
+        else:
+            row_hashes = np.array([], dtype='uint64')
+            categories = np.array([], dtype=object)
+
+        current = pd.Series(categories, index=pd.Index(row_hashes, dtype='uint64'))
+        self._previous = current[~current.index.duplicated()]
+        self.rules_fingerprint = rules_fingerprint
+        self._pending = []
+
+        if self.path:
+            pd.to_pickle({
+                'version': self.VERSION,
+                'rules_fingerprint': rules_fingerprint,
+                'row_hashes': self._previous.index.to_numpy(),
+                # Few distinct categories: store them dictionary-encoded
+                'categories': pd.Categorical(self._previous.to_numpy(dtype=object)),
+            }, self.path)
+
 
 class TransactionCategorizer:
     """Categorizes financial transactions based on rules and patterns."""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[CategoryCache] = None):
+        """
+        Initialize the categorizer.
+        
+        Args:
+            cache: Optional CategoryCache placed in front of the rule matcher
+        """
         self.rules = self._initialize_rules()
         self.uncategorized = []
+        self.cache = cache
+        self._matcher = None
+        self._matcher_snapshot = None
+        self._pool = None
+        self._pool_key = None
+        self.incremental_stats = {'reused': 0, 'categorized': 0}
         
     def _initialize_rules(self) -> Dict[str, List[Tuple[str, str]]]:
         """Initialize categorization rules."""
@@ -45,6 +691,45 @@ class TransactionCategorizer:
             ],
         }
     
+    def _flatten_rules(self) -> List[Tuple]:
+        """Flatten the rule groups into one list in evaluation order."""
+        return [
+            tuple(rule)
+            for patterns in self.rules.values()
+            for rule in patterns
+        ]
+    
+    def _rules_snapshot(self) -> Tuple:
+        """Identity and length of each rule group: cheap to take on every call."""
+        return (id(self.rules),) + tuple((name, id(group), len(group)) for name, group in self.rules.items())
+    
+    def _get_matcher(self, verify: bool = False) -> RuleMatcher:
+        """
+        Return the compiled matcher, rebuilding it if the rules changed.
+        
+        Direct edits to ``self.rules`` that add, remove or replace a group,
+        or insert or delete rules in one, are noticed on every call without
+        looking at the rules themselves.
+        
+        Args:
+            verify: Also compare every rule, to catch a rule replaced in
+                place (done once per batch)
+        """
+        snapshot = self._rules_snapshot()
+        if self._matcher is not None and snapshot != self._matcher_snapshot:
+            self._matcher = None
+        if self._matcher is not None and verify:
+            if self._matcher.rules != self._flatten_rules():
+                self._matcher = None
+        
+        if self._matcher is None:
+            self._matcher = RuleMatcher(self._flatten_rules())
+            self._matcher_snapshot = snapshot
+            if self.cache is not None:
+                self.cache.bind(self._matcher.fingerprint)
+        
+        return self._matcher
+    
     def categorize_transaction(self, payee: str, description: str, amount: float) -> str:
         """
         Categorize a single transaction.
@@ -57,43 +742,224 @@ class TransactionCategorizer:
         Returns:
             Category name
         """
+        # Rule groups edited directly are picked up by the snapshot check
+        return self._categorize_one(self._get_matcher(), payee, description, amount)
+    
+    def _categorize_one(self, matcher: RuleMatcher, payee: str, description: str, amount: float) -> str:
+        """Categorize one transaction with an already-verified matcher."""
         text = f"{payee} {description}".lower()
         
-        # Check all rule categories
-        for category_type, patterns in self.rules.items():
-            for pattern, category in patterns:
-                if re.search(pattern, text, re.IGNORECASE):
-                    return category
+        if self.cache is not None:
+            cache_key = matcher.cache_key(text, amount)
+            category = self.cache.get(cache_key)
+            if category is not None:
+                return category
         
-        # Flag for manual review
-        return 'Uncategorized - Review Needed'
+        # First matching rule wins; unmatched rows are flagged for manual review
+        category = matcher.categorize(text, amount)
+        
+        if self.cache is not None:
+            self.cache.put(cache_key, category)
+        
+        return category
     
-    def categorize_batch(self, transactions_df: pd.DataFrame) -> pd.DataFrame:
+    def categorize_batch(
+        self,
+        transactions_df: pd.DataFrame,
+        vectorized: bool = True,
+        workers: int = 1
+    ) -> pd.DataFrame:
         """
         Categorize a batch of transactions from a DataFrame.
         
         Args:
             transactions_df: DataFrame with columns: date, payee, description, amount
+            vectorized: Categorize column-wise instead of row by row
+                (same output, much faster on large frames)
+            workers: Number of worker processes for column-wise categorization;
+                the pool is kept between calls until close() or a rule change
             
         Returns:
             DataFrame with added 'category' column
         """
-        transactions_df['category'] = transactions_df.apply(
-            lambda row: self.categorize_transaction(
-                row['payee'], 
-                row.get('description', ''), 
-                row['amount']
-            ),
-            axis=1
-        )
+        # Pick up any direct edits to self.rules once per batch
+        matcher = self._get_matcher(verify=True)
+        
+        if vectorized and workers > 1 and len(transactions_df) >= workers * MIN_PARTITION_ROWS:
+            categories = self._categorize_parallel(transactions_df, matcher, workers)
+        elif vectorized:
+            categories = self._categorize_columns(transactions_df, matcher)
+        else:
+            categories = transactions_df.apply(
+                lambda row: self._categorize_one(
+                    matcher,
+                    row['payee'], 
+                    row.get('description', ''), 
+                    row['amount']
+                ),
+                axis=1
+            )
+        transactions_df['category'] = categories
+        
+        if self.cache is not None:
+            self.cache.flush()
         
         # Track uncategorized for reporting
-        self.uncategorized = transactions_df[
-            transactions_df['category'] == 'Uncategorized - Review Needed'
-        ].to_dict('records')
+        uncategorized_mask = (transactions_df['category'] == UNCATEGORIZED).to_numpy(dtype=bool)
+        self.uncategorized = transactions_df[uncategorized_mask].to_dict('records')
+        
+        return transactions_df
+    
+    def categorize_incremental(
+        self,
+        transactions_df: pd.DataFrame,
+        state: CategorizationState,
+        workers: int = 1
+    ) -> pd.DataFrame:
+        """
+        Categorize only rows that are new or changed since the last run.
+        
+        Rows whose content hash is in the state (under the current rule
+        fingerprint) keep their stored category; the rest are categorized in
+        one batch. Call state.save() once the whole ledger has been through.
+        
+        Args:
+            transactions_df: DataFrame with columns: date, payee, description, amount
+            state: CategorizationState from previous runs
+            workers: Number of worker processes for the rows that need work
+            
+        Returns:
+            DataFrame with added 'category' column
+        """
+        matcher = self._get_matcher(verify=True)
+        row_hashes = state.hash_rows(transactions_df)
+        categories = state.lookup(row_hashes, matcher.fingerprint)
+        
+        pending = np.equal(categories, None)
+        if pending.any():
+            fresh = self.categorize_batch(transactions_df[pending].copy(), workers=workers)
+            categories[pending] = fresh['category'].to_numpy(dtype=object)
+        
+        transactions_df['category'] = categories
+        state.record(row_hashes, categories)
+        
+        n_pending = int(pending.sum())
+        self.incremental_stats['categorized'] += n_pending
+        self.incremental_stats['reused'] += len(transactions_df) - n_pending
+        
+        uncategorized_mask = categories == UNCATEGORIZED
+        self.uncategorized = transactions_df[uncategorized_mask].to_dict('records')
         
         return transactions_df
     
+    @staticmethod
+    def _text_column(column: pd.Series) -> pd.Series:
+        """Stringify a column the same way the f-string in categorize_transaction does."""
+        column = column.astype(object)
+        if pd.api.types.infer_dtype(column, skipna=False) == 'string':
+            return column
+        # Missing values and non-strings: str() keeps 'nan' / 'None' spellings
+        return column.map(str)
+    
+    def _categorize_columns(self, transactions_df: pd.DataFrame, matcher: RuleMatcher) -> pd.Series:
+        """
+        Column-wise categorization.
+        
+        Builds the lowercased ``payee + description`` text once, reduces it to
+        its distinct values, then applies the rules in order with vectorized
+        string matching over only the rows no earlier rule has claimed.
+        """
+        payee = self._text_column(transactions_df['payee'])
+        if 'description' in transactions_df.columns:
+            description = self._text_column(transactions_df['description'])
+        else:
+            description = ''
+        text = (payee + ' ' + description).str.lower()
+        
+        # Repeated merchants collapse to one entry each
+        codes, uniques = pd.factorize(text)
+        unique_text = pd.Series(uniques, dtype=object)
+        
+        unique_segments = None
+        if matcher.has_amount_rules:
+            # Bucket every row by amount once, then dedupe on (text, segment)
+            segments = matcher.segments(transactions_df['amount'])
+            pair_codes, pairs = pd.factorize(codes.astype('int64') * matcher.n_segments + segments)
+            unique_text = unique_text.iloc[pairs // matcher.n_segments].reset_index(drop=True)
+            unique_segments = pairs % matcher.n_segments
+            codes = pair_codes
+        
+        unique_categories = np.full(len(unique_text), UNCATEGORIZED, dtype=object)
+        unassigned = np.ones(len(unique_text), dtype=bool)
+        
+        if self.cache is not None:
+            cache_keys = unique_text
+            if unique_segments is not None:
+                cache_keys = pd.Series(unique_segments.astype(str), dtype=object) + '\x00' + unique_text
+            cached = cache_keys.map(self.cache.get_many(cache_keys))
+            cache_hit = cached.notna().to_numpy()
+            unique_categories[cache_hit] = cached[cache_hit].to_numpy()
+            unassigned &= ~cache_hit
+            to_store = unassigned.copy()
+        
+        for rule_index, (compiled, category) in enumerate(zip(matcher.patterns, matcher.categories)):
+            if not unassigned.any():
+                break
+            candidates = unassigned
+            if unique_segments is not None:
+                # Rows whose amount falls outside the rule's range are never tested
+                candidates = unassigned & matcher.segment_rules[rule_index][unique_segments]
+                if not candidates.any():
+                    continue
+            remaining = unique_text[candidates]
+            hits = remaining.str.contains(compiled, regex=True).to_numpy(dtype=bool)
+            hit_positions = np.flatnonzero(candidates)[hits]
+            unique_categories[hit_positions] = category
+            unassigned[hit_positions] = False
+        
+        if self.cache is not None:
+            positions = np.flatnonzero(to_store)
+            self.cache.put_many(dict(zip(cache_keys.iloc[positions], unique_categories[positions])))
+        
+        return pd.Series(unique_categories[codes], index=transactions_df.index)
+    
+    def _categorize_parallel(self, transactions_df: pd.DataFrame, matcher: RuleMatcher, workers: int) -> pd.Series:
+        """
+        Column-wise categorization split across a process pool.
+        
+        Only the payee, description and amount columns are shipped to the workers. Each worker compiles
+        the rule set once, in its initializer, and reuses it for every
+        partition; results come back in submission order. The payee cache is
+        not consulted here, since its tiers live in this process.
+        """
+        pool_key = (workers, matcher.fingerprint)
+        if self._pool is None or self._pool_key != pool_key:
+            self.close()
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(matcher.rules,)
+            )
+            self._pool_key = pool_key
+        
+        columns = [col for col in ('payee', 'description', 'amount') if col in transactions_df.columns]
+        text_df = transactions_df[columns]
+        
+        # A few partitions per worker keeps the pool busy when rows vary in cost
+        n_partitions = min(workers * 4, max(1, len(text_df) // MIN_PARTITION_ROWS))
+        bounds = np.linspace(0, len(text_df), n_partitions + 1).astype(int)
+        partitions = [text_df.iloc[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+        
+        results = list(self._pool.map(_categorize_partition, partitions))
+        return pd.Series(np.concatenate(results), index=transactions_df.index)
+    
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_key = None
+    
     def split_transaction(self, payee: str, amount: float, splits: Dict[str, float]) -> List[Dict]:
         """
         Split a transaction into multiple categories.
@@ -106,8 +972,10 @@ class TransactionCategorizer:
         Returns:
             List of split transactions
         """
-        if abs(sum(splits.values()) - amount) > 0.01:
-            raise ValueError(f"Split amounts {sum(splits.values())} don't match total {amount}")
+        # Compare in integer cents so the check is exact (no float tolerance)
+        split_cents = sum(amount_to_cents(value) for value in splits.values())
+        if split_cents != amount_to_cents(amount):
+            raise ValueError(f"Split amounts {split_cents / 100:.2f} don't match total {amount:.2f}")
         
         split_transactions = []
         for category, split_amount in splits.items():
@@ -120,57 +988,142 @@ class TransactionCategorizer:
         
         return split_transactions
     
-    def add_custom_rule(self, pattern: str, category: str, category_type: str = 'opex'):
-        """Add a custom categorization rule."""
+    def add_custom_rule(
+        self,
+        pattern: str,
+        category: str,
+        category_type: str = 'opex',
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None,
+        sign: Optional[str] = None,
+        prepend: bool = False
+    ):
+        """
+        Add a custom categorization rule.
+        
+        Args:
+            pattern: Regex matched against the lowercased payee + description
+            category: Category assigned when the rule wins
+            category_type: Rule group ('revenue', 'cogs', 'opex' or a new one)
+            min_amount: Only match if abs(amount) >= min_amount (optional)
+            max_amount: Only match if abs(amount) < max_amount (optional)
+            sign: Only match 'positive' (money in) or 'negative' (money out) amounts
+            prepend: Put the rule first in its group instead of last, so it
+                wins over broader rules in the same group
+        """
+        if sign not in (None, 'positive', 'negative'):
+            raise ValueError(f"sign must be 'positive' or 'negative', got {sign!r}")
+        if min_amount is not None and max_amount is not None and min_amount >= max_amount:
+            raise ValueError(f"min_amount {min_amount} must be below max_amount {max_amount}")
+        
+        if min_amount is None and max_amount is None and sign is None:
+            rule = (pattern, category)
+        else:
+            rule = (pattern, category, AmountRange(min_amount, max_amount, sign))
+        
         if category_type not in self.rules:
             self.rules[category_type] = []
-        self.rules[category_type].append((pattern, category))
+        if prepend:
+            self.rules[category_type].insert(0, rule)
+        else:
+            self.rules[category_type].append(rule)
+        
+        # Recompile on next use; the new fingerprint also invalidates the cache
+        self._matcher = None
     
-    def generate_categorization_report(self, transactions_df: pd.DataFrame) -> str:
-        """Generate a summary report of categorized transactions."""
+    def generate_categorization_report(self, transactions_df) -> str:
+        """
+        Generate a summary report of categorized transactions.
+        
+        Args:
+            transactions_df: Categorized DataFrame, or a CategorizationSummary
+                accumulated from a streamed file
+        """
+        if isinstance(transactions_df, CategorizationSummary):
+            summary = transactions_df
+        else:
+            summary = CategorizationSummary()
+            summary.update(transactions_df, self.uncategorized)
+        
         report = []
         report.append("Transaction Categorization Summary")
         report.append("=" * 50)
-        report.append(f"\nTotal Transactions: {len(transactions_df)}")
-        report.append(f"Date Range: {transactions_df['date'].min()} to {transactions_df['date'].max()}")
+        report.append(f"\nTotal Transactions: {summary.total}")
+        report.append(f"Date Range: {format_date(summary.date_min)} to {format_date(summary.date_max)}")
         report.append("\nCategories Breakdown:")
         report.append("-" * 50)
         
-        category_summary = transactions_df.groupby('category').agg({
-            'amount': ['sum', 'count']
-        }).round(2)
+        for category, row in summary.category_table().iterrows():
+            report.append(f"{category:40} ${row['sum']:12,.2f} ({int(row['count'])} txns)")
         
-        for category, row in category_summary.iterrows():
-            report.append(f"{category:40} ${row['amount']['sum']:12,.2f} ({int(row['amount']['count'])} txns)")
-        
-        if self.uncategorized:
+        if summary.uncategorized_count:
             report.append("\n⚠️  Uncategorized Transactions Needing Review:")
             report.append("-" * 50)
-            for txn in self.uncategorized[:10]:  # Show first 10
-                report.append(f"  {txn['date']} | {txn['payee']:30} | ${txn['amount']:10,.2f}")
-            if len(self.uncategorized) > 10:
-                report.append(f"\n  ... and {len(self.uncategorized) - 10} more")
+            for txn in summary.uncategorized_sample:  # Show first 10
+                report.append(f"  {format_date(txn['date'])} | {txn['payee']:30} | ${txn['amount']:10,.2f}")
+            if summary.uncategorized_count > summary.SAMPLE_SIZE:
+                report.append(f"\n  ... and {summary.uncategorized_count - summary.SAMPLE_SIZE} more")
         
         return "\n".join(report)
 
 
-def categorize_from_csv(input_file: str, output_file: str = None) -> pd.DataFrame:
+REQUIRED_COLUMNS = TRANSACTION_COLUMNS
+
+# Below this many rows per worker, process start-up and pickling cost more
+# than they save
+MIN_PARTITION_ROWS = 5000
+
+_worker_categorizer = None
+
+
+def _init_worker(rules: List[Tuple]):
+    """Process pool initializer: compile the rule set once per worker."""
+    global _worker_categorizer
+    _worker_categorizer = TransactionCategorizer()
+    _worker_categorizer.rules = {'rules': list(rules)}
+    _worker_categorizer._get_matcher()
+
+
+def _categorize_partition(text_df: pd.DataFrame) -> np.ndarray:
+    """Process pool task: categorize one partition with the worker's matcher."""
+    matcher = _worker_categorizer._get_matcher()
+    return _worker_categorizer._categorize_columns(text_df, matcher).to_numpy()
+
+
+def categorize_from_csv(
+    input_file: str,
+    output_file: str = None,
+    chunksize: Optional[int] = None,
+    workers: int = 1,
+    state_file: Optional[str] = None,
+    ledger_dir: Optional[str] = None
+):
     """
     Categorize transactions from a CSV file.
     
     Args:
         input_file: Path to input CSV (must have: date, payee, description, amount)
         output_file: Path to output CSV (optional)
+        chunksize: Stream the file in chunks of this many rows, appending each
+            categorized chunk to the output, so peak memory is bounded by the
+            chunk size instead of the file size (optional)
+        workers: Number of worker processes used to categorize (default 1)
+        state_file: Incremental mode: remember row hashes and categories in
+            this file and only categorize rows that are new or changed since
+            the previous run with the same rules (optional)
+        ledger_dir: Also write the result to this Parquet ledger, partitioned
+            by month; rows are merged into the stored months (optional)
         
     Returns:
-        Categorized DataFrame
+        Categorized DataFrame, or the CategorizationSummary when streaming
     """
-    # Read transactions
-    df = pd.read_csv(input_file)
-    required_columns = ['date', 'payee', 'amount']
+    if chunksize:
+        return _categorize_csv_in_chunks(
+            input_file, output_file, chunksize, workers, state_file, ledger_dir
+        )
     
-    if not all(col in df.columns for col in required_columns):
-        raise ValueError(f"CSV must contain columns: {required_columns}")
+    # Read transactions (validates columns, parses dates, encodes payees)
+    df = load_transactions(input_file, REQUIRED_COLUMNS, report_memory=True)
     
     # Ensure description column exists
     if 'description' not in df.columns:
@@ -178,29 +1131,118 @@ def categorize_from_csv(input_file: str, output_file: str = None) -> pd.DataFram
     
     # Categorize
     categorizer = TransactionCategorizer()
-    categorized_df = categorizer.categorize_batch(df)
+    state = CategorizationState(state_file) if state_file else None
+    try:
+        if state is not None:
+            categorized_df = categorizer.categorize_incremental(df, state, workers=workers)
+            state.save(categorizer._get_matcher().fingerprint)
+        else:
+            categorized_df = categorizer.categorize_batch(df, workers=workers)
+    finally:
+        categorizer.close()
     
     # Print report
     print(categorizer.generate_categorization_report(categorized_df))
+    if state is not None:
+        _print_incremental_stats(categorizer)
     
     # Save if output file specified
     if output_file:
         categorized_df.to_csv(output_file, index=False)
         print(f"\n✅ Categorized transactions saved to: {output_file}")
     
+    if ledger_dir:
+        periods = write_ledger(categorized_df, ledger_dir)
+        print(f"✅ Ledger updated: {ledger_dir} ({len(periods)} month partition(s))")
+    
     return categorized_df
 
 
+def _categorize_csv_in_chunks(
+    input_file: str,
+    output_file: Optional[str],
+    chunksize: int,
+    workers: int = 1,
+    state_file: Optional[str] = None,
+    ledger_dir: Optional[str] = None
+) -> CategorizationSummary:
+    """Streaming variant of categorize_from_csv; see its docstring."""
+    # Validates the header up front, then yields typed chunks
+    chunks = load_transactions(input_file, REQUIRED_COLUMNS, chunksize=chunksize)
+    
+    categorizer = TransactionCategorizer()
+    summary = CategorizationSummary()
+    state = CategorizationState(state_file) if state_file else None
+    ledger = LedgerWriter(ledger_dir) if ledger_dir else None
+    
+    try:
+        for i, chunk in enumerate(chunks):
+            if 'description' not in chunk.columns:
+                chunk['description'] = ''
+            
+            # The worker pool, if any, is reused across chunks
+            if state is not None:
+                categorized = categorizer.categorize_incremental(chunk, state, workers=workers)
+            else:
+                categorized = categorizer.categorize_batch(chunk, workers=workers)
+            summary.update(categorized, categorizer.uncategorized)
+            
+            if output_file:
+                categorized.to_csv(output_file, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+            if ledger is not None:
+                ledger.write(categorized)
+        
+        if state is not None:
+            state.save(categorizer._get_matcher().fingerprint)
+        periods = ledger.commit() if ledger is not None else []
+    except Exception:
+        if ledger is not None:
+            ledger.abort()
+        raise
+    finally:
+        categorizer.close()
+    
+    # Only the bounded sample is worth keeping around
+    categorizer.uncategorized = summary.uncategorized_sample
+    
+    print(categorizer.generate_categorization_report(summary))
+    if state is not None:
+        _print_incremental_stats(categorizer)
+    
+    if output_file:
+        print(f"\n✅ Categorized transactions saved to: {output_file}")
+    if ledger is not None:
+        print(f"✅ Ledger updated: {ledger_dir} ({len(periods)} month partition(s))")
+    
+    return summary
+
+
+def _print_incremental_stats(categorizer: TransactionCategorizer):
+    """Print how much work incremental mode saved."""
+    stats = categorizer.incremental_stats
+    print(f"\nIncremental run: {stats['categorized']} rows categorized, "
+          f"{stats['reused']} reused from previous runs")
+
+
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) < 2:
-        print("Usage: python categorize_transactions.py <input.csv> [output.csv]")
+        print("Usage: python categorize_transactions.py <input.csv> [output.csv] [chunksize] [workers] [state_file]")
         print("\nInput CSV must have columns: date, payee, amount")
         print("Optional columns: description")
+        print("Pass a chunksize to stream large files in bounded memory (0 = read whole file)")
+        print("Pass a state_file to only categorize rows that are new since the last run")
+        print("An output path ending in '/' is written as a Parquet ledger partitioned by month")
         sys.exit(1)
     
     input_file = sys.argv[1]
     output_file = sys.argv[2] if len(sys.argv) > 2 else None
+    ledger_dir = None
+    if output_file and output_file.endswith(('/', os.sep)):
+        ledger_dir, output_file = output_file, None
+    chunksize = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else 1
+    state_file = sys.argv[5] if len(sys.argv) > 5 else None
     
-    categorize_from_csv(input_file, output_file)
+    categorize_from_csv(input_file, output_file, chunksize, workers, state_file, ledger_dir)
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Duplicate Detection
+Finds transactions that were posted more than once.
+
+Transactions are blocked on exact amount (in cents) and a rolling date
+window, only pairs inside a block have their payees compared, and matching
+pairs are clustered with union-find, so a charge posted three times comes
+back as one cluster of three. Several files are scanned chunk by chunk
+through a rolling date window, so history never has to fit in memory.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from ledger_io import STATEMENT_COLUMNS, amount_cents, load_transactions
+from payee_similarity import PayeeSimilarity
+
+# Rows read from each file at a time by scan_files
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with path compression and union by size."""
+    
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+        self.size = [1] * n
+    
+    def find(self, x: int) -> int:
+        root = x
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+    
+    def add(self) -> int:
+        """Add a new singleton set and return its element."""
+        self.parent.append(len(self.parent))
+        self.size.append(1)
+        return len(self.parent) - 1
+    
+    def union(self, a: int, b: int) -> int:
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+    
+    def groups(self, members: Optional[List[int]] = None) -> List[List[int]]:
+        """Sets with more than one member (among `members`, default all), each sorted."""
+        by_root: Dict[int, List[int]] = {}
+        for x in (range(len(self.parent)) if members is None else members):
+            by_root.setdefault(self.find(x), []).append(x)
+        return [sorted(group) for group in by_root.values() if len(group) > 1]
+
+
+class DuplicateDetector:
+    """Blocked, clustered duplicate detection for one or many ledgers."""
+    
+    def __init__(
+        self,
+        days_window: int = 1,
+        threshold: float = 0.7,
+        similarity: Optional[PayeeSimilarity] = None
+    ):
+        """
+        Initialize the detector.
+        
+        Args:
+            days_window: Max days between two postings of the same charge
+                (0 = same day only)
+            threshold: Payee similarity above which a pair is a duplicate
+            similarity: Shared PayeeSimilarity (keeps its token cache warm)
+        """
+        self.days_window = days_window
+        self.threshold = threshold
+        self.similarity = similarity or PayeeSimilarity()
+    
+    def candidate_pairs(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pairs of rows with the same amount, at most days_window days apart.
+        
+        Rows are sorted once by (cents, day); each row's partners are the
+        rows after it up to searchsorted(key + days_window).
+        
+        Returns:
+            Tuple of (first positions, second positions)
+        """
+        cents = amount_cents(df).to_numpy(dtype='float64', na_value=np.nan)
+        dates = pd.to_datetime(df['date']).to_numpy(dtype='datetime64[D]')
+        valid = np.flatnonzero(~(np.isnan(cents) | np.isnat(dates)))
+        empty = np.array([], dtype=np.int64)
+        if len(valid) < 2:
+            return empty, empty
+        
+        days = dates[valid].astype(np.int64)
+        first_day = days.min()
+        span = days.max() - first_day + self.days_window + 1
+        keys = cents[valid].astype(np.int64) * span + (days - first_day)
+        order = np.argsort(keys, kind='stable')
+        keys, positions = keys[order], valid[order]
+        
+        lo = np.arange(1, len(keys) + 1)
+        hi = np.searchsorted(keys, keys + self.days_window, side='right')
+        counts = hi - lo
+        total = int(counts.sum())
+        if total == 0:
+            return empty, empty
+        
+        # Expand each [lo, hi) range into explicit pairs
+        starts = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        first = np.repeat(positions, counts)
+        second = positions[starts + np.arange(total)]
+        return np.minimum(first, second), np.maximum(first, second)
+    
+    def hit_pairs(self, df: pd.DataFrame, new_from: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Candidate pairs whose payees are similar enough to be duplicates.
+        
+        Args:
+            df: Transactions with date, payee and amount (or amount_cents)
+            new_from: Skip pairs where both rows are before this position
+                (they were already compared)
+        
+        Returns:
+            Tuple of (first positions, second positions)
+        """
+        first, second = self.candidate_pairs(df)
+        new = second >= new_from
+        first, second = first[new], second[new]
+        if len(first) == 0:
+            return first, second
+        
+        payees = df['payee'].to_numpy()
+        hits = self.similarity.score_pairs(payees[first], payees[second]) > self.threshold
+        return first[hits], second[hits]
+    
+    def find_clusters(self, df: pd.DataFrame) -> List[Dict]:
+        """
+        Cluster duplicate postings.
+        
+        Args:
+            df: Transactions with date, payee and amount (or amount_cents)
+        
+        Returns:
+            One dict per cluster, ordered by date then amount, with the
+            earliest 'date', the 'amount', and per-member 'dates', 'payees'
+            and 'index' labels (plus 'sources' when df has a 'source' column)
+        """
+        first, second = self.hit_pairs(df)
+        if len(first) == 0:
+            return []
+        
+        union_find = UnionFind(len(df))
+        for a, b in zip(first.tolist(), second.tolist()):
+            union_find.union(a, b)
+        members = np.unique(np.concatenate([first, second])).tolist()
+        return self._clusters(df, union_find.groups(members))
+    
+    def _clusters(self, df: pd.DataFrame, groups: List[List[int]]) -> List[Dict]:
+        """Cluster dicts for groups of row positions in df, ordered by date then amount."""
+        cents = amount_cents(df).to_numpy()
+        dates = pd.to_datetime(df['date'])
+        clusters = []
+        for group in groups:
+            cluster = {
+                'date': dates.iloc[group].min(),
+                'amount': int(cents[group[0]]) / 100,
+                'dates': dates.iloc[group].tolist(),
+                'payees': df['payee'].iloc[group].tolist(),
+                'index': df.index[group].tolist(),
+                'size': len(group),
+                'flag': 'Potential Duplicate'
+            }
+            if 'source' in df.columns:
+                cluster['sources'] = list(zip(df['source'].iloc[group].tolist(), df['row'].iloc[group].tolist()))
+            clusters.append(cluster)
+        
+        clusters.sort(key=lambda c: (c['date'], c['amount']))
+        return clusters
+    
+    def scan_files(self, paths: List[str], chunksize: int = DEFAULT_CHUNKSIZE) -> List[Dict]:
+        """
+        Detect duplicates across several ledgers without loading them whole.
+        
+        Files are read chunk by chunk, keeping only the key columns (date,
+        payee, cents). Each chunk is compared with itself and with the rows
+        of the last days_window days before it; only those rows are carried
+        to the next chunk, so memory is bounded by the chunk size plus the
+        window. Files must be given in date order, and no chunk may go back
+        before a day already read (rows inside a chunk may be unsorted).
+        
+        Args:
+            paths: Transaction CSVs or ledger directories, oldest first
+            chunksize: Rows read from each file at a time
+        
+        Returns:
+            Clusters as in find_clusters ('index' is the row's position
+            across all files); 'sources' lists (path, row) pairs
+        """
+        window_days = pd.Timedelta(days=self.days_window)
+        union_find = UnionFind(0)
+        node_of: Dict[int, int] = {}    # global row -> union-find element
+        members = []                    # narrow rows of every hit, for the report
+        carry = None
+        latest_day = None
+        offset = 0
+        
+        for path in paths:
+            row = 0
+            for chunk in load_transactions(path, STATEMENT_COLUMNS, chunksize=chunksize, columns=STATEMENT_COLUMNS, cents=True):
+                narrow = pd.DataFrame({
+                    'date': chunk['date'].to_numpy(),
+                    'payee': chunk['payee'].astype(object).to_numpy(),
+                    'amount_cents': chunk['amount_cents'].array,
+                    'source': path,
+                    'row': np.arange(row, row + len(chunk), dtype=np.int64),
+                }, index=pd.RangeIndex(offset, offset + len(chunk)))
+                row += len(chunk)
+                offset += len(chunk)
+                
+                # Undated rows never pair with anything
+                narrow = narrow[narrow['date'].notna()]
+                if narrow.empty:
+                    continue
+                days = narrow['date'].dt.normalize()
+                if latest_day is not None and days.min() < latest_day:
+                    raise ValueError(
+                        f"{path} goes back to {days.min():%Y-%m-%d} after {latest_day:%Y-%m-%d} was read; "
+                        "scan_files needs files in date order"
+                    )
+                
+                # Only pairs involving the new rows still need comparing
+                window = narrow if carry is None else pd.concat([carry, narrow])
+                first, second = self.hit_pairs(window, new_from=len(window) - len(narrow))
+                labels = window.index.to_numpy()
+                for a, b in zip(labels[first].tolist(), labels[second].tolist()):
+                    for label in (a, b):
+                        if label not in node_of:
+                            node_of[label] = union_find.add()
+                    union_find.union(node_of[a], node_of[b])
+                hit_rows = np.unique(np.concatenate([first, second]))
+                if len(hit_rows):
+                    members.append(window.iloc[hit_rows])
+                
+                # Later rows are no earlier than latest_day, so older rows cannot pair again
+                latest_day = days.max()
+                carry = window[window['date'].dt.normalize() >= latest_day - window_days]
+        
+        if not members:
+            return []
+        
+        found = pd.concat(members)
+        found = found[~found.index.duplicated()].sort_index()
+        position = pd.Series(np.arange(len(found)), index=found.index)
+        label_of = {node: label for label, node in node_of.items()}
+        groups = [
+            sorted(position[label_of[node]] for node in group)
+            for group in union_find.groups()
+        ]
+        return self._clusters(found, groups)
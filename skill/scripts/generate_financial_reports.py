@@ -4,10 +4,75 @@ Financial Report Generation Script
 Generates P&L, Balance Sheet, and Cash Flow reports.
 """
 
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from collections import defaultdict
+from ledger_io import REPORT_COLUMNS, amount_cents, load_transactions
+from rollup_cube import AggregateView
+
+# Per-category measures a plan is built from (mergeable by addition)
+CELL_MEASURES = ['sum', 'count', 'rows', 'negative_sum']
+
+# Periods per year for each comparison frequency (lag of the YoY columns)
+YOY_LAGS = {'M': 12, 'Q': 4, 'Y': 1}
+
+# KPI revenue counts categories whose name mentions one of these
+KPI_REVENUE_KEYWORDS = ('Sales', 'Service', 'Income')
+
+# Cash-flow activity for each chart-of-accounts section
+CASH_FLOW_SECTIONS = {
+    'Revenue': 'Operating',
+    'COGS': 'Operating',
+    'Operating Expenses': 'Operating',
+    'Investing': 'Investing',
+    'Financing': 'Financing',
+}
+
+# Categories outside the chart of accounts are classified by keyword
+CASH_FLOW_KEYWORDS = [
+    ('Investing', ('Equipment', 'Asset')),
+    ('Financing', ('Loan', 'Equity')),
+]
+
+@dataclass
+class ReportPlan:
+    """
+    Everything the reports read, aggregated once. Amounts are integer cents.
+    
+    Build it with FinancialReporter.plan(); every generate_* method accepts
+    a plan in place of transactions, so rendering all reports costs one
+    pass over the data.
+    """
+    category_totals: pd.Series       # per category, sorted; a missing category is kept
+    section_totals: pd.Series        # per chart-of-accounts section ('Unmapped' otherwise)
+    cash_flow_totals: pd.Series      # per cash-flow activity
+    kpi_revenue: int                 # categories matching KPI_REVENUE_KEYWORDS
+    total: int
+    negative_sum: int
+    count: int                       # transactions
+    amount_count: int                # transactions with an amount
+    first_date: Optional[pd.Timestamp] = None
+    last_date: Optional[pd.Timestamp] = None
+    
+    @property
+    def positive_sum(self) -> int:
+        return self.total - self.negative_sum
+    
+    @property
+    def mean(self) -> float:
+        """Mean transaction amount in cents (NaN without amounts)."""
+        return self.total / self.amount_count if self.amount_count else float('nan')
+    
+    def categories(self) -> pd.Series:
+        """Category totals without the missing-category row."""
+        return self.category_totals[self.category_totals.index.notna()]
+
+
+# Raw transactions, pre-aggregated cells from a RollupCube, or a ReportPlan
+ReportData = Union[pd.DataFrame, AggregateView, ReportPlan]
 
 class FinancialReporter:
     """Generates standard financial reports."""
@@ -39,31 +104,157 @@ class FinancialReporter:
             'Other OpEx': 'Operating Expenses',
         }
     
-    def generate_profit_loss(self, transactions_df: pd.DataFrame, period_name: str = "") -> str:
+    def plan(self, transactions_df: ReportData) -> ReportPlan:
         """
-        Generate Profit & Loss (Income Statement).
+        Aggregate transactions once for all reports.
         
         Args:
             transactions_df: DataFrame with columns: date, category, amount
+                (or amount_cents), an AggregateView, or an existing plan
+            
+        Returns:
+            ReportPlan
+        """
+        if isinstance(transactions_df, ReportPlan):
+            return transactions_df
+        if isinstance(transactions_df, AggregateView):
+            cells = transactions_df.cells.groupby('category', dropna=False)[CELL_MEASURES].sum()
+            periods = transactions_df.periods
+            first_date = pd.Period(periods[0], 'M').start_time if periods else None
+            last_date = pd.Period(periods[-1], 'M').end_time.normalize() if periods else None
+            return self._plan_from_cells(cells, first_date, last_date)
+        
+        cells, first_date, last_date = self._category_cells(transactions_df)
+        return self._plan_from_cells(cells, first_date, last_date)
+    
+    def plan_chunks(self, chunks: Iterable[pd.DataFrame]) -> ReportPlan:
+        """
+        Aggregate transactions chunk by chunk, for ledgers larger than memory.
+        
+        Each chunk is reduced to per-category cells and merged into a
+        running total, so only one chunk is held at a time. The plan (and
+        every report rendered from it) is the same as plan() on the whole
+        ledger.
+        
+        Args:
+            chunks: Transaction DataFrames, e.g. from load_transactions(chunksize=...)
+            
+        Returns:
+            ReportPlan
+        """
+        cells = pd.DataFrame(columns=CELL_MEASURES, dtype='int64')
+        first_date, last_date = None, None
+        
+        for chunk in chunks:
+            chunk_cells, chunk_first, chunk_last = self._category_cells(chunk)
+            chunk_cells.index = chunk_cells.index.astype(object)
+            cells = pd.concat([cells, chunk_cells])
+            cells = cells.groupby(cells.index, dropna=False).sum()
+            
+            if chunk_first is not None:
+                first_date = chunk_first if first_date is None else min(first_date, chunk_first)
+                last_date = chunk_last if last_date is None else max(last_date, chunk_last)
+        
+        cells.index.name = 'category'
+        return self._plan_from_cells(cells, first_date, last_date)
+    
+    def _category_cells(self, transactions_df: pd.DataFrame) -> Tuple[pd.DataFrame, Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """
+        Per-category cells (CELL_MEASURES, int64) and the date range of transactions.
+        
+        One groupby yields every per-category measure; the cells of two
+        sets of transactions add up to the cells of both.
+        """
+        cents = amount_cents(transactions_df).to_numpy(dtype='float64', na_value=np.nan)
+        frame = pd.DataFrame({'cents': cents, 'negative': np.minimum(cents, 0)}, index=transactions_df.index)
+        cells = frame.groupby(transactions_df['category'], observed=True, dropna=False).agg(
+            sum=('cents', 'sum'),
+            count=('cents', 'count'),
+            rows=('cents', 'size'),
+            negative_sum=('negative', 'sum'),
+        ).astype('int64')
+        
+        first_date, last_date = None, None
+        if 'date' in transactions_df.columns and len(transactions_df):
+            first_date, last_date = transactions_df['date'].min(), transactions_df['date'].max()
+            if pd.isna(first_date):
+                first_date, last_date = None, None
+        return cells, first_date, last_date
+    
+    def _plan_from_cells(self, cells: pd.DataFrame, first_date=None, last_date=None) -> ReportPlan:
+        """
+        Build a plan from per-category cells.
+        
+        Args:
+            cells: Indexed by category in sorted order, with CELL_MEASURES
+            first_date: Earliest transaction date
+            last_date: Latest transaction date
+        """
+        category_totals = cells['sum'].astype('int64')
+        categories = category_totals.index
+        
+        # Each distinct category is classified once
+        sections = [self.chart_of_accounts.get(category, 'Unmapped') for category in categories]
+        activities = [self.cash_flow_section(category) for category in categories]
+        is_revenue = np.array([
+            isinstance(category, str) and any(keyword in category for keyword in KPI_REVENUE_KEYWORDS)
+            for category in categories
+        ], dtype=bool)
+        
+        return ReportPlan(
+            category_totals=category_totals,
+            section_totals=category_totals.groupby(sections).sum(),
+            cash_flow_totals=category_totals.groupby(activities).sum(),
+            kpi_revenue=int(category_totals[is_revenue].sum()),
+            total=int(category_totals.sum()),
+            negative_sum=int(cells['negative_sum'].sum()),
+            count=int(cells['rows'].sum()),
+            amount_count=int(cells['count'].sum()),
+            first_date=first_date,
+            last_date=last_date,
+        )
+    
+    def cash_flow_section(self, category) -> str:
+        """
+        Cash-flow activity (Operating, Investing or Financing) of a category.
+        
+        Categories in the chart of accounts follow their section; others
+        are classified by keyword, defaulting to Operating.
+        """
+        section = CASH_FLOW_SECTIONS.get(self.chart_of_accounts.get(category))
+        if section:
+            return section
+        if isinstance(category, str):
+            for section, keywords in CASH_FLOW_KEYWORDS:
+                if any(keyword in category for keyword in keywords):
+                    return section
+        return 'Operating'
+    
+    def generate_profit_loss(self, transactions_df: ReportData, period_name: str = "") -> str:
+        """
+        Generate Profit & Loss (Income Statement).
+        
+        Args:
+            transactions_df: DataFrame with columns: date, category, amount,
+                an AggregateView from a RollupCube, or a ReportPlan
             period_name: Name of the period (e.g., "November 2024")
             
         Returns:
             Formatted P&L report
         """
-        # Group by category
-        by_category = transactions_df.groupby('category')['amount'].sum()
+        # Category totals in cents, so totals don't drift
+        plan = self.plan(transactions_df)
+        by_category = plan.categories()
         
         # Categorize into statement sections
-        revenue = 0
+        revenue = int(plan.section_totals.get('Revenue', 0))
         cogs = 0
-        opex = defaultdict(float)
+        opex = defaultdict(int)
         
         for category, amount in by_category.items():
             section = self.chart_of_accounts.get(category, 'Other OpEx')
             
-            if section == 'Revenue':
-                revenue += amount
-            elif section == 'COGS':
+            if section == 'COGS':
                 cogs += abs(amount)  # COGS is typically negative
             elif section == 'Operating Expenses':
                 opex[category] = abs(amount)
@@ -73,6 +264,12 @@ class FinancialReporter:
         total_opex = sum(opex.values())
         net_income = gross_profit - total_opex
         
+        # Back to dollars for display
+        by_category = by_category / 100
+        revenue, cogs, gross_profit = revenue / 100, cogs / 100, gross_profit / 100
+        opex = {category: amount / 100 for category, amount in opex.items()}
+        total_opex, net_income = total_opex / 100, net_income / 100
+        
         # Build report
         report = []
         report.append("=" * 60)
@@ -123,42 +320,29 @@ class FinancialReporter:
         
         return "\n".join(report)
     
-    def generate_cash_flow(self, transactions_df: pd.DataFrame, period_name: str = "") -> str:
+    def generate_cash_flow(self, transactions_df: ReportData, period_name: str = "") -> str:
         """
         Generate Cash Flow Statement.
         
         Args:
-            transactions_df: DataFrame with columns: date, category, amount
+            transactions_df: DataFrame with columns: date, category, amount,
+                an AggregateView from a RollupCube, or a ReportPlan
             period_name: Name of the period
             
         Returns:
             Formatted cash flow report
         """
-        # Sort by date
-        df_sorted = transactions_df.sort_values('date')
-        
-        # Calculate running balance
-        df_sorted['running_balance'] = df_sorted['amount'].cumsum()
-        
         starting_balance = 0  # Assume starting at 0 or get from previous period
-        ending_balance = df_sorted['running_balance'].iloc[-1]
         
-        # Categorize cash flows
-        operating = 0
-        investing = 0
-        financing = 0
+        # Ending balance is the sum of all flows (in cents); the input is not modified
+        plan = self.plan(transactions_df)
+        ending_balance = plan.total / 100
         
-        for _, row in df_sorted.iterrows():
-            category = row['category']
-            amount = row['amount']
-            
-            # Simple categorization (can be enhanced)
-            if 'Equipment' in category or 'Asset' in category:
-                investing += amount
-            elif 'Loan' in category or 'Equity' in category:
-                financing += amount
-            else:
-                operating += amount
+        # Cash flows by activity
+        by_section = plan.cash_flow_totals
+        operating = int(by_section.get('Operating', 0)) / 100
+        investing = int(by_section.get('Investing', 0)) / 100
+        financing = int(by_section.get('Financing', 0)) / 100
         
         # Build report
         report = []
@@ -195,10 +379,100 @@ class FinancialReporter:
         
         return "\n".join(report)
     
+    def period_pivot(self, transactions_df: Union[pd.DataFrame, AggregateView], freq: str = 'M') -> pd.DataFrame:
+        """
+        Category x period totals in integer cents, built with one groupby.
+        
+        Args:
+            transactions_df: DataFrame with columns: date, category, amount,
+                or an AggregateView from a RollupCube
+            freq: 'M' (month), 'Q' (quarter) or 'Y' (year)
+            
+        Returns:
+            DataFrame indexed by category (a missing category is kept) with
+            one column per period, gaps between the first and last period
+            filled with zero
+        """
+        if freq not in YOY_LAGS:
+            raise ValueError(f"freq must be one of {list(YOY_LAGS)}, got {freq!r}")
+        
+        if isinstance(transactions_df, AggregateView):
+            cells = transactions_df.cells
+            cents = cells['sum']
+            categories = cells['category']
+            periods = pd.Series(pd.PeriodIndex(cells['period'], freq='M').asfreq(freq), index=cells.index)
+        else:
+            cents = amount_cents(transactions_df)
+            categories = transactions_df['category']
+            periods = pd.to_datetime(transactions_df['date']).dt.to_period(freq)
+        
+        pivot = cents.groupby([categories, periods], observed=True, dropna=False).sum().unstack(fill_value=0)
+        pivot = pivot.loc[:, pivot.columns.notna()]
+        if len(pivot.columns):
+            pivot = pivot.reindex(columns=pd.period_range(pivot.columns.min(), pivot.columns.max(), freq=freq), fill_value=0)
+        pivot.index = pivot.index.astype(object)
+        pivot.index.name = 'category'
+        pivot.columns.name = 'period'
+        return pivot.astype('int64')
+    
+    def _period_changes(self, amounts: pd.DataFrame, lag: int) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Change and percent change of each column against the column `lag` places earlier.
+        
+        Percent change is 0 where the earlier amount is 0, and NaN where
+        there is no earlier column.
+        """
+        prior = amounts.shift(lag, axis=1)
+        change = amounts - prior
+        change_pct = (change / prior * 100).where(prior != 0, 0.0)
+        return change, change_pct
+    
+    def period_comparison(
+        self,
+        transactions_df: Union[pd.DataFrame, AggregateView],
+        freq: str = 'M',
+        periods: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Compare every category across N periods (e.g. trailing 12 months, 3 years of quarters).
+        
+        Args:
+            transactions_df: DataFrame with columns: date, category, amount,
+                or an AggregateView from a RollupCube
+            freq: 'M' (month), 'Q' (quarter) or 'Y' (year)
+            periods: Keep only the last N periods (changes still compare
+                against the periods before them)
+            
+        Returns:
+            DataFrame indexed by category plus a 'TOTAL' row, with (measure,
+            period) columns; measures are amount, change and change_pct
+            (vs the previous period) and yoy_change and yoy_pct (vs the same
+            period a year earlier), amounts in dollars
+        """
+        pivot = self.period_pivot(transactions_df, freq)
+        
+        # Rows with a category, then the total over all rows (uncategorized included)
+        amounts = pd.concat([pivot[pivot.index.notna()].sort_index(), pivot.sum().to_frame('TOTAL').T]) / 100
+        
+        change, change_pct = self._period_changes(amounts, 1)
+        yoy_change, yoy_pct = self._period_changes(amounts, YOY_LAGS[freq])
+        table = pd.concat({
+            'amount': amounts,
+            'change': change,
+            'change_pct': change_pct,
+            'yoy_change': yoy_change,
+            'yoy_pct': yoy_pct,
+        }, axis=1, names=['measure', 'period'])
+        
+        if periods:
+            keep = amounts.columns[-periods:]
+            table = table.loc[:, table.columns.get_level_values('period').isin(keep)]
+        return table
+    
     def generate_monthly_comparison(
         self, 
-        current_df: pd.DataFrame, 
-        previous_df: pd.DataFrame,
+        current_df: ReportData, 
+        previous_df: ReportData,
         current_month: str,
         previous_month: str
     ) -> str:
@@ -206,20 +480,25 @@ class FinancialReporter:
         Generate month-over-month comparison.
         
         Args:
-            current_df: Current month transactions
-            previous_df: Previous month transactions
+            current_df: Current month transactions (or AggregateView / ReportPlan)
+            previous_df: Previous month transactions (or AggregateView / ReportPlan)
             current_month: Name of current month
             previous_month: Name of previous month
             
         Returns:
             Formatted comparison report
         """
-        # Calculate totals for each month
-        current_by_cat = current_df.groupby('category')['amount'].sum()
-        previous_by_cat = previous_df.groupby('category')['amount'].sum()
-        
-        # Get all categories
-        all_categories = set(current_by_cat.index) | set(previous_by_cat.index)
+        # Two-period pivot of the category totals (exact, via cents)
+        current_plan = self.plan(current_df)
+        previous_plan = self.plan(previous_df)
+        by_category = pd.DataFrame({
+            0: previous_plan.categories(),
+            1: current_plan.categories(),
+        })
+        by_category.index = by_category.index.astype(object)
+        totals = pd.DataFrame([[previous_plan.total, current_plan.total]], index=['TOTAL'])
+        amounts = pd.concat([by_category.sort_index().fillna(0), totals]) / 100
+        change, change_pct = self._period_changes(amounts, 1)
         
         # Build comparison
         report = []
@@ -231,44 +510,29 @@ class FinancialReporter:
         report.append(f"{'Category':35} {previous_month:>15} {current_month:>15} {'Change':>12}")
         report.append("-" * 80)
         
-        for category in sorted(all_categories):
-            prev_amount = previous_by_cat.get(category, 0)
-            curr_amount = current_by_cat.get(category, 0)
-            change = curr_amount - prev_amount
-            change_pct = (change / prev_amount * 100) if prev_amount != 0 else 0
-            
+        rows = zip(amounts.index, amounts[0].tolist(), amounts[1].tolist(), change[1].tolist(), change_pct[1].tolist())
+        for position, (category, prev_amount, curr_amount, amount_change, amount_change_pct) in enumerate(rows):
+            if position == len(amounts) - 1:
+                report.append("=" * 80)
             report.append(
                 f"{category:35} ${prev_amount:>13,.2f} ${curr_amount:>13,.2f} "
-                f"${change:>10,.2f} ({change_pct:>5.1f}%)"
+                f"${amount_change:>10,.2f} ({amount_change_pct:>5.1f}%)"
             )
-        
-        # Totals
-        prev_total = previous_df['amount'].sum()
-        curr_total = current_df['amount'].sum()
-        total_change = curr_total - prev_total
-        total_change_pct = (total_change / prev_total * 100) if prev_total != 0 else 0
-        
-        report.append("=" * 80)
-        report.append(
-            f"{'TOTAL':35} ${prev_total:>13,.2f} ${curr_total:>13,.2f} "
-            f"${total_change:>10,.2f} ({total_change_pct:>5.1f}%)"
-        )
         report.append("=" * 80)
         
         return "\n".join(report)
     
-    def generate_kpis(self, transactions_df: pd.DataFrame) -> str:
-        """Generate key performance indicators."""
-        # Calculate KPIs
-        revenue = transactions_df[
-            transactions_df['category'].str.contains('Sales|Service|Income', na=False)
-        ]['amount'].sum()
-        
-        expenses = abs(transactions_df[transactions_df['amount'] < 0]['amount'].sum())
+    def generate_kpis(self, transactions_df: ReportData) -> str:
+        """Generate key performance indicators (from transactions, an AggregateView or a ReportPlan)."""
+        # Calculate KPIs (sums in cents)
+        plan = self.plan(transactions_df)
+        revenue = plan.kpi_revenue / 100
+        
+        expenses = abs(plan.negative_sum) / 100
         net_income = revenue - expenses
         
-        avg_daily_revenue = revenue / 30 if len(transactions_df) > 0 else 0
-        avg_transaction = transactions_df['amount'].mean()
+        avg_daily_revenue = revenue / 30 if plan.count > 0 else 0
+        avg_transaction = plan.mean / 100
         
         # Build report
         report = []
@@ -279,7 +543,7 @@ class FinancialReporter:
         report.append(f"Net Income:                 ${net_income:>12,.2f}")
         report.append(f"Average Daily Revenue:      ${avg_daily_revenue:>12,.2f}")
         report.append(f"Average Transaction:        ${avg_transaction:>12,.2f}")
-        report.append(f"Number of Transactions:     {len(transactions_df):>12}")
+        report.append(f"Number of Transactions:     {plan.count:>12}")
         
         if revenue > 0:
             report.append(f"Net Margin:                 {(net_income/revenue*100):>11.1f}%")
@@ -287,21 +551,47 @@ class FinancialReporter:
         return "\n".join(report)
 
 
-def generate_reports_from_csv(transactions_file: str, period_name: str = ""):
-    """Generate all reports from a transactions CSV."""
-    # Read transactions
-    df = pd.read_csv(transactions_file)
+def generate_reports_from_csv(
+    transactions_file: str,
+    period_name: str = "",
+    periods: Optional[List[str]] = None,
+    chunksize: Optional[int] = None
+):
+    """
+    Generate all reports from a transactions CSV or Parquet ledger.
     
-    # Initialize reporter
+    Args:
+        transactions_file: Path to a transactions CSV or ledger directory
+        period_name: Name of the period (e.g., "November 2024")
+        periods: Ledger only: 'YYYY-MM' partitions to report on (default: all)
+        chunksize: Aggregate the file this many rows at a time instead of
+            loading it whole (same reports, memory bounded by the chunk size)
+    """
     reporter = FinancialReporter()
     
+    # Only the report columns are read; a ledger also skips other months
+    if chunksize:
+        chunks = load_transactions(
+            transactions_file, REPORT_COLUMNS, chunksize=chunksize,
+            columns=REPORT_COLUMNS, periods=periods, cents=True
+        )
+        plan = reporter.plan_chunks(chunks)
+        print(f"Aggregated {plan.count:,} rows from {transactions_file} in chunks of {chunksize:,}")
+    else:
+        df = load_transactions(
+            transactions_file, REPORT_COLUMNS, report_memory=True,
+            columns=REPORT_COLUMNS, periods=periods, cents=True
+        )
+        # Aggregate once; every report renders from the same plan
+        plan = reporter.plan(df)
+    
     # Generate reports
     print("\n")
-    print(reporter.generate_profit_loss(df, period_name))
+    print(reporter.generate_profit_loss(plan, period_name))
     print("\n\n")
-    print(reporter.generate_cash_flow(df, period_name))
+    print(reporter.generate_cash_flow(plan, period_name))
     print("\n\n")
-    print(reporter.generate_kpis(df))
+    print(reporter.generate_kpis(plan))
     print("\n")
 
 
@@ -309,11 +599,14 @@ if __name__ == "__main__":
     import sys
     
     if len(sys.argv) < 2:
-        print("Usage: python generate_financial_reports.py <transactions.csv> [period_name]")
+        print("Usage: python generate_financial_reports.py <transactions.csv|ledger_dir> [period_name] [YYYY-MM,...|all] [chunksize]")
         print("\nTransactions CSV must have columns: date, category, amount")
+        print("Give a chunksize to aggregate files larger than memory in chunks")
         sys.exit(1)
     
     transactions_file = sys.argv[1]
     period_name = sys.argv[2] if len(sys.argv) > 2 else ""
+    periods = sys.argv[3].split(',') if len(sys.argv) > 3 and sys.argv[3] not in ('', 'all') else None
+    chunksize = int(sys.argv[4]) if len(sys.argv) > 4 else None
     
-    generate_reports_from_csv(transactions_file, period_name)
+    generate_reports_from_csv(transactions_file, period_name, periods, chunksize)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Ledger Ingest
+Shared, typed CSV loader used by the categorization, reconciliation and
+reporting scripts.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterator, List, Optional, Union
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Required columns for each kind of input (see docs/TECHNICAL_SPEC.md)
+TRANSACTION_COLUMNS = ['date', 'payee', 'amount']
+STATEMENT_COLUMNS = ['date', 'payee', 'amount']
+REPORT_COLUMNS = ['date', 'category', 'amount']
+
+# Low-cardinality text columns worth dictionary-encoding
+CATEGORICAL_COLUMNS = ['payee', 'category']
+
+# Fixed-point amount column (int64 cents) added by load_transactions(cents=True)
+CENTS_COLUMN = 'amount_cents'
+
+
+def load_transactions(
+    path: str,
+    required_columns: List[str] = TRANSACTION_COLUMNS,
+    chunksize: Optional[int] = None,
+    report_memory: bool = False,
+    columns: Optional[List[str]] = None,
+    periods: Optional[List[str]] = None,
+    cents: bool = False
+) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+    """
+    Load transactions with validated columns and typed data.
+
+    Dates are parsed once to datetime64, amounts to float64, and payee /
+    category are stored as categoricals. The pyarrow CSV engine is used
+    when it is installed (it does not support chunked reads). A directory
+    is read as a Parquet ledger (see ledger_store), in record batches when
+    chunksize is given.
+
+    Args:
+        path: Path to the CSV file or ledger directory
+        required_columns: Columns that must be present
+        chunksize: Yield typed chunks of this many rows instead of one frame
+        report_memory: Print memory use of the raw and typed frame
+        columns: Only load these columns (default: all)
+        periods: Ledger directories only: 'YYYY-MM' partitions to read
+        cents: Also store amounts as int64 cents in 'amount_cents'
+
+    Returns:
+        Typed DataFrame (with memory figures in ``df.attrs['memory_usage']``),
+        or an iterator of typed chunks when chunksize is given
+    """
+    is_ledger = os.path.isdir(path)
+    if is_ledger:
+        from ledger_store import ledger_columns
+        available = ledger_columns(path)
+    else:
+        available = list(pd.read_csv(path, nrows=0).columns)
+
+    missing = [col for col in required_columns if col not in available]
+    if missing:
+        raise ValueError(f"CSV must contain columns: {required_columns} (missing: {missing})")
+
+    if is_ledger and chunksize:
+        from ledger_store import iter_ledger
+        batches = iter_ledger(path, chunksize, columns=columns, periods=periods)
+        return (prepare_transactions(batch, cents) for batch in batches)
+    elif is_ledger:
+        from ledger_store import read_ledger
+        raw = read_ledger(path, columns=columns, periods=periods)
+    elif chunksize:
+        chunks = pd.read_csv(path, chunksize=chunksize, usecols=columns)
+        return (prepare_transactions(chunk, cents) for chunk in chunks)
+    elif HAS_PYARROW:
+        raw = pd.read_csv(path, engine='pyarrow', usecols=columns)
+    else:
+        raw = pd.read_csv(path, usecols=columns)
+
+    before = int(raw.memory_usage(deep=True).sum())
+    df = prepare_transactions(raw, cents)
+    after = int(df.memory_usage(deep=True).sum())
+    df.attrs['memory_usage'] = {'before': before, 'after': after}
+
+    if report_memory:
+        print(describe_memory(df, path))
+
+    return df
+
+
+def prepare_transactions(df: pd.DataFrame, cents: bool = False) -> pd.DataFrame:
+    """
+    Apply the typed schema to an already-loaded frame.
+
+    Args:
+        df: Raw transactions DataFrame
+        cents: Also add an int64 'amount_cents' column
+
+    Returns:
+        The same frame with typed 'date', 'amount', 'payee' and 'category'
+    """
+    if 'date' in df.columns and not pd.api.types.is_datetime64_any_dtype(df['date']):
+        df['date'] = parse_dates(df['date'])
+
+    if 'amount' in df.columns and not pd.api.types.is_float_dtype(df['amount']):
+        amounts = pd.to_numeric(df['amount'], errors='coerce')
+        bad = amounts.isna() & df['amount'].notna()
+        if bad.any():
+            raise ValueError(f"Invalid amounts: {df.loc[bad, 'amount'].head(3).tolist()}")
+        df['amount'] = amounts.astype('float64')
+
+    if cents and 'amount' in df.columns and CENTS_COLUMN not in df.columns:
+        df[CENTS_COLUMN] = to_cents(df['amount'])
+
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+
+    return df
+
+
+def to_cents(amounts: pd.Series) -> pd.Series:
+    """
+    Convert dollar amounts to integer cents, rounding half away from zero.
+
+    Args:
+        amounts: Float amounts
+
+    Returns:
+        int64 Series (nullable Int64 if any amount is missing)
+    """
+    values = amounts.to_numpy(dtype='float64') * 100
+    rounded = np.sign(values) * np.floor(np.abs(values) + 0.5)
+    if np.isnan(rounded).any():
+        return pd.Series(rounded, index=amounts.index).astype('Int64')
+    return pd.Series(rounded.astype('int64'), index=amounts.index)
+
+
+def amount_to_cents(amount: float) -> int:
+    """Scalar version of to_cents."""
+    value = float(amount) * 100
+    return int(np.sign(value) * np.floor(abs(value) + 0.5))
+
+
+def amount_cents(df: pd.DataFrame) -> pd.Series:
+    """The frame's amounts in cents: 'amount_cents' if loaded, else derived from 'amount'."""
+    if CENTS_COLUMN in df.columns:
+        return df[CENTS_COLUMN]
+    return to_cents(df['amount'])
+
+
+def parse_dates(dates: pd.Series) -> pd.Series:
+    """Parse a date column, fast path for ISO dates, flexible otherwise."""
+    try:
+        return pd.to_datetime(dates, format='ISO8601')
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(dates, format='mixed', errors='coerce')
+
+    bad = parsed.isna() & dates.notna()
+    if bad.any():
+        raise ValueError(f"Unparseable dates: {dates[bad].head(3).tolist()}")
+    return parsed
+
+
+def content_hashes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Vectorized 64-bit content hash of each row, independent of dtypes.
+
+    Dates are hashed as int64 nanoseconds, text (str, categorical or object)
+    as Python strings and other numbers as float64, with the columns in name
+    order, so a row hashes the same whether it came from a whole-file load,
+    a chunked load, a Parquet ledger or pd.to_datetime on a plain frame.
+    """
+    canonical = {}
+    for col in sorted(df.columns):
+        values = df[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            canonical[col] = values.to_numpy(dtype='datetime64[ns]').view('int64')
+        elif pd.api.types.is_bool_dtype(values) or pd.api.types.is_numeric_dtype(values):
+            canonical[col] = values.to_numpy(dtype='float64', na_value=np.nan)
+        else:
+            canonical[col] = values.astype(object).where(values.notna(), None).to_numpy(dtype=object)
+    return pd.util.hash_pandas_object(pd.DataFrame(canonical), index=False).to_numpy()
+
+
+def format_date(value) -> str:
+    """Render a date for reports: YYYY-MM-DD for midnight timestamps."""
+    if isinstance(value, pd.Timestamp) and value == value.normalize():
+        return value.strftime('%Y-%m-%d')
+    return str(value)
+
+
+def _format_bytes(n_bytes: int) -> str:
+    """Human-readable byte count."""
+    for unit in ('B', 'KB', 'MB'):
+        if n_bytes < 1024:
+            return f"{n_bytes:,.1f} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:,.1f} GB"
+
+
+def describe_memory(df: pd.DataFrame, label: str = "") -> str:
+    """One-line memory summary recorded by load_transactions."""
+    usage: Dict[str, int] = df.attrs.get('memory_usage', {})
+    before = usage.get('before', 0)
+    after = usage.get('after', int(df.memory_usage(deep=True).sum()))
+    source = f" from {label}" if label else ""
+    return f"Loaded {len(df):,} rows{source}: {_format_bytes(before)} raw -> {_format_bytes(after)} typed"
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Columnar Ledger Store
+Parquet ledger partitioned by year-month, shared between the categorizer
+(writer) and the reporter / reconciler (readers).
+
+Layout::
+
+    ledger/
+        period=2024-10/part-00000-0.parquet
+        period=2024-11/part-00000-0.parquet
+        ...
+
+Readers can project columns and prune partitions, so a P&L for one month
+only touches that month's files and only the columns it needs.
+
+Writes merge into the months they cover: a written row replaces the stored
+row with the same inputs (date, payee, amount, ...; the category may have
+changed), and stored rows the write does not mention are kept, so a daily
+export adds to its month instead of truncating it.
+"""
+
+import os
+import shutil
+import tempfile
+import pandas as pd
+from typing import Iterator, List, Optional
+from ledger_io import content_hashes
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+PARTITION_COLUMN = 'period'
+
+# Output columns left out of the key matching written rows to stored ones
+DERIVED_COLUMNS = ['category']
+
+
+def _require_pyarrow():
+    if not HAS_PYARROW:
+        raise ImportError("The Parquet ledger store requires pyarrow: pip install pyarrow")
+
+
+def period_of(dates: pd.Series) -> pd.Series:
+    """Year-month partition key ('YYYY-MM') for a datetime column."""
+    return dates.dt.to_period('M').astype(str)
+
+
+class LedgerWriter:
+    """
+    Writes a ledger in one or more chunks, then swaps it in.
+
+    Chunks are staged next to the ledger and only swapped in on commit(),
+    so a streamed write never leaves a month half rewritten. Months not
+    present in the written data are left untouched.
+    """
+
+    def __init__(self, root: str, replace: bool = False):
+        """
+        Initialize the writer.
+
+        Args:
+            root: Ledger directory (created if missing)
+            replace: Replace every written month with the written rows only,
+                dropping stored rows the write does not contain; by default
+                they are kept (see the module docstring)
+        """
+        _require_pyarrow()
+        self.root = root
+        self.replace = replace
+        os.makedirs(root, exist_ok=True)
+        self._staging = tempfile.mkdtemp(prefix='.staging-', dir=root)
+        self._chunks = 0
+        self.periods = set()
+
+    def write(self, transactions_df: pd.DataFrame):
+        """Stage one chunk of transactions (must have a datetime 'date' column)."""
+        if transactions_df.empty:
+            return
+
+        df = transactions_df.copy()
+        df[PARTITION_COLUMN] = period_of(df['date'])
+        self.periods.update(df[PARTITION_COLUMN].unique())
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        pq.write_to_dataset(
+            table,
+            root_path=self._staging,
+            partition_cols=[PARTITION_COLUMN],
+            basename_template=f"part-{self._chunks:05d}-{{i}}.parquet",
+        )
+        self._chunks += 1
+
+    def commit(self) -> List[str]:
+        """
+        Swap the staged months in, merged with the stored rows unless replacing.
+
+        Returns:
+            Sorted list of the periods written
+        """
+        for period in sorted(self.periods):
+            partition = f"{PARTITION_COLUMN}={period}"
+            live = os.path.join(self.root, partition)
+            staged = os.path.join(self._staging, partition)
+            if os.path.exists(live):
+                if not self.replace:
+                    self._keep_unmatched(live, staged)
+                shutil.rmtree(live)
+            os.replace(staged, live)
+
+        shutil.rmtree(self._staging, ignore_errors=True)
+        return sorted(self.periods)
+
+    def _keep_unmatched(self, live: str, staged: str):
+        """Stage the stored rows of one month that no written row replaces."""
+        stored = pd.read_parquet(live)
+        written = pd.read_parquet(staged)
+        key_columns = [col for col in written.columns if col in stored.columns and col not in DERIVED_COLUMNS]
+        stored_keys = pd.Series(content_hashes(stored[key_columns]))
+        written_counts = pd.Series(content_hashes(written[key_columns])).value_counts()
+
+        # The n-th stored copy of a row survives if fewer than n copies were written
+        occurrence = stored_keys.groupby(stored_keys).cumcount()
+        replaced = stored_keys.map(written_counts).fillna(0)
+        kept = stored[(occurrence >= replaced).to_numpy()]
+        if len(kept):
+            table = pa.Table.from_pandas(kept, preserve_index=False)
+            pq.write_table(table, os.path.join(staged, "part-stored-0.parquet"))
+
+    def abort(self):
+        """Drop everything staged so far."""
+        shutil.rmtree(self._staging, ignore_errors=True)
+
+
+def write_ledger(transactions_df: pd.DataFrame, root: str, replace: bool = False) -> List[str]:
+    """
+    Write transactions to the ledger, merged into the months they cover.
+
+    Args:
+        transactions_df: Transactions with a datetime 'date' column
+        root: Ledger directory
+        replace: Drop the stored rows of those months first (see LedgerWriter)
+
+    Returns:
+        Sorted list of the periods written
+    """
+    writer = LedgerWriter(root, replace=replace)
+    try:
+        writer.write(transactions_df)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.commit()
+
+
+def _dataset(root: str):
+    _require_pyarrow()
+    return ds.dataset(
+        root,
+        format='parquet',
+        partitioning='hive',
+        # Skip staging directories of writers that are still running
+        exclude_invalid_files=True,
+        ignore_prefixes=['.', '_'],
+    )
+
+
+def ledger_columns(root: str) -> List[str]:
+    """Column names stored in the ledger (without the partition key)."""
+    return [name for name in _dataset(root).schema.names if name != PARTITION_COLUMN]
+
+
+def list_periods(root: str) -> List[str]:
+    """Sorted list of the periods present in the ledger."""
+    if not os.path.isdir(root):
+        return []
+    prefix = f"{PARTITION_COLUMN}="
+    return sorted(
+        name[len(prefix):] for name in os.listdir(root) if name.startswith(prefix)
+    )
+
+
+def read_ledger(
+    root: str,
+    columns: Optional[List[str]] = None,
+    periods: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Read transactions from the ledger.
+
+    Args:
+        root: Ledger directory
+        columns: Only read these columns (default: all stored columns)
+        periods: Only read these 'YYYY-MM' partitions (default: all)
+
+    Returns:
+        DataFrame in period order
+    """
+    dataset = _dataset(root)
+    if columns is None:
+        columns = ledger_columns(root)
+
+    table = dataset.to_table(columns=list(columns), filter=_partition_filter(periods))
+    return table.to_pandas()
+
+
+def iter_ledger(
+    root: str,
+    batch_size: int,
+    columns: Optional[List[str]] = None,
+    periods: Optional[List[str]] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Read transactions from the ledger in batches of at most batch_size rows.
+
+    Only one batch is read ahead, so memory stays bounded by the batch
+    size however large the ledger is. Batches are not in period order.
+
+    Args:
+        root: Ledger directory
+        batch_size: Rows per batch
+        columns: Only read these columns (default: all stored columns)
+        periods: Only read these 'YYYY-MM' partitions (default: all)
+
+    Yields:
+        One DataFrame per batch
+    """
+    dataset = _dataset(root)
+    if columns is None:
+        columns = ledger_columns(root)
+
+    batches = dataset.to_batches(
+        columns=list(columns),
+        filter=_partition_filter(periods),
+        batch_size=batch_size,
+        batch_readahead=1,
+        fragment_readahead=1,
+    )
+    for batch in batches:
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def _partition_filter(periods: Optional[List[str]]):
+    """Dataset filter selecting the given periods (None: all)."""
+    if periods is None:
+        return None
+    return ds.field(PARTITION_COLUMN).isin([str(p) for p in periods])
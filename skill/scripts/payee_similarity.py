@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Payee Similarity
+Scores how alike two payee names are, for reconciliation and duplicate
+detection.
+
+Each distinct payee is normalized (lowercased, split into words) once and
+cached (least recently used entries are evicted past a size limit, so a
+long stream of one-off payees stays bounded), pairs are scored in batches, and MinHash/LSH blocking over
+character shingles narrows a large vendor list down to the pairs worth
+scoring.
+"""
+
+import zlib
+import numpy as np
+import pandas as pd
+from collections import OrderedDict, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Prime just above 2**32 for the MinHash permutations (a * x stays below 2**64)
+_HASH_PRIME = np.uint64(4294967311)
+
+
+def _score_tokens(tokens1: Tuple[str, FrozenSet[str]], tokens2: Tuple[str, FrozenSet[str]]) -> float:
+    """PayeeSimilarity.score on already-normalized payees."""
+    text1, words1 = tokens1
+    text2, words2 = tokens2
+    
+    # Exact match
+    if text1 == text2:
+        return 1.0
+    
+    # Contains match
+    if text1 in text2 or text2 in text1:
+        return 0.8
+    
+    # Word overlap
+    if not words1 or not words2:
+        return 0.0
+    
+    overlap = len(words1 & words2)
+    return overlap / max(len(words1), len(words2))
+
+
+class PayeeSimilarity:
+    """Cached payee normalization, batched scoring and LSH blocking."""
+    
+    def __init__(
+        self,
+        bands: int = 32,
+        rows: int = 2,
+        shingle_size: int = 3,
+        seed: int = 1,
+        max_cache_size: int = 100_000
+    ):
+        """
+        Initialize the similarity engine.
+        
+        Args:
+            bands: LSH bands (more bands = higher recall, more candidates)
+            rows: MinHash values per band (more rows = fewer false candidates)
+            shingle_size: Characters per shingle for MinHash
+            seed: Seed for the MinHash permutations
+            max_cache_size: Payees kept in each of the normalization and
+                signature caches
+        """
+        if max_cache_size < 1:
+            raise ValueError("max_cache_size must be at least 1")
+        
+        self.bands = bands
+        self.rows = rows
+        self.shingle_size = shingle_size
+        
+        rng = np.random.default_rng(seed)
+        num_perm = bands * rows
+        self._perm_a = rng.integers(1, 2**32 - 1, num_perm, dtype=np.uint64)
+        self._perm_b = rng.integers(0, 2**32 - 1, num_perm, dtype=np.uint64)
+        
+        self.max_cache_size = max_cache_size
+        self._tokens: Dict[str, Tuple[str, FrozenSet[str]]] = OrderedDict()
+        self._signatures: Dict[str, np.ndarray] = OrderedDict()
+    
+    def _remember(self, cache: OrderedDict, key: str, value):
+        """Insert into a cache, evicting the least recently used entry."""
+        cache[key] = value
+        if len(cache) > self.max_cache_size:
+            cache.popitem(last=False)
+    
+    def normalize(self, payee) -> Tuple[str, FrozenSet[str]]:
+        """
+        Lowercased text and word set for a payee, computed once per payee.
+        
+        Args:
+            payee: Payee name
+        
+        Returns:
+            Tuple of (lowercased text, set of words)
+        """
+        key = str(payee)
+        tokens = self._tokens.get(key)
+        if tokens is None:
+            text = key.lower()
+            tokens = (text, frozenset(text.split()))
+            self._remember(self._tokens, key, tokens)
+        else:
+            self._tokens.move_to_end(key)
+        return tokens
+    
+    def score(self, payee1, payee2) -> float:
+        """
+        Similarity between two payees.
+        
+        1.0 for the same name, 0.8 when one contains the other, otherwise the
+        share of words in common (relative to the longer name).
+        """
+        return _score_tokens(self.normalize(payee1), self.normalize(payee2))
+    
+    def score_pairs(self, payees1: Sequence, payees2: Sequence) -> np.ndarray:
+        """
+        Score many pairs at once; each distinct pair of names is scored once.
+        
+        Args:
+            payees1: Left-hand payees
+            payees2: Right-hand payees (same length)
+        
+        Returns:
+            float64 array of scores, one per pair
+        """
+        if len(payees1) != len(payees2):
+            raise ValueError(f"Got {len(payees1)} left payees but {len(payees2)} right payees")
+        if len(payees1) == 0:
+            return np.array([], dtype='float64')
+        
+        codes1, names1 = pd.factorize(np.asarray(payees1, dtype=object), use_na_sentinel=False)
+        codes2, names2 = pd.factorize(np.asarray(payees2, dtype=object), use_na_sentinel=False)
+        pair_keys = codes1.astype(np.int64) * len(names2) + codes2
+        unique_keys, inverse = np.unique(pair_keys, return_inverse=True)
+        
+        tokens1 = [self.normalize(name) for name in names1]
+        tokens2 = [self.normalize(name) for name in names2]
+        width = len(names2)
+        scores = np.fromiter(
+            (_score_tokens(tokens1[key // width], tokens2[key % width]) for key in unique_keys.tolist()),
+            dtype='float64',
+            count=len(unique_keys)
+        )
+        return scores[inverse]
+    
+    def signature(self, payee) -> np.ndarray:
+        """
+        MinHash signature of a payee's character shingles (cached).
+        
+        Args:
+            payee: Payee name
+        
+        Returns:
+            uint64 array of length bands * rows
+        """
+        text, _ = self.normalize(payee)
+        signature = self._signatures.get(text)
+        if signature is None:
+            # Whole words catch reordered names, character shingles catch
+            # near-spellings and one name containing another
+            padded = f" {text} "
+            size = self.shingle_size
+            shingles = {padded[i:i + size] for i in range(max(len(padded) - size + 1, 1))}
+            shingles.update(f"#{word}" for word in text.split())
+            hashes = np.array([zlib.crc32(s.encode('utf-8')) for s in shingles], dtype=np.uint64)
+            
+            # h_i(x) = (a_i * x + b_i) mod p, minimized over the shingles
+            permuted = (np.outer(self._perm_a, hashes) % _HASH_PRIME + self._perm_b[:, None]) % _HASH_PRIME
+            signature = permuted.min(axis=1)
+            self._remember(self._signatures, text, signature)
+        else:
+            self._signatures.move_to_end(text)
+        return signature
+    
+    def lsh_candidates(self, payees1: Iterable, payees2: Optional[Iterable] = None) -> Set[Tuple[int, int]]:
+        """
+        Pairs of payees that share at least one LSH band.
+        
+        Use this to block a large vendor list before scoring: names with a
+        shingle Jaccard similarity above roughly (1 / bands) ** (1 / rows)
+        are very likely to come back as a candidate, while unrelated names
+        almost never do.
+        
+        Args:
+            payees1: First list of payees
+            payees2: Second list (default: pairs within payees1)
+        
+        Returns:
+            Set of (i, j) positions; with one list, i < j
+        """
+        left = list(payees1)
+        right = left if payees2 is None else list(payees2)
+        
+        buckets: Dict[Tuple[int, bytes], List[List[int]]] = defaultdict(lambda: [[], []])
+        for side, payees in enumerate([left] if payees2 is None else [left, right]):
+            for position, payee in enumerate(payees):
+                signature = self.signature(payee)
+                for band in range(self.bands):
+                    key = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                    buckets[key][side].append(position)
+        
+        candidates: Set[Tuple[int, int]] = set()
+        for members_left, members_right in buckets.values():
+            if payees2 is None:
+                for k, i in enumerate(members_left):
+                    for j in members_left[k + 1:]:
+                        candidates.add((i, j) if i < j else (j, i))
+            else:
+                for i in members_left:
+                    for j in members_right:
+                        candidates.add((i, j))
+        return candidates
+    
+    def similar_pairs(
+        self,
+        payees1: Sequence,
+        payees2: Optional[Sequence] = None,
+        threshold: float = 0.6
+    ) -> List[Tuple[int, int, float]]:
+        """
+        LSH-blocked search for payee pairs scoring above a threshold.
+        
+        Args:
+            payees1: First list of payees
+            payees2: Second list (default: pairs within payees1)
+            threshold: Minimum score (exclusive), e.g. 0.6 for reconciliation
+        
+        Returns:
+            Sorted list of (i, j, score)
+        """
+        left = list(payees1)
+        right = left if payees2 is None else list(payees2)
+        candidates = sorted(self.lsh_candidates(left, None if payees2 is None else right))
+        if not candidates:
+            return []
+        
+        first, second = zip(*candidates)
+        scores = self.score_pairs([left[i] for i in first], [right[j] for j in second])
+        return [
+            (i, j, float(score))
+            for (i, j), score in zip(candidates, scores)
+            if score > threshold
+        ]
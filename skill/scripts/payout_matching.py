@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Payout Matching
+Many-to-one reconciliation: one bank deposit (e.g. a Stripe or PayPal
+payout) against the several book entries it settles.
+
+For each unmatched deposit from a payout processor (a positive statement
+line whose payee names one, e.g. Stripe or PayPal; withdrawals and other
+deposits are not searched, since with dozens of candidates almost any
+amount is some subset's sum), unmatched book lines from the days before it
+are searched for a subset whose amounts add up to the deposit exactly, in
+integer cents. The subset-sum search picks a strategy by size:
+
+- up to MITM_MAX_ITEMS candidates: meet-in-the-middle over the two halves
+- more, all with the deposit's sign: dynamic programming over cents
+- otherwise: depth-first search pruned by the reachable range
+
+Every search runs under a per-deposit time budget, and the deposits of one
+call share a total budget, so busy processor accounts cannot stall a
+reconciliation.
+"""
+
+import re
+import time
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+from ledger_io import amount_cents
+from payee_similarity import PayeeSimilarity
+
+# Meet-in-the-middle enumerates 2 ** (n / 2) sums per half
+MITM_MAX_ITEMS = 32
+
+# Largest DP table (candidates x target cents) to build
+MAX_DP_CELLS = 50_000_000
+
+# Deposit payees (lowercased substrings) that mark a batched payout
+PAYOUT_PROCESSORS = ('stripe', 'paypal', 'square', 'shopify', 'venmo', 'adyen', 'braintree', 'gumroad', 'etsy')
+
+
+class SearchTimeout(Exception):
+    """Raised internally when a subset-sum search exceeds its budget."""
+
+
+def _half_sums(values: np.ndarray):
+    """Sums and sizes of all subsets; entry i is the subset whose bits are set in i."""
+    sums = np.zeros(1, dtype=np.int64)
+    sizes = np.zeros(1, dtype=np.int64)
+    for value in values:
+        sums = np.concatenate([sums, sums + value])
+        sizes = np.concatenate([sizes, sizes + 1])
+    return sums, sizes
+
+
+def _meet_in_the_middle(values: np.ndarray, target: int, min_items: int) -> Optional[List[int]]:
+    half = len(values) // 2
+    left_sums, left_sizes = _half_sums(values[:half])
+    right_sums, right_sizes = _half_sums(values[half:])
+
+    # Sort the right half by sum, largest subset first among equal sums
+    order = np.lexsort((-right_sizes, right_sums))
+    sorted_sums = right_sums[order]
+
+    need = target - left_sums
+    pos = np.searchsorted(sorted_sums, need)
+    pos_ok = pos < len(sorted_sums)
+    found = np.flatnonzero(pos_ok & (sorted_sums[np.minimum(pos, len(sorted_sums) - 1)] == need))
+    if len(found) == 0:
+        return None
+
+    sizes = left_sizes[found] + right_sizes[order[pos[found]]]
+    best = int(np.argmax(sizes))
+    if sizes[best] < min_items:
+        return None
+
+    left_mask = int(found[best])
+    right_mask = int(order[pos[found[best]]])
+    return (
+        [i for i in range(half) if left_mask >> i & 1] +
+        [half + i for i in range(len(values) - half) if right_mask >> i & 1]
+    )
+
+
+def _dynamic_programming(values: np.ndarray, target: int, deadline: float) -> Optional[List[int]]:
+    """Values and target share a sign; items equal to the target are skipped (two or more items)."""
+    sign = 1 if target > 0 else -1
+    target = abs(target)
+    magnitudes = values * sign
+    usable = np.flatnonzero((magnitudes > 0) & (magnitudes < target))
+
+    reached_by = np.full(target + 1, -1, dtype=np.int64)
+    reachable = np.zeros(target + 1, dtype=bool)
+    reachable[0] = True
+    for item in usable:
+        if time.perf_counter() > deadline:
+            raise SearchTimeout()
+        value = int(magnitudes[item])
+        # Sums first reachable with this item (0/1: shift the previous state)
+        new = np.flatnonzero(reachable[:target + 1 - value] & ~reachable[value:]) + value
+        reachable[new] = True
+        reached_by[new] = item
+        if reachable[target]:
+            break
+
+    if not reachable[target]:
+        return None
+
+    subset, remaining = [], target
+    while remaining > 0:
+        item = int(reached_by[remaining])
+        subset.append(item)
+        remaining -= int(magnitudes[item])
+    return sorted(subset)
+
+
+def _pruned_search(values: np.ndarray, target: int, min_items: int, deadline: float) -> Optional[List[int]]:
+    order = np.argsort(-np.abs(values), kind='stable')
+    ordered = values[order].tolist()
+    # Range of sums still reachable from position i onwards
+    positives = np.cumsum(np.clip(values[order], 0, None)[::-1])[::-1].tolist() + [0]
+    negatives = np.cumsum(np.clip(values[order], None, 0)[::-1])[::-1].tolist() + [0]
+    chosen: List[int] = []
+    visited = 0
+
+    def search(i: int, total: int) -> bool:
+        nonlocal visited
+        visited += 1
+        if visited % 4096 == 0 and time.perf_counter() > deadline:
+            raise SearchTimeout()
+        if total == target and len(chosen) >= min_items:
+            return True
+        if i == len(ordered) or not (total + negatives[i] <= target <= total + positives[i]):
+            return False
+        chosen.append(i)
+        if search(i + 1, total + ordered[i]):
+            return True
+        chosen.pop()
+        return search(i + 1, total)
+
+    if not search(0, 0):
+        return None
+    return sorted(int(order[i]) for i in chosen)
+
+
+def find_subset_sum(
+    values: np.ndarray,
+    target: int,
+    min_items: int = 2,
+    time_budget: float = 1.0,
+    max_dp_cells: int = MAX_DP_CELLS
+) -> Optional[List[int]]:
+    """
+    Find a subset of integer amounts that adds up to the target exactly.
+
+    Args:
+        values: Candidate amounts in cents
+        target: Amount to reach, in cents
+        min_items: Smallest subset to accept
+        time_budget: Seconds before giving up
+        max_dp_cells: Size limit for the dynamic-programming table
+
+    Returns:
+        Sorted positions of the subset, or None if none was found in budget
+    """
+    values = np.asarray(values, dtype=np.int64)
+    if len(values) < min_items or target == 0:
+        return None
+
+    deadline = time.perf_counter() + time_budget
+    try:
+        if len(values) <= MITM_MAX_ITEMS:
+            return _meet_in_the_middle(values, target, min_items)
+        same_sign = bool(np.all(values * np.sign(target) >= 0))
+        if same_sign and min_items <= 2 and abs(target) * len(values) <= max_dp_cells:
+            return _dynamic_programming(values, target, deadline)
+        return _pruned_search(values, target, min_items, deadline)
+    except (SearchTimeout, RecursionError):
+        return None
+
+
+class PayoutMatcher:
+    """Matches single deposits against batches of book entries."""
+    
+    def __init__(
+        self,
+        days_window: int = 7,
+        max_items: int = 60,
+        time_budget: float = 1.0,
+        total_budget: Optional[float] = 10.0,
+        payee_threshold: Optional[float] = None,
+        processors: Optional[Iterable[str]] = PAYOUT_PROCESSORS,
+        similarity: Optional[PayeeSimilarity] = None
+    ):
+        """
+        Initialize the matcher.
+        
+        Args:
+            days_window: Book entries up to this many days before the deposit
+                (or on its date) can be part of it
+            max_items: Candidates per deposit (the closest in date are kept)
+            time_budget: Seconds of subset-sum search per deposit
+            total_budget: Seconds of search for all deposits of one
+                find_matches call (None: no cap); deposits left when it runs
+                out are not searched and stay unmatched
+            payee_threshold: Book payees must score above this against the
+                deposit's payee; None (default) considers every payee, since
+                the entries a payout settles usually carry customer names
+                rather than the processor's
+            processors: Only deposits whose payee contains one of these
+                (case-insensitive) are searched; None searches every deposit,
+                which matches unrelated deposits to chance subsets
+            similarity: Shared PayeeSimilarity
+        """
+        self.days_window = days_window
+        self.max_items = max_items
+        self.time_budget = time_budget
+        self.total_budget = total_budget
+        self.payee_threshold = payee_threshold
+        self.processors = None if processors is None else re.compile(
+            '|'.join(re.escape(name.lower()) for name in processors)
+        )
+        self.similarity = similarity or PayeeSimilarity()
+        self.skipped = 0
+    
+    def find_matches(self, statement_df: pd.DataFrame, books_df: pd.DataFrame) -> List[Dict]:
+        """
+        Find deposits that equal the sum of two or more book entries.
+        
+        Each book entry is used by at most one deposit; deposits are
+        processed in date order. Withdrawals, and deposits not from one of
+        self.processors, are not searched. If the total
+        budget runs out, the remaining deposits are left unmatched and
+        counted in self.skipped.
+        
+        Args:
+            statement_df: Unmatched statement transactions
+            books_df: Unmatched books transactions
+        
+        Returns:
+            One dict per deposit with 'statement_index' and the list of
+            'books_index' labels it settles
+        """
+        matches = []
+        self.skipped = 0
+        if statement_df.empty or len(books_df) < 2:
+            return matches
+        
+        book_dates = pd.to_datetime(books_df['date']).to_numpy(dtype='datetime64[D]')
+        book_cents = amount_cents(books_df).to_numpy(dtype='float64', na_value=np.nan)
+        book_order = np.argsort(book_dates, kind='stable')
+        sorted_dates = book_dates[book_order]
+        # Payee filter per distinct statement payee, over distinct book payees
+        book_payee_codes, book_payee_names = pd.factorize(books_df['payee'].astype(object), use_na_sentinel=False)
+        payee_masks: Dict[str, np.ndarray] = {}
+        used = np.isnan(book_cents) | np.isnat(book_dates)
+        
+        stmt_dates = pd.to_datetime(statement_df['date']).to_numpy(dtype='datetime64[D]')
+        stmt_cents = amount_cents(statement_df).to_numpy(dtype='float64', na_value=np.nan)
+        window = np.timedelta64(self.days_window, 'D')
+        deadline = time.perf_counter() + self.total_budget if self.total_budget is not None else None
+        
+        searchable = (stmt_cents > 0) & ~np.isnat(stmt_dates)
+        if self.processors is not None:
+            payees = statement_df['payee'].astype(object).fillna('').astype(str).str.lower()
+            searchable &= payees.str.contains(self.processors).to_numpy(dtype=bool)
+        deposits = np.flatnonzero(searchable)
+        deposits = deposits[np.argsort(stmt_dates[deposits], kind='stable')]
+        for searched, position in enumerate(deposits):
+            target, date = stmt_cents[position], stmt_dates[position]
+            budget = self.time_budget
+            if deadline is not None:
+                budget = min(budget, deadline - time.perf_counter())
+                if budget <= 0:
+                    self.skipped = len(deposits) - searched
+                    break
+            
+            lo = np.searchsorted(sorted_dates, date - window, side='left')
+            hi = np.searchsorted(sorted_dates, date, side='right')
+            candidates = book_order[lo:hi]
+            candidates = candidates[~used[candidates]]
+            
+            if self.payee_threshold is not None and len(candidates):
+                stmt_payee = str(statement_df['payee'].iloc[position])
+                if stmt_payee not in payee_masks:
+                    scores = self.similarity.score_pairs([stmt_payee] * len(book_payee_names), book_payee_names)
+                    payee_masks[stmt_payee] = scores > self.payee_threshold
+                candidates = candidates[payee_masks[stmt_payee][book_payee_codes[candidates]]]
+            if len(candidates) < 2:
+                continue
+            
+            # Keep the entries closest to the deposit date
+            candidates = candidates[np.argsort(date - book_dates[candidates], kind='stable')][:self.max_items]
+            candidates = np.sort(candidates)
+            
+            subset = find_subset_sum(book_cents[candidates].astype(np.int64), int(target), time_budget=budget)
+            if subset is None:
+                continue
+            
+            rows = candidates[subset]
+            used[rows] = True
+            matches.append({
+                'statement_index': statement_df.index[position],
+                'statement_date': statement_df['date'].iloc[position],
+                'statement_payee': statement_df['payee'].iloc[position],
+                'statement_amount': float(statement_df['amount'].iloc[position]),
+                'books_index': books_df.index[rows].tolist(),
+                'books_count': len(rows),
+                'status': 'Batched Payout Match'
+            })
+        
+        return matches
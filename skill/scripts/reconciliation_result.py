@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Reconciliation Result
+The outcome of one reconciliation, computed once and rendered many ways.
+
+BankReconciliation.reconcile returns a ReconciliationResult. The text report,
+JSON, open-items CSV and Excel workbook are all rendered from it, and the
+tables they share are built on first use and cached, so producing several
+formats costs a single reconciliation pass.
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import cached_property
+from typing import Dict, List, Optional
+from ledger_io import amount_cents, format_date
+
+# Output formats by file extension (see ReconciliationResult.save)
+OUTPUT_FORMATS = {'.txt': 'text', '.json': 'json', '.csv': 'csv', '.xlsx': 'excel'}
+
+
+def _jsonable(value):
+    """json.dumps fallback for pandas / numpy scalars."""
+    if isinstance(value, pd.Timestamp):
+        return format_date(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    return str(value)
+
+
+@dataclass
+class ReconciliationResult:
+    """Matches, open items, duplicates and balance components of one reconciliation."""
+
+    period_start: Optional[pd.Timestamp]
+    period_end: Optional[pd.Timestamp]
+    statement_count: int
+    books_count: int
+    exact_matches: List[Dict]
+    fuzzy_matches: List[Dict]
+    payout_matches: List[Dict]
+    unmatched_statement: pd.DataFrame
+    unmatched_books: pd.DataFrame
+    statement_duplicates: List[Dict]
+    books_duplicates: List[Dict]
+    statement_ending_balance: float
+    outstanding_checks_cents: int
+    deposits_in_transit_cents: int
+    adjusted_balance_cents: int
+    book_balance_cents: int
+    variance_cents: int
+    generated: datetime = field(default_factory=datetime.now)
+
+    @property
+    def reconciled(self) -> bool:
+        return self.variance_cents == 0
+
+    def summary(self) -> Dict:
+        """Counts and balance components (dollars) as a flat dict."""
+        return {
+            'period_start': self.period_start,
+            'period_end': self.period_end,
+            'statement_transactions': self.statement_count,
+            'books_transactions': self.books_count,
+            'exact_matches': len(self.exact_matches),
+            'potential_matches': len(self.fuzzy_matches),
+            'batched_payouts': len(self.payout_matches),
+            'statement_only': len(self.unmatched_statement),
+            'books_only': len(self.unmatched_books),
+            'duplicates': len(self.statement_duplicates) + len(self.books_duplicates),
+            'statement_ending_balance': self.statement_ending_balance,
+            'outstanding_checks': self.outstanding_checks_cents / 100,
+            'deposits_in_transit': self.deposits_in_transit_cents / 100,
+            'adjusted_balance': self.adjusted_balance_cents / 100,
+            'book_balance': self.book_balance_cents / 100,
+            'variance': self.variance_cents / 100,
+            'reconciled': self.reconciled,
+        }
+
+    # Tables shared by the renderers, built on first use
+
+    @cached_property
+    def open_items(self) -> pd.DataFrame:
+        """Unmatched lines from both sides, with the side they are on."""
+        columns = ['side', 'index', 'date', 'payee', 'amount', 'amount_cents']
+        frames = []
+        for side, df in (('statement', self.unmatched_statement), ('books', self.unmatched_books)):
+            frames.append(pd.DataFrame({
+                'side': side,
+                'index': df.index.to_numpy(),
+                'date': df['date'].to_numpy(),
+                'payee': df['payee'].astype(object).to_numpy(),
+                'amount': df['amount'].to_numpy(dtype='float64'),
+                'amount_cents': amount_cents(df).to_numpy(),
+            }, columns=columns))
+        return pd.concat(frames, ignore_index=True)
+
+    @cached_property
+    def matches_table(self) -> pd.DataFrame:
+        return pd.DataFrame(self.exact_matches, columns=['date', 'payee', 'amount', 'statement_id', 'books_id', 'status'])
+
+    @cached_property
+    def fuzzy_table(self) -> pd.DataFrame:
+        return pd.DataFrame(self.fuzzy_matches, columns=[
+            'statement_index', 'statement_date', 'statement_payee', 'statement_amount',
+            'books_index', 'books_date', 'books_payee', 'books_amount', 'similarity', 'status'
+        ])
+
+    @cached_property
+    def payouts_table(self) -> pd.DataFrame:
+        """One row per (deposit, book entry) pair."""
+        rows = [
+            {**{key: match[key] for key in ('statement_index', 'statement_date', 'statement_payee', 'statement_amount')},
+             'books_index': books_index}
+            for match in self.payout_matches
+            for books_index in match['books_index']
+        ]
+        return pd.DataFrame(rows, columns=['statement_index', 'statement_date', 'statement_payee', 'statement_amount', 'books_index'])
+
+    @cached_property
+    def duplicates_table(self) -> pd.DataFrame:
+        """One row per posting in a duplicate cluster."""
+        rows = []
+        for side, clusters in (('statement', self.statement_duplicates), ('books', self.books_duplicates)):
+            for cluster_id, cluster in enumerate(clusters):
+                for index, date, payee in zip(cluster['index'], cluster['dates'], cluster['payees']):
+                    rows.append({
+                        'side': side, 'cluster': cluster_id, 'index': index,
+                        'date': date, 'payee': payee, 'amount': cluster['amount'],
+                    })
+        return pd.DataFrame(rows, columns=['side', 'cluster', 'index', 'date', 'payee', 'amount'])
+
+    # Renderers
+
+    def to_text(self) -> str:
+        """The reconciliation report."""
+        unmatched_stmt, unmatched_books = self.unmatched_statement, self.unmatched_books
+        fuzzy_matches, payout_matches = self.fuzzy_matches, self.payout_matches
+
+        # Build report
+        report = []
+        report.append("=" * 60)
+        report.append("BANK RECONCILIATION REPORT")
+        report.append("=" * 60)
+        report.append(f"Statement Period: {format_date(self.period_start)} to {format_date(self.period_end)}")
+        report.append(f"Generated: {self.generated.strftime('%Y-%m-%d %H:%M:%S')}")
+        report.append("")
+
+        # Summary
+        report.append("SUMMARY")
+        report.append("-" * 60)
+        report.append(f"Statement Transactions: {self.statement_count:>10}")
+        report.append(f"Books Transactions:     {self.books_count:>10}")
+        report.append(f"Exact Matches:          {len(self.exact_matches):>10}")
+        report.append(f"Potential Matches:      {len(fuzzy_matches):>10}")
+        report.append(f"Batched Payouts:        {len(payout_matches):>10}")
+        report.append(f"Statement Only:         {len(unmatched_stmt):>10}")
+        report.append(f"Books Only:             {len(unmatched_books):>10}")
+        report.append("")
+
+        # Balance reconciliation
+        report.append("BALANCE RECONCILIATION")
+        report.append("-" * 60)
+        report.append(f"Statement Ending Balance:     ${self.statement_ending_balance:>12,.2f}")
+
+        # Outstanding checks (in books but not statement)
+        report.append(f"Less: Outstanding Checks:     ${self.outstanding_checks_cents / 100:>12,.2f}")
+
+        # Deposits in transit (in books but not statement)
+        report.append(f"Plus: Deposits in Transit:    ${self.deposits_in_transit_cents / 100:>12,.2f}")
+
+        report.append(f"Adjusted Balance:             ${self.adjusted_balance_cents / 100:>12,.2f}")
+        report.append("")
+
+        report.append(f"Book Balance:                 ${self.book_balance_cents / 100:>12,.2f}")
+        report.append(f"Variance:                     ${self.variance_cents / 100:>12,.2f}")
+
+        if self.reconciled:
+            report.append("\n✅ Books are RECONCILED")
+        else:
+            report.append("\n⚠️  VARIANCE DETECTED - Investigation Needed")
+
+        report.append("")
+
+        # Items needing attention
+        if len(unmatched_stmt) > 0:
+            report.append("⚠️  TRANSACTIONS ON STATEMENT BUT NOT IN BOOKS")
+            report.append("-" * 60)
+            for _, row in unmatched_stmt.head(10).iterrows():
+                report.append(f"  {format_date(row['date'])} | {row['payee']:30} | ${row['amount']:>10,.2f}")
+            if len(unmatched_stmt) > 10:
+                report.append(f"  ... and {len(unmatched_stmt) - 10} more")
+            report.append("")
+
+        if len(unmatched_books) > 0:
+            report.append("⚠️  TRANSACTIONS IN BOOKS BUT NOT ON STATEMENT")
+            report.append("-" * 60)
+            for _, row in unmatched_books.head(10).iterrows():
+                report.append(f"  {format_date(row['date'])} | {row['payee']:30} | ${row['amount']:>10,.2f}")
+            if len(unmatched_books) > 10:
+                report.append(f"  ... and {len(unmatched_books) - 10} more")
+            report.append("")
+
+        if len(fuzzy_matches) > 0:
+            report.append("🔍 POTENTIAL MATCHES FOR REVIEW")
+            report.append("-" * 60)
+            for match in fuzzy_matches[:10]:
+                report.append(f"  Statement: {format_date(match['statement_date'])} | {match['statement_payee']}")
+                report.append(f"  Books:     {format_date(match['books_date'])} | {match['books_payee']}")
+                report.append(f"  Amount: ${match['statement_amount']:.2f} | Similarity: {match['similarity']:.1%}")
+                report.append("")
+            if len(fuzzy_matches) > 10:
+                report.append(f"  ... and {len(fuzzy_matches) - 10} more")
+
+        if payout_matches:
+            report.append("💰 BATCHED PAYOUTS")
+            report.append("-" * 60)
+            for match in payout_matches[:10]:
+                report.append(
+                    f"  {format_date(match['statement_date'])} | {match['statement_payee']:30} | "
+                    f"${match['statement_amount']:>10,.2f} = {match['books_count']} book entries"
+                )
+            if len(payout_matches) > 10:
+                report.append(f"  ... and {len(payout_matches) - 10} more")
+            report.append("")
+
+        if self.statement_duplicates or self.books_duplicates:
+            report.append("⚠️  POTENTIAL DUPLICATES DETECTED")
+            report.append("-" * 60)
+            for dup in (self.statement_duplicates + self.books_duplicates)[:5]:
+                posted = f" (posted {dup['size']} times)" if dup['size'] > 2 else ""
+                report.append(f"  {format_date(dup['date'])} | ${dup['amount']:.2f}{posted}")
+                report.append(f"    {' vs '.join(str(payee) for payee in dup['payees'])}")
+            report.append("")
+
+        return "\n".join(report)
+
+    def to_dict(self) -> Dict:
+        """Everything in the result as plain lists and dicts (e.g. for a dashboard)."""
+        def records(df: pd.DataFrame) -> List[Dict]:
+            return df.astype(object).where(df.notna(), None).to_dict('records')
+
+        return {
+            'generated': self.generated.strftime('%Y-%m-%d %H:%M:%S'),
+            'summary': self.summary(),
+            'exact_matches': records(self.matches_table),
+            'potential_matches': records(self.fuzzy_table),
+            'batched_payouts': [
+                {key: match[key] for key in ('statement_index', 'statement_date', 'statement_payee', 'statement_amount', 'books_index')}
+                for match in self.payout_matches
+            ],
+            'open_items': records(self.open_items),
+            'duplicates': records(self.duplicates_table),
+        }
+
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """The result as a JSON document (dates as YYYY-MM-DD)."""
+        return json.dumps(self.to_dict(), indent=indent, default=_jsonable)
+
+    def to_csv(self, path: str):
+        """Write the open items (both sides) to a CSV."""
+        self.open_items.to_csv(path, index=False)
+
+    def to_excel(self, path: str):
+        """Write a workbook with one sheet per table (needs openpyxl)."""
+        summary = pd.DataFrame(list(self.summary().items()), columns=['item', 'value'])
+        with pd.ExcelWriter(path) as writer:
+            summary.to_excel(writer, sheet_name='Summary', index=False)
+            self.open_items.to_excel(writer, sheet_name='Open Items', index=False)
+            self.fuzzy_table.to_excel(writer, sheet_name='Potential Matches', index=False)
+            self.payouts_table.to_excel(writer, sheet_name='Batched Payouts', index=False)
+            self.matches_table.to_excel(writer, sheet_name='Exact Matches', index=False)
+            self.duplicates_table.to_excel(writer, sheet_name='Duplicates', index=False)
+
+    def save(self, path: str):
+        """
+        Render to a file, choosing the format from its extension.
+
+        Args:
+            path: Output file ending in .txt, .json, .csv (open items) or .xlsx
+        """
+        extension = path[path.rfind('.'):].lower() if '.' in path else ''
+        output_format = OUTPUT_FORMATS.get(extension)
+        if output_format is None:
+            raise ValueError(f"Unknown output format {extension!r}; use one of {sorted(OUTPUT_FORMATS)}")
+
+        if output_format == 'excel':
+            self.to_excel(path)
+        elif output_format == 'csv':
+            self.to_csv(path)
+        else:
+            with open(path, 'w') as f:
+                f.write(self.to_text() if output_format == 'text' else self.to_json())
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Rollup Cube
+Pre-aggregated (period, category) totals for the financial reports.
+
+New transactions are folded into the cube as they land: only the months
+they touch are merged, and closed months are never recomputed. Rows the
+cube has already seen are skipped, so feeding it the whole ledger again is
+harmless. The reports
+(P&L, cash flow, comparison, KPIs) accept an AggregateView of any period
+range in place of raw transactions, so they never rescan the ledger.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, List, Optional
+from ledger_io import amount_cents
+from ledger_store import period_of
+
+KEY_COLUMNS = ['period', 'category']
+
+# Measures per cell, all in integer cents except count (rows with an
+# amount) and rows (all rows)
+MEASURES = ['sum', 'count', 'rows', 'min', 'max', 'negative_sum']
+
+# How each measure combines when two partial cells are merged
+MERGE_FUNCS = {'sum': 'sum', 'count': 'sum', 'rows': 'sum', 'min': 'min', 'max': 'max', 'negative_sum': 'sum'}
+
+
+def aggregate_transactions(transactions_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate transactions into (period, category) cells in one groupby.
+
+    Args:
+        transactions_df: DataFrame with columns: date, category, amount (or amount_cents)
+
+    Returns:
+        DataFrame with the key columns and MEASURES (rows with a missing
+        amount count in 'rows' but not in 'count'; rows with a missing date
+        go to a missing period)
+    """
+    cents = amount_cents(transactions_df).to_numpy(dtype='float64', na_value=np.nan)
+    frame = pd.DataFrame({
+        'period': period_of(pd.to_datetime(transactions_df['date'])).to_numpy(),
+        'category': transactions_df['category'].astype(object).to_numpy(),
+        'cents': cents,
+        'negative': np.minimum(cents, 0),
+    })
+    cells = frame.groupby(KEY_COLUMNS, dropna=False, sort=False).agg(
+        sum=('cents', 'sum'),
+        count=('cents', 'count'),
+        rows=('cents', 'size'),
+        min=('cents', 'min'),
+        max=('cents', 'max'),
+        negative_sum=('negative', 'sum'),
+    ).reset_index()
+    return _typed_cells(cells)
+
+
+def merge_cells(*parts: pd.DataFrame) -> pd.DataFrame:
+    """Combine partial aggregates that may share (period, category) cells."""
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return _typed_cells(pd.DataFrame(columns=KEY_COLUMNS + MEASURES))
+    combined = pd.concat(parts, ignore_index=True)
+    for measure in ('min', 'max'):
+        combined[measure] = combined[measure].astype('float64')
+    cells = combined.groupby(KEY_COLUMNS, dropna=False, sort=False).agg(MERGE_FUNCS).reset_index()
+    return _typed_cells(cells)
+
+
+def _typed_cells(cells: pd.DataFrame) -> pd.DataFrame:
+    """Integer measures (min/max stay nullable: a cell may have no amounts)."""
+    cells = cells[KEY_COLUMNS + MEASURES].copy()
+    for measure in ('sum', 'count', 'rows', 'negative_sum'):
+        cells[measure] = cells[measure].astype('float64').astype('int64')
+    for measure in ('min', 'max'):
+        cells[measure] = cells[measure].astype('float64').astype('Int64')
+    return cells
+
+
+class AggregateView:
+    """Cube cells for a range of periods, in the shape the reports consume."""
+
+    def __init__(self, cells: pd.DataFrame):
+        """
+        Args:
+            cells: (period, category) cells with MEASURES
+        """
+        self.cells = cells
+
+    @property
+    def periods(self) -> List[str]:
+        return sorted(self.cells['period'].dropna().unique().tolist())
+
+
+def hash_rows(transactions_df: pd.DataFrame) -> np.ndarray:
+    """
+    Vectorized 64-bit hash of each row's (category, day, amount in cents).
+
+    Only the columns the cube aggregates are hashed, in fixed types, so a
+    row hashes the same whatever other columns or dtypes the frame has
+    (categorized CSV, Parquet ledger, chunked read).
+    """
+    categories = transactions_df['category'].astype(object)
+    keys = pd.DataFrame({
+        'category': categories.where(categories.notna(), None).to_numpy(dtype=object),
+        'day': pd.to_datetime(transactions_df['date']).to_numpy(dtype='datetime64[D]').astype('int64'),
+        'cents': amount_cents(transactions_df).to_numpy(dtype='float64', na_value=np.nan),
+    })
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+class RollupCube:
+    """
+    Persisted (period, category) cells with sum/count/rows/min/max and the
+    sum of negative amounts (for expense totals).
+
+    Every row folded in is remembered by the hash of its (category, day,
+    amount), per period, so rows the cube has already seen are skipped:
+    feed it each day's new rows or the whole ledger again. Rows with the
+    same key are counted, so a second one is added when a feed holds more
+    of them than the cube has seen. Closed months reject unseen rows
+    instead of being recomputed.
+    """
+
+    VERSION = 3
+
+    def __init__(self, path: Optional[str] = None, chart_of_accounts: Optional[Dict[str, str]] = None):
+        """
+        Initialize the cube, loading it from disk if the file exists.
+
+        Args:
+            path: Pickle file the cube is loaded from and saved to (optional)
+            chart_of_accounts: Category -> section map for the 'section' column
+                (unknown categories get 'Unmapped')
+        """
+        self.path = path
+        self.chart_of_accounts = chart_of_accounts or {}
+        self.cells = merge_cells()
+        self.closed = set()
+        # Period (None: missing date) -> row hash -> times seen
+        self.seen: Dict[Optional[str], pd.Series] = {}
+
+        if path and os.path.exists(path):
+            saved = pd.read_pickle(path)
+            if saved.get('version') == self.VERSION:
+                self.cells = saved['cells'][KEY_COLUMNS + MEASURES]
+                self.closed = set(saved['closed'])
+                self.seen = saved['seen']
+
+    @property
+    def periods(self) -> List[str]:
+        return sorted(self.cells['period'].dropna().unique().tolist())
+
+    def update(self, transactions_df: pd.DataFrame) -> List[str]:
+        """
+        Fold transactions the cube has not seen yet into it.
+
+        Args:
+            transactions_df: Transactions (date, category, amount); rows
+                already folded in by earlier updates are skipped
+
+        Returns:
+            Periods that were updated
+        """
+        periods = period_of(pd.to_datetime(transactions_df['date'])).to_numpy(dtype=object)
+        row_hashes = pd.Series(hash_rows(transactions_df))
+
+        # Only the seen hashes of the periods in this feed are looked at; the
+        # n-th copy of a row is new if the cube has seen fewer than n
+        unseen = np.zeros(len(row_hashes), dtype=bool)
+        added = {}
+        for period, positions in pd.Series(periods).groupby(periods, dropna=False, sort=False).groups.items():
+            period = None if pd.isna(period) else period
+            hashes = row_hashes[positions]
+            occurrence = hashes.groupby(hashes).cumcount()
+            known = hashes.map(self.seen.get(period, pd.Series(dtype='int64'))).fillna(0)
+            new = (occurrence >= known).to_numpy()
+            unseen[np.asarray(positions)[new]] = True
+            if new.any():
+                added[period] = hashes[new].value_counts()
+
+        partial = aggregate_transactions(transactions_df[unseen])
+        touched = set(partial['period'].dropna().tolist())
+        closed = sorted(touched & self.closed)
+        if closed:
+            raise ValueError(f"Periods are closed and cannot take new transactions: {closed}")
+
+        for period, counts in added.items():
+            seen = self.seen.get(period)
+            self.seen[period] = counts if seen is None else seen.add(counts, fill_value=0).astype('int64')
+
+        # Only the touched periods are merged; every other cell is kept as is
+        in_touched = self.cells['period'].isin(touched)
+        merged = merge_cells(self.cells[in_touched], partial)
+        cells = pd.concat([self.cells[~in_touched], merged], ignore_index=True)
+        self.cells = cells.sort_values(KEY_COLUMNS, ignore_index=True)
+        return sorted(touched)
+
+    def close(self, periods: Iterable[str]):
+        """Freeze periods (e.g. after month-end close); later rows for them are rejected."""
+        self.closed.update(periods)
+
+    def view(self, start: Optional[str] = None, end: Optional[str] = None) -> AggregateView:
+        """
+        Cells for an inclusive range of 'YYYY-MM' periods (default: all,
+        including rows with a missing date, as in the ledger's own totals).
+
+        Returns:
+            AggregateView to pass to the FinancialReporter methods
+        """
+        if not start and not end:
+            return AggregateView(self.cells)
+        periods = self.cells['period']
+        keep = periods.notna()
+        if start:
+            keep &= periods >= start
+        if end:
+            keep &= periods <= end
+        return AggregateView(self.cells[keep])
+
+    def table(self) -> pd.DataFrame:
+        """All cells with their category's chart-of-accounts section (for display)."""
+        cells = self.cells.copy()
+        cells.insert(2, 'section', cells['category'].map(self.chart_of_accounts).fillna('Unmapped'))
+        return cells
+
+    def save(self):
+        """Write the cube to disk."""
+        if self.path:
+            pd.to_pickle({
+                'version': self.VERSION,
+                'cells': self.table(),
+                'closed': sorted(self.closed),
+                'seen': self.seen,
+            }, self.path)
+
+
+if __name__ == "__main__":
+    import sys
+    from generate_financial_reports import FinancialReporter
+    from ledger_io import REPORT_COLUMNS, load_transactions
+    # The reports check for rollup_cube.AggregateView, not this script's copy
+    from rollup_cube import RollupCube
+
+    commands = ('update', 'close', 'report')
+    if len(sys.argv) < 3 or sys.argv[1] not in commands:
+        print("Usage: python rollup_cube.py update <cube.pkl> <transactions.csv|ledger_dir>")
+        print("       python rollup_cube.py close <cube.pkl> <YYYY-MM>[,YYYY-MM...]")
+        print("       python rollup_cube.py report <cube.pkl> [start YYYY-MM] [end YYYY-MM] [period_name]")
+        sys.exit(1)
+
+    command, cube_file = sys.argv[1], sys.argv[2]
+    reporter = FinancialReporter()
+    cube = RollupCube(cube_file, reporter.chart_of_accounts)
+
+    if command == 'update':
+        df = load_transactions(sys.argv[3], REPORT_COLUMNS, columns=REPORT_COLUMNS, cents=True)
+        rows_before = int(cube.cells['rows'].sum())
+        updated = cube.update(df)
+        cube.save()
+        added = int(cube.cells['rows'].sum()) - rows_before
+        print(f"✅ Cube updated: {added} new of {len(df)} transactions "
+              f"into {len(updated)} period(s): {', '.join(updated)}")
+    elif command == 'close':
+        cube.close(sys.argv[3].split(','))
+        cube.save()
+        print(f"✅ Closed: {', '.join(sorted(cube.closed))}")
+    else:
+        start = sys.argv[3] if len(sys.argv) > 3 else None
+        end = sys.argv[4] if len(sys.argv) > 4 else None
+        period_name = sys.argv[5] if len(sys.argv) > 5 else ""
+        view = cube.view(start, end)
+        print(reporter.generate_profit_loss(view, period_name))
+        print("\n\n")
+        print(reporter.generate_cash_flow(view, period_name))
+        print("\n\n")
+        print(reporter.generate_kpis(view))
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Streaming Reconciliation
+Reconciles date-sorted statement and books files that are too large to load
+whole.
+
+Both files are read in chunks. Book lines are released to the matcher up to
+the date both files have reached, and statement lines days_window days
+behind that, so every line meets all of its possible partners (including
+book entries posted a few days after the bank line). Open items live in a
+ReconciliationState, and once the files have moved more than the matching
+window past an item it is emitted as unmatched and dropped. Memory is
+bounded by the chunk size plus the open items in the window. Balance
+totals are kept as running sums in cents. An item gets at most one fuzzy
+proposal over the whole stream.
+
+Duplicate detection needs the whole history and is not part of the stream;
+use DuplicateDetector.scan_files for that.
+"""
+
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+from ledger_io import STATEMENT_COLUMNS, amount_to_cents, format_date, load_transactions
+from bank_reconciliation import BankReconciliation, ReconciliationState, match_window_days
+
+# Rows per chunk read from each file
+DEFAULT_CHUNKSIZE = 100_000
+
+
+class StreamingReconciler:
+    """Sliding-window reconciliation over two date-sorted transaction files."""
+
+    def __init__(
+        self,
+        reconciler: Optional[BankReconciliation] = None,
+        days_window: int = 3,
+        payout_days: int = 7,
+        slack_days: int = 1,
+        chunksize: int = DEFAULT_CHUNKSIZE
+    ):
+        """
+        Initialize the streaming reconciler.
+
+        Args:
+            reconciler: BankReconciliation doing the matching (default settings if None)
+            days_window: Days to look forward/backward for fuzzy matching
+            payout_days: Days of book entries a batched payout can cover
+            slack_days: Extra days an item stays open past the matching windows
+            chunksize: Rows read from each file at a time
+        """
+        self.reconciler = reconciler or BankReconciliation()
+        self.days_window = days_window
+        self.payout_days = payout_days
+        self.slack_days = slack_days
+        self.chunksize = chunksize
+        self.lag = pd.Timedelta(days=days_window)
+        self.window = pd.Timedelta(days=match_window_days(days_window, payout_days, slack_days))
+        self.totals = self._empty_totals()
+
+    def _empty_totals(self) -> Dict:
+        return {
+            'statement_lines': 0,
+            'books_lines': 0,
+            'exact_matches': 0,
+            'potential_matches': 0,
+            'batched_payouts': 0,
+            'statement_only': 0,
+            'books_only': 0,
+            'outstanding_checks_cents': 0,
+            'deposits_in_transit_cents': 0,
+            'book_balance_cents': 0,
+            'first_date': None,
+            'last_date': None,
+            'max_open_items': 0,
+            'unmatched_statement': [],
+            'unmatched_books': [],
+            'fuzzy_matches': [],
+            'payout_matches': [],
+        }
+
+    def _read(self, path: str) -> Iterator[pd.DataFrame]:
+        """Typed chunks of one file, checked to be in date order."""
+        last = None
+        chunks = load_transactions(
+            path, STATEMENT_COLUMNS, chunksize=self.chunksize, columns=STATEMENT_COLUMNS, cents=True
+        )
+        for chunk in chunks:
+            dates = chunk['date']
+            if dates.isna().any() or not dates.is_monotonic_increasing or (last is not None and dates.iloc[0] < last):
+                raise ValueError(f"{path} must be sorted by date with no missing dates for streaming reconciliation")
+            if len(chunk):
+                last = dates.iloc[-1]
+                yield chunk
+
+    def _update_totals(self, result: Dict, expired_stmt: pd.DataFrame, expired_books: pd.DataFrame):
+        totals = self.totals
+        totals['exact_matches'] += len(result['exact_matches'])
+        totals['batched_payouts'] += len(result['payout_matches'])
+        totals['potential_matches'] += len(result['fuzzy_matches'])
+        totals['statement_only'] += len(expired_stmt)
+        totals['books_only'] += len(expired_books)
+
+        books_cents = expired_books['amount_cents']
+        totals['outstanding_checks_cents'] += int(books_cents[books_cents < 0].sum())
+        totals['deposits_in_transit_cents'] += int(books_cents[books_cents > 0].sum())
+
+        # Keep the first few items of each kind for the report
+        for key, rows in (
+            ('unmatched_statement', expired_stmt[['date', 'payee', 'amount']].to_dict('records')),
+            ('unmatched_books', expired_books[['date', 'payee', 'amount']].to_dict('records')),
+            ('fuzzy_matches', result['fuzzy_matches']),
+            ('payout_matches', result['payout_matches']),
+        ):
+            totals[key].extend(rows[:10 - len(totals[key])])
+
+    def stream(self, statement_file: str, books_file: str) -> Iterator[Dict]:
+        """
+        Reconcile two date-sorted files, yielding results as the window moves.
+
+        Item ids are row positions in each file (0-based). Running totals are
+        kept in self.totals.
+
+        Args:
+            statement_file: Bank statement CSV, sorted by date
+            books_file: Books CSV, sorted by date
+
+        Yields:
+            One dict per step with 'through' (book lines dated before it, and
+            statement lines days_window days earlier, have been matched),
+            'exact_matches' and 'payout_matches' (closed for good),
+            'fuzzy_matches' (proposals for review, made once per item), and
+            'expired_statement' / 'expired_books' (lines that aged out
+            unmatched)
+        """
+        self.totals = self._empty_totals()
+        state = ReconciliationState(keep_matches=False)
+        sides = ('statement', 'books')
+        readers = {'statement': self._read(statement_file), 'books': self._read(books_file)}
+        buffers = {side: [] for side in sides}
+        frontier = {side: None for side in sides}
+        done = {side: False for side in sides}
+
+        while not all(done.values()):
+            # Read from whichever file is behind
+            side = min(
+                (side for side in sides if not done[side]),
+                key=lambda side: (frontier[side] is not None, frontier[side] or pd.Timestamp.min)
+            )
+            chunk = next(readers[side], None)
+            if chunk is None:
+                done[side] = True
+            else:
+                buffers[side].append(chunk)
+                frontier[side] = chunk['date'].iloc[-1]
+                self.totals[f'{side}_lines'] += len(chunk)
+                first = chunk['date'].iloc[0]
+                if self.totals['first_date'] is None or first < self.totals['first_date']:
+                    self.totals['first_date'] = first
+                if self.totals['last_date'] is None or frontier[side] > self.totals['last_date']:
+                    self.totals['last_date'] = frontier[side]
+
+            # Book lines dated before both frontiers are complete; statement
+            # lines wait until the books are days_window further along
+            pending = [frontier[side] for side in sides if not done[side]]
+            if any(f is None for f in pending):
+                continue
+            through = min(pending) if pending else None
+
+            released = {}
+            for side in sides:
+                buffered = pd.concat(buffers[side], ignore_index=True) if buffers[side] else None
+                if buffered is None:
+                    released[side] = pd.DataFrame({
+                        'date': pd.Series(dtype='datetime64[ns]'),
+                        'payee': pd.Series(dtype='object'),
+                        'amount': pd.Series(dtype='float64'),
+                        'amount_cents': pd.Series(dtype='int64'),
+                    })
+                    continue
+                release_before = through if side == 'books' or through is None else through - self.lag
+                if through is None:
+                    ready = np.ones(len(buffered), dtype=bool)
+                else:
+                    ready = (buffered['date'] < release_before).to_numpy()
+                released[side] = buffered[ready]
+                buffers[side] = [buffered[~ready]] if not ready.all() else []
+
+            if released['statement'].empty and released['books'].empty and through is not None:
+                continue
+
+            result = self.reconciler.reconcile_incremental(
+                released['statement'], released['books'], state, days_window=self.days_window
+            )
+            self.totals['max_open_items'] = max(
+                self.totals['max_open_items'], len(state.open['statement']) + len(state.open['books'])
+            )
+
+            # Items no future line can match, or everything at the end
+            cutoff = pd.Timestamp.max if through is None else through - self.window
+            expired_stmt, expired_books = state.expire(cutoff)
+            self._update_totals(result, expired_stmt, expired_books)
+            self.totals['book_balance_cents'] = state.book_balance_cents
+
+            yield {
+                'through': through,
+                'exact_matches': result['exact_matches'],
+                'payout_matches': result['payout_matches'],
+                'fuzzy_matches': result['fuzzy_matches'],
+                'expired_statement': expired_stmt,
+                'expired_books': expired_books,
+            }
+
+    def reconcile(self, statement_file: str, books_file: str) -> Dict:
+        """
+        Run the whole stream, discarding per-step results.
+
+        Returns:
+            The running totals (see self.totals)
+        """
+        for _ in self.stream(statement_file, books_file):
+            pass
+        return self.totals
+
+
+def generate_streaming_report(totals: Dict, statement_ending_balance: float) -> str:
+    """Reconciliation report from StreamingReconciler totals."""
+    adjusted_balance = (
+        amount_to_cents(statement_ending_balance) +
+        totals['outstanding_checks_cents'] + totals['deposits_in_transit_cents']
+    )
+    variance = adjusted_balance - totals['book_balance_cents']
+
+    report = []
+    report.append("=" * 60)
+    report.append("BANK RECONCILIATION REPORT (STREAMING)")
+    report.append("=" * 60)
+    if totals['first_date'] is not None:
+        report.append(f"Period: {format_date(totals['first_date'])} to {format_date(totals['last_date'])}")
+    report.append(f"Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    report.append("")
+
+    report.append("SUMMARY")
+    report.append("-" * 60)
+    report.append(f"Statement Transactions: {totals['statement_lines']:>10}")
+    report.append(f"Books Transactions:     {totals['books_lines']:>10}")
+    report.append(f"Exact Matches:          {totals['exact_matches']:>10}")
+    report.append(f"Potential Matches:      {totals['potential_matches']:>10}")
+    report.append(f"Batched Payouts:        {totals['batched_payouts']:>10}")
+    report.append(f"Statement Only:         {totals['statement_only']:>10}")
+    report.append(f"Books Only:             {totals['books_only']:>10}")
+    report.append(f"Peak Open Items:        {totals['max_open_items']:>10}")
+    report.append("")
+
+    report.append("BALANCE RECONCILIATION")
+    report.append("-" * 60)
+    report.append(f"Statement Ending Balance:     ${statement_ending_balance:>12,.2f}")
+    report.append(f"Less: Outstanding Checks:     ${totals['outstanding_checks_cents'] / 100:>12,.2f}")
+    report.append(f"Plus: Deposits in Transit:    ${totals['deposits_in_transit_cents'] / 100:>12,.2f}")
+    report.append(f"Adjusted Balance:             ${adjusted_balance / 100:>12,.2f}")
+    report.append("")
+    report.append(f"Book Balance:                 ${totals['book_balance_cents'] / 100:>12,.2f}")
+    report.append(f"Variance:                     ${variance / 100:>12,.2f}")
+
+    if variance == 0:
+        report.append("\n✅ Books are RECONCILED")
+    else:
+        report.append("\n⚠️  VARIANCE DETECTED - Investigation Needed")
+
+    report.append("")
+
+    for title, key, count in (
+        ("⚠️  TRANSACTIONS ON STATEMENT BUT NOT IN BOOKS", 'unmatched_statement', 'statement_only'),
+        ("⚠️  TRANSACTIONS IN BOOKS BUT NOT ON STATEMENT", 'unmatched_books', 'books_only'),
+    ):
+        if totals[count] > 0:
+            report.append(title)
+            report.append("-" * 60)
+            for row in totals[key]:
+                report.append(f"  {format_date(row['date'])} | {str(row['payee']):30} | ${row['amount']:>10,.2f}")
+            if totals[count] > len(totals[key]):
+                report.append(f"  ... and {totals[count] - len(totals[key])} more")
+            report.append("")
+
+    if totals['fuzzy_matches']:
+        report.append("🔍 POTENTIAL MATCHES FOR REVIEW")
+        report.append("-" * 60)
+        for match in totals['fuzzy_matches']:
+            report.append(f"  Statement: {format_date(match['statement_date'])} | {match['statement_payee']}")
+            report.append(f"  Books:     {format_date(match['books_date'])} | {match['books_payee']}")
+            report.append(f"  Amount: ${match['statement_amount']:.2f} | Similarity: {match['similarity']:.1%}")
+            report.append("")
+        if totals['potential_matches'] > len(totals['fuzzy_matches']):
+            report.append(f"  ... and {totals['potential_matches'] - len(totals['fuzzy_matches'])} more")
+
+    if totals['payout_matches']:
+        report.append("💰 BATCHED PAYOUTS")
+        report.append("-" * 60)
+        for match in totals['payout_matches']:
+            report.append(
+                f"  {format_date(match['statement_date'])} | {match['statement_payee']:30} | "
+                f"${match['statement_amount']:>10,.2f} = {match['books_count']} book entries"
+            )
+        if totals['batched_payouts'] > len(totals['payout_matches']):
+            report.append(f"  ... and {totals['batched_payouts'] - len(totals['payout_matches'])} more")
+        report.append("")
+
+    return "\n".join(report)
+
+
+def reconcile_stream_from_csv(
+    statement_file: str,
+    books_file: str,
+    ending_balance: float,
+    chunksize: int = DEFAULT_CHUNKSIZE
+) -> Dict:
+    """
+    Reconcile two large date-sorted CSVs chunk by chunk and print the report.
+
+    Args:
+        statement_file: Path to bank statement CSV (sorted by date)
+        books_file: Path to accounting books CSV (sorted by date)
+        ending_balance: Ending balance from bank statement
+        chunksize: Rows read from each file at a time
+
+    Returns:
+        The running totals
+    """
+    streamer = StreamingReconciler(chunksize=chunksize)
+    totals = streamer.reconcile(statement_file, books_file)
+    print(generate_streaming_report(totals, ending_balance))
+    return totals
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 4:
+        print("Usage: python streaming_reconciliation.py <statement.csv> <books.csv> <ending_balance> [chunksize]")
+        print("\nBoth CSVs must have columns: date, payee, amount, and be sorted by date")
+        sys.exit(1)
+
+    statement_file = sys.argv[1]
+    books_file = sys.argv[2]
+    ending_balance = float(sys.argv[3])
+    chunksize = int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_CHUNKSIZE
+
+    reconcile_stream_from_csv(statement_file, books_file, ending_balance, chunksize)
@@ -8,7 +8,14 @@ import os
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'skill', 'scripts'))
 
 import pandas as pd
-from categorize_transactions import TransactionCategorizer
+import re
+import tempfile
+import categorize_transactions
+from categorize_transactions import (
+    TransactionCategorizer, RuleMatcher, CategoryCache, CategorizationSummary, CategorizationState,
+    categorize_from_csv, REQUIRED_COLUMNS
+)
+from ledger_io import load_transactions
 
 def test_categorization_rules():
     """Test that basic categorization rules work"""
@@ -70,6 +77,256 @@ def test_custom_rules():
     
     print("✅ Custom rules test passed!")
 
+def test_compiled_matcher_first_match_wins():
+    """Test that the compiled matcher keeps rule order, not text position"""
+    categorizer = TransactionCategorizer()
+    
+    # 'aws' appears first in the text, but the revenue rule comes first in order
+    assert categorizer.categorize_transaction('AWS', 'stripe transfer', -10.0) == 'Sales / Service'
+    
+    # Agrees with a plain sequential re.search loop over many rules
+    rules = [(rf'vendor{i}\b|acct-{i}', f'Category {i}') for i in range(300)]
+    rules.append((r'^refund', 'Refunds'))
+    matcher = RuleMatcher(rules)
+    for text in ['paid vendor250 and vendor12', 'acct-7 vendor3', 'refund acct-299', 'nothing here']:
+        expected = next((i for i, (p, _) in enumerate(rules) if re.search(p, text, re.IGNORECASE)), None)
+        assert matcher.match(text) == expected
+    
+    # Patterns with groups fall back to sequential matching
+    matcher = RuleMatcher([(r'(ab)\1', 'Repeat'), (r'ab', 'Single')])
+    assert matcher.categorize('abab') == 'Repeat'
+    assert matcher.categorize('ab') == 'Single'
+    
+    # Direct edits to the rules are picked up by the next batch
+    categorizer.rules['opex'].insert(0, (r'widget', 'Widgets'))
+    df = pd.DataFrame({'date': ['2024-11-01'], 'payee': ['Widget Co'], 'amount': [-5.0]})
+    assert categorizer.categorize_batch(df).iloc[0]['category'] == 'Widgets'
+    
+    # ... and by single-transaction calls
+    categorizer.rules['opex'].insert(0, (r'gadget', 'Gadgets'))
+    assert categorizer.categorize_transaction('Gadget Shop', '', -5.0) == 'Gadgets'
+    categorizer.rules['opex'] = [(r'sprocket', 'Sprockets')] + categorizer.rules['opex']
+    assert categorizer.categorize_transaction('Sprocket Inc', '', -5.0) == 'Sprockets'
+    
+    print("✅ Compiled matcher test passed!")
+
+def test_vectorized_batch_matches_row_path():
+    """Test that column-wise categorization gives the same output as row by row"""
+    data = {
+        'date': ['2024-11-01', '2024-11-02', '2024-11-03', '2024-11-04', '2024-11-05'],
+        'payee': ['Stripe', 'AWS', None, 'Mystery Vendor', 'Office Depot'],
+        'description': ['Payment', None, 'Upwork invoice', 'Unknown', 'stripe fee refund'],
+        'amount': [1000.0, -100.0, -500.0, -42.0, -12.5]
+    }
+    
+    row_categorizer = TransactionCategorizer()
+    expected = row_categorizer.categorize_batch(pd.DataFrame(data), vectorized=False)
+    
+    vec_categorizer = TransactionCategorizer()
+    result = vec_categorizer.categorize_batch(pd.DataFrame(data))
+    
+    assert result['category'].tolist() == expected['category'].tolist()
+    assert vec_categorizer.uncategorized == row_categorizer.uncategorized
+    assert len(vec_categorizer.uncategorized) == 1
+    
+    # Works without a description column too
+    no_desc = pd.DataFrame(data).drop(columns=['description'])
+    assert (
+        vec_categorizer.categorize_batch(no_desc.copy())['category'].tolist()
+        == row_categorizer.categorize_batch(no_desc.copy(), vectorized=False)['category'].tolist()
+    )
+    
+    print("✅ Vectorized batch test passed!")
+
+def test_category_cache():
+    """Test the payee cache tiers, counters and invalidation"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'cache.db')
+        categorizer = TransactionCategorizer(cache=CategoryCache(max_size=2, db_path=db_path))
+        
+        assert categorizer.categorize_transaction('Stripe', 'Payment', 100.0) == 'Sales / Service'
+        assert categorizer.categorize_transaction('Stripe', 'Payment', 250.0) == 'Sales / Service'
+        categorizer.categorize_transaction('AWS', 'Hosting', -10.0)
+        categorizer.categorize_transaction('Gusto', 'Payroll', -10.0)
+        stats = categorizer.cache.stats()
+        assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (1, 3, 1, 2)
+        categorizer.cache.close()
+        
+        # A fresh process with the same rules is served from disk
+        df = pd.DataFrame({
+            'date': ['2024-11-01', '2024-11-02'],
+            'payee': ['Stripe', 'AWS'],
+            'description': ['Payment', 'Hosting'],
+            'amount': [100.0, -10.0]
+        })
+        categorizer = TransactionCategorizer(cache=CategoryCache(db_path=db_path))
+        categorizer.categorize_batch(df)
+        assert categorizer.cache.stats()['disk_hits'] == 2
+        
+        # Changing the rules invalidates cached results
+        categorizer.add_custom_rule(r'hosting', 'Hosting', category_type='revenue')
+        assert categorizer.categorize_transaction('AWS', 'Hosting', -10.0) == 'Hosting'
+        categorizer.cache.close()
+    
+    print("✅ Category cache test passed!")
+
+def test_streaming_csv_matches_in_memory():
+    """Test that chunked categorize_from_csv writes the same file and report"""
+    rows = 25
+    df = pd.DataFrame({
+        'date': [f'2024-11-{(i % 28) + 1:02d}' for i in range(rows)],
+        'payee': ['Stripe', 'AWS', 'Mystery Co', 'Gusto', 'Unknown LLC'] * 5,
+        'description': ['Payment', 'Hosting', 'Invoice', 'Payroll', 'Misc'] * 5,
+        'amount': [100.0 + i for i in range(rows)]
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        input_file = os.path.join(tmp, 'in.csv')
+        df.to_csv(input_file, index=False)
+        
+        full = categorize_from_csv(input_file, os.path.join(tmp, 'full.csv'))
+        summary = categorize_from_csv(input_file, os.path.join(tmp, 'streamed.csv'), chunksize=4)
+        
+        assert isinstance(summary, CategorizationSummary)
+        with open(os.path.join(tmp, 'full.csv')) as a, open(os.path.join(tmp, 'streamed.csv')) as b:
+            assert a.read() == b.read()
+        
+        categorizer = TransactionCategorizer()
+        categorizer.categorize_batch(full)
+        assert categorizer.generate_categorization_report(full) == categorizer.generate_categorization_report(summary)
+        assert summary.uncategorized_count == 10
+        assert len(summary.uncategorized_sample) == CategorizationSummary.SAMPLE_SIZE
+    
+    print("✅ Streaming CSV test passed!")
+
+def test_parallel_batch_matches_serial():
+    """Test that process-pool categorization keeps results and row order"""
+    df = pd.DataFrame({
+        'date': ['2024-11-01'] * 12,
+        'payee': ['Stripe', 'AWS', 'Mystery', 'Gusto', 'Upwork', 'Uber'] * 2,
+        'description': ['Payment', 'Hosting', 'Misc', 'Payroll', 'Design', 'Ride'] * 2,
+        'amount': [float(i) for i in range(12)]
+    }, index=range(100, 112))
+    
+    categorizer = TransactionCategorizer()
+    categorizer.add_custom_rule(r'ride$', 'Rides', category_type='revenue')
+    expected = categorizer.categorize_batch(df.copy())['category']
+    
+    original_min_rows = categorize_transactions.MIN_PARTITION_ROWS
+    categorize_transactions.MIN_PARTITION_ROWS = 2
+    try:
+        result = categorizer.categorize_batch(df.copy(), workers=2)
+    finally:
+        categorize_transactions.MIN_PARTITION_ROWS = original_min_rows
+        categorizer.close()
+    
+    assert result['category'].equals(expected)
+    assert len(categorizer.uncategorized) == 2
+    
+    print("✅ Parallel batch test passed!")
+
+def test_incremental_categorization():
+    """Test that incremental runs only categorize new or changed rows"""
+    df = pd.DataFrame({
+        'date': ['2024-11-01', '2024-11-02', '2024-11-03'],
+        'payee': ['Stripe', 'AWS', 'Mystery'],
+        'description': ['Payment', 'Hosting', 'Misc'],
+        'amount': [100.0, -20.0, -5.0]
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = os.path.join(tmp, 'state.pkl')
+        
+        categorizer = TransactionCategorizer()
+        state = CategorizationState(state_file)
+        categorizer.categorize_incremental(df.copy(), state)
+        state.save(categorizer._get_matcher().fingerprint)
+        assert categorizer.incremental_stats == {'reused': 0, 'categorized': 3}
+        
+        # Next day: one edited row and one new row
+        next_day = pd.concat([df, pd.DataFrame({
+            'date': ['2024-11-04'], 'payee': ['Gusto'], 'description': ['Payroll'], 'amount': [-900.0]
+        })], ignore_index=True)
+        next_day.loc[2, 'payee'] = 'Upwork'
+        
+        categorizer = TransactionCategorizer()
+        state = CategorizationState(state_file)
+        result = categorizer.categorize_incremental(next_day.copy(), state)
+        state.save(categorizer._get_matcher().fingerprint)
+        assert categorizer.incremental_stats == {'reused': 2, 'categorized': 2}
+        assert result['category'].tolist() == [
+            'Sales / Service', 'Software & Tools', 'Subcontractors', 'Payroll & Benefits'
+        ]
+        assert categorizer.uncategorized == []
+        
+        # A rule change forces a full pass
+        categorizer = TransactionCategorizer()
+        categorizer.add_custom_rule(r'payment', 'Payments', category_type='revenue')
+        categorizer.categorize_incremental(next_day.copy(), CategorizationState(state_file))
+        assert categorizer.incremental_stats == {'reused': 0, 'categorized': 4}
+        
+        # Rows hash the same however the file was loaded
+        input_file = os.path.join(tmp, 'input.csv')
+        df.to_csv(input_file, index=False)
+        whole = load_transactions(input_file, REQUIRED_COLUMNS)
+        chunked = pd.concat(load_transactions(input_file, REQUIRED_COLUMNS, chunksize=2), ignore_index=True)
+        parsed = df.assign(date=pd.to_datetime(df['date']))
+        assert whole['date'].dtype != chunked['date'].dtype or whole['payee'].dtype != parsed['payee'].dtype
+        expected = CategorizationState.hash_rows(parsed)
+        assert (CategorizationState.hash_rows(whole) == expected).all()
+        assert (CategorizationState.hash_rows(chunked) == expected).all()
+    
+    print("✅ Incremental categorization test passed!")
+
+def test_amount_aware_rules():
+    """Test amount ranges and sign constraints on rules"""
+    categorizer = TransactionCategorizer()
+    categorizer.add_custom_rule(r'aws', 'Office Expenses', max_amount=50, sign='negative', prepend=True)
+    categorizer.add_custom_rule(r'aws', 'Capital Review', min_amount=10000, prepend=True)
+    categorizer.add_custom_rule(r'shopify', 'Refunds & Discounts', sign='negative', category_type='revenue', prepend=True)
+    
+    assert categorizer.categorize_transaction('AWS', 'Hosting', -49.99) == 'Office Expenses'
+    assert categorizer.categorize_transaction('AWS', 'Hosting', -50.0) == 'Software & Tools'
+    assert categorizer.categorize_transaction('AWS', 'Hosting', 20.0) == 'Software & Tools'
+    assert categorizer.categorize_transaction('AWS', 'Reserved instances', -10000.0) == 'Capital Review'
+    assert categorizer.categorize_transaction('Shopify', 'Order 1001', -30.0) == 'Refunds & Discounts'
+    assert categorizer.categorize_transaction('Shopify', 'Order 1002', 30.0) == 'Sales / Service'
+    
+    df = pd.DataFrame({
+        'date': ['2024-11-01'] * 6,
+        'payee': ['AWS', 'AWS', 'AWS', 'AWS', 'Shopify', 'Shopify'],
+        'description': ['Hosting'] * 6,
+        'amount': [-49.99, -50.0, 20.0, -10000.0, -30.0, float('nan')]
+    })
+    expected = categorizer.categorize_batch(df.copy(), vectorized=False)['category'].tolist()
+    assert categorizer.categorize_batch(df.copy())['category'].tolist() == expected
+    assert expected[-1] == 'Sales / Service'
+    
+    try:
+        categorizer.add_custom_rule(r'aws', 'Bad', sign='debit')
+        assert False, "invalid sign should raise"
+    except ValueError:
+        pass
+    
+    print("✅ Amount-aware rules test passed!")
+
+def test_split_transaction_exact():
+    """Test that split validation compares amounts in exact cents"""
+    categorizer = TransactionCategorizer()
+    
+    # 0.1 + 0.2 != 0.3 in floats, but the cents add up exactly
+    splits = categorizer.split_transaction('Costco', 0.3, {'Office Expenses': 0.1, 'Travel & Meals': 0.2})
+    assert [split['amount'] for split in splits] == [0.1, 0.2]
+    
+    # Off by a single cent is rejected
+    try:
+        categorizer.split_transaction('Costco', 100.0, {'Office Expenses': 60.0, 'Travel & Meals': 39.99})
+        assert False, "a one-cent mismatch should raise"
+    except ValueError as e:
+        assert '99.99' in str(e)
+    
+    print("✅ Split transaction test passed!")
+
 if __name__ == '__main__':
     print("Running FinGuard Tests...\n")
     
@@ -77,6 +334,14 @@ if __name__ == '__main__':
         test_categorization_rules()
         test_batch_processing()
         test_custom_rules()
+        test_compiled_matcher_first_match_wins()
+        test_vectorized_batch_matches_row_path()
+        test_category_cache()
+        test_streaming_csv_matches_in_memory()
+        test_parallel_batch_matches_serial()
+        test_incremental_categorization()
+        test_amount_aware_rules()
+        test_split_transaction_exact()
         
         print("\n✅ All tests passed successfully!")
         sys.exit(0)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared FinGuard ledger ingest layer
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'skill', 'scripts'))
+
+import tempfile
+import pandas as pd
+import pytest
+from ledger_io import REPORT_COLUMNS, amount_cents, format_date, load_transactions, to_cents
+
+def _write_csv(tmp, name, text):
+    path = os.path.join(tmp, name)
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+def test_load_transactions_types_and_validation():
+    """Test that the loader validates columns and types the data once"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_csv(tmp, 'txns.csv', (
+            "date,payee,description,amount\n"
+            "2024-11-01,Stripe,Payment,100\n"
+            "2024-11-02,AWS,Hosting,-20.5\n"
+            "2024-11-02,Stripe,Payment,35\n"
+        ))
+        
+        df = load_transactions(path)
+        assert pd.api.types.is_datetime64_any_dtype(df['date'])
+        assert df['amount'].dtype == 'float64'
+        assert isinstance(df['payee'].dtype, pd.CategoricalDtype)
+        assert set(df.attrs['memory_usage']) == {'before', 'after'}
+        assert format_date(df['date'].min()) == '2024-11-01'
+        
+        # Chunked reads yield typed chunks
+        chunks = list(load_transactions(path, chunksize=2))
+        assert [len(chunk) for chunk in chunks] == [2, 1]
+        assert pd.api.types.is_datetime64_any_dtype(chunks[1]['date'])
+        
+        # Missing required columns are reported
+        try:
+            load_transactions(path, REPORT_COLUMNS)
+            assert False, "missing 'category' should raise"
+        except ValueError as e:
+            assert 'category' in str(e)
+        
+        bad = _write_csv(tmp, 'bad.csv', "date,payee,amount\nnot a date,Stripe,1\n")
+        try:
+            load_transactions(bad)
+            assert False, "bad date should raise"
+        except ValueError as e:
+            assert 'not a date' in str(e)
+    
+    print("✅ Ledger loader test passed!")
+
+def test_integer_cents():
+    """Test the opt-in int64 cents column"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = _write_csv(tmp, 'txns.csv', (
+            "date,payee,amount\n"
+            "2024-11-01,Stripe,0.29\n"
+            "2024-11-02,AWS,-1234.57\n"
+            "2024-11-03,Gusto,1.005\n"
+        ))
+        
+        df = load_transactions(path, cents=True)
+        assert df['amount_cents'].dtype == 'int64'
+        assert df['amount_cents'].tolist() == [29, -123457, 100]
+        assert amount_cents(df).equals(df['amount_cents'])
+        
+        # Without the column, cents are derived on the fly
+        plain = load_transactions(path)
+        assert 'amount_cents' not in plain.columns
+        assert amount_cents(plain).tolist() == [29, -123457, 100]
+    
+    # Missing amounts stay missing
+    cents = to_cents(pd.Series([1.5, None]))
+    assert cents.dtype == 'Int64' and cents.isna().tolist() == [False, True]
+    
+    print("✅ Integer cents test passed!")
+
+def test_parquet_ledger_partitions():
+    """Test that the Parquet ledger prunes months and merges rewritten ones"""
+    pytest.importorskip('pyarrow')
+    from ledger_store import list_periods, read_ledger, write_ledger
+    
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2024-10-30', '2024-11-01', '2024-11-15', '2024-12-02']),
+        'payee': ['AWS', 'Stripe', 'Gusto', 'Stripe'],
+        'category': ['Cloud', 'Revenue', 'Payroll', 'Revenue'],
+        'amount': [-20.0, 100.0, -50.0, 80.0],
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'ledger')
+        assert write_ledger(df, root) == ['2024-10', '2024-11', '2024-12']
+        assert list_periods(root) == ['2024-10', '2024-11', '2024-12']
+        
+        # Partition pruning and column projection
+        november = load_transactions(root, REPORT_COLUMNS, columns=REPORT_COLUMNS, periods=['2024-11'])
+        assert list(november.columns) == REPORT_COLUMNS
+        assert sorted(november['amount']) == [-50.0, 100.0]
+        assert pd.api.types.is_datetime64_any_dtype(november['date'])
+        
+        # A partial write merges into its month: rewritten rows replace the
+        # stored ones (even with a new category), the rest of the month stays
+        recategorized = df.iloc[[1]].assign(category='Sales')
+        daily = pd.DataFrame({
+            'date': pd.to_datetime(['2024-11-20']), 'payee': ['AWS'], 'category': ['Cloud'], 'amount': [-30.0],
+        })
+        assert write_ledger(pd.concat([recategorized, daily]), root) == ['2024-11']
+        full = read_ledger(root)
+        assert len(full) == 5
+        november = full[full['date'].dt.month == 11].sort_values('date')
+        assert november['category'].astype(str).tolist() == ['Sales', 'Payroll', 'Cloud']
+        
+        # Writing the same rows again adds nothing
+        write_ledger(daily, root)
+        assert len(read_ledger(root)) == 5
+        
+        # replace=True rewrites the months written and leaves the others alone
+        write_ledger(df.iloc[[1]], root, replace=True)
+        full = read_ledger(root)
+        assert len(full) == 3
+        assert sorted(full['amount']) == [-20.0, 80.0, 100.0]
+    
+    print("✅ Parquet ledger test passed!")
+
+if __name__ == '__main__':
+    print("Running FinGuard Ledger I/O Tests...\n")
+    
+    try:
+        test_load_transactions_types_and_validation()
+        test_integer_cents()
+        test_parquet_ledger_partitions()
+        
+        print("\n✅ All tests passed successfully!")
+        sys.exit(0)
+        
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+        
+    except Exception as e:
+        print(f"\n❌ Error running tests: {e}")
+        sys.exit(1)
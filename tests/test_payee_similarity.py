@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for FinGuard payee similarity
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'skill', 'scripts'))
+
+import numpy as np
+from payee_similarity import PayeeSimilarity
+
+def _reference_similarity(text1, text2):
+    """The original per-call implementation from BankReconciliation"""
+    text1 = text1.lower()
+    text2 = text2.lower()
+    if text1 == text2:
+        return 1.0
+    if text1 in text2 or text2 in text1:
+        return 0.8
+    words1 = set(text1.split())
+    words2 = set(text2.split())
+    if not words1 or not words2:
+        return 0.0
+    return len(words1 & words2) / max(len(words1), len(words2))
+
+def test_scores_match_reference():
+    """Test that cached and batched scores equal the original formula"""
+    payees = ['Amazon', 'AMAZON INC', 'Amazon Web Services', 'Stripe', 'Stripe Payout',
+              'Google Ads', 'Google Cloud', 'google ads', 'Acme Supply Co', 'Supply Co Acme', '']
+    similarity = PayeeSimilarity()
+    
+    left = [a for a in payees for b in payees]
+    right = [b for a in payees for b in payees]
+    expected = np.array([_reference_similarity(a, b) for a, b in zip(left, right)])
+    
+    assert all(similarity.score(a, b) == e for a, b, e in zip(left, right, expected))
+    assert np.array_equal(similarity.score_pairs(left, right), expected)
+    
+    # Each distinct payee is tokenized once
+    assert len(similarity._tokens) == len(payees)
+    
+    # Bounded caches evict old payees without changing any score
+    bounded = PayeeSimilarity(max_cache_size=4)
+    assert np.array_equal(bounded.score_pairs(left, right), expected)
+    bounded.similar_pairs(payees)
+    assert len(bounded._tokens) <= 4 and len(bounded._signatures) <= 4
+    
+    print("✅ Similarity score test passed!")
+
+def test_lsh_blocking():
+    """Test that LSH blocking keeps similar payees and drops unrelated ones"""
+    rng = np.random.default_rng(7)
+    letters = list('abcdefghijklmnopqrstuvwxyz')
+    vendors = [''.join(rng.choice(letters, 8)) + ' ' + ''.join(rng.choice(letters, 6)) for _ in range(300)]
+    payees = vendors + ['Amazon', 'Amazon Inc', vendors[7].split()[1] + ' ' + vendors[7].split()[0], 'Zzyzx Road Diner']
+    similarity = PayeeSimilarity()
+    
+    pairs = {(payees[i], payees[j]) for i, j, _ in similarity.similar_pairs(payees, threshold=0.6)}
+    assert ('Amazon', 'Amazon Inc') in pairs
+    assert (vendors[7], payees[-2]) in pairs  # same words, reordered
+    assert not any('Zzyzx Road Diner' in pair for pair in pairs)
+    
+    # Far fewer candidates than the all-pairs comparison
+    n = len(payees)
+    assert len(similarity.lsh_candidates(payees)) < n * (n - 1) // 2 / 2
+    
+    # Two-list form pairs left positions with right positions
+    cross = similarity.similar_pairs(['Amazon Inc'], ['Stripe', 'amazon inc'])
+    assert [(i, j) for i, j, _ in cross] == [(0, 1)]
+    
+    print("✅ LSH blocking test passed!")
+
+if __name__ == '__main__':
+    print("Running FinGuard Payee Similarity Tests...\n")
+    
+    try:
+        test_scores_match_reference()
+        test_lsh_blocking()
+        
+        print("\n✅ All tests passed successfully!")
+        sys.exit(0)
+        
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+        
+    except Exception as e:
+        print(f"\n❌ Error running tests: {e}")
+        sys.exit(1)
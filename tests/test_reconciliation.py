@@ -0,0 +1,592 @@
+#!/usr/bin/env python3
+"""
+Tests for FinGuard bank reconciliation
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'skill', 'scripts'))
+
+import json
+import multiprocessing
+import tempfile
+import pandas as pd
+import pytest
+from bank_reconciliation import BankReconciliation, ReconciliationState, generate_incremental_report, match_window_days
+from duplicate_detection import DuplicateDetector
+from ledger_io import STATEMENT_COLUMNS, load_transactions
+from payout_matching import PayoutMatcher, find_subset_sum
+from streaming_reconciliation import StreamingReconciler
+import batch_reconciliation
+from batch_reconciliation import load_manifest, reconcile_batch_from_manifest, run_batch, summarize_batch
+
+def _transactions(rows):
+    return pd.DataFrame(rows, columns=['date', 'payee', 'amount']).assign(
+        date=lambda df: pd.to_datetime(df['date'])
+    )
+
+def test_exact_matches_respect_multiplicity():
+    """Test that repeated transactions pair one-to-one and inputs are untouched"""
+    statement = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-02', 'AWS', -120.00),
+        ('2024-11-03', 'Gusto', -5000.00),
+    ])
+    books = _transactions([
+        ('2024-11-01', 'STRIPE', 2450.00),
+        ('2024-11-02', 'aws', -120.00),
+        ('2024-11-04', 'Gusto', -5000.00),
+    ])
+    statement_before = statement.copy()
+    
+    reconciler = BankReconciliation()
+    matches, unmatched_stmt, unmatched_books = reconciler.find_exact_matches(statement, books)
+    
+    # Only one of the two Stripe payouts has a partner in the books
+    assert len(matches) == 2
+    assert sorted(m['payee'] for m in matches) == ['AWS', 'Stripe']
+    assert unmatched_stmt['payee'].tolist() == ['Stripe', 'Gusto']
+    assert unmatched_books['payee'].tolist() == ['Gusto']
+    
+    # Inputs are not modified
+    assert statement.equals(statement_before)
+    assert list(books.columns) == ['date', 'payee', 'amount']
+    
+    print("✅ Exact matching test passed!")
+
+def test_exact_matches_across_load_paths():
+    """Test that the match key does not depend on how each side was loaded"""
+    books = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-02', 'AWS', -120.00),
+    ])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        statement_file = os.path.join(tmp, 'statement.csv')
+        books.to_csv(statement_file, index=False)
+        loaded = load_transactions(statement_file, STATEMENT_COLUMNS, cents=True)
+        chunked = pd.concat(load_transactions(statement_file, STATEMENT_COLUMNS, chunksize=1, cents=True))
+    raw = books.assign(date=books['date'].dt.strftime('%Y-%m-%d'))
+    
+    reconciler = BankReconciliation()
+    for statement in (loaded, chunked, raw):
+        matches, unmatched_stmt, unmatched_books = reconciler.find_exact_matches(statement, books)
+        assert len(matches) == 2 and unmatched_stmt.empty and unmatched_books.empty
+    
+    print("✅ Exact matching across load paths test passed!")
+
+def test_fuzzy_tolerance_is_exact_in_cents():
+    """Test that a one-cent tolerance means exactly one cent"""
+    statement = _transactions([('2024-11-05', 'Amazon', 10.02)])
+    books = _transactions([
+        ('2024-11-06', 'Amazon Inc', 10.01),
+        ('2024-11-06', 'Amazon Inc', 10.04),
+    ])
+    
+    matches = BankReconciliation(tolerance=0.01).find_fuzzy_matches(statement, books)
+    assert [m['books_amount'] for m in matches] == [10.01]
+    
+    print("✅ Fuzzy tolerance test passed!")
+
+def test_fuzzy_candidates_sweep():
+    """Test the sorted sweep against the date window and bucket edges"""
+    statement = _transactions([
+        ('2024-11-10', 'Amazon', -89.45),
+        ('2024-11-10', 'Vercel', -120.00),
+    ]).set_index(pd.Index([101, 102]))
+    books = _transactions([
+        ('2024-11-13', 'Amazon Inc', -89.44),   # 3 days, 1 cent: candidate
+        ('2024-11-14', 'Amazon Inc', -89.45),   # 4 days: outside the window
+        ('2024-11-07', 'Vercel Inc', -120.00),  # 3 days earlier: candidate
+        ('2024-11-10', 'Vercel', -120.02),      # 2 cents: outside the tolerance
+    ]).set_index(pd.Index([7, 8, 9, 10]))
+    
+    matches = BankReconciliation().find_fuzzy_matches(statement, books, days_window=3)
+    assert [(m['statement_index'], m['books_index']) for m in matches] == [(101, 7), (102, 9)]
+    
+    print("✅ Fuzzy candidate sweep test passed!")
+
+def _candidate(stmt, book, similarity, days=0):
+    return {
+        'statement_index': stmt, 'statement_date': pd.Timestamp('2024-11-10'),
+        'books_index': book, 'books_date': pd.Timestamp('2024-11-10') + pd.Timedelta(days=days),
+        'similarity': similarity,
+    }
+
+def test_one_to_one_assignment():
+    """Test that each line gets at most one proposal"""
+    candidates = [
+        _candidate('A', 'X', 1.0),
+        _candidate('A', 'Y', 0.8),
+        _candidate('B', 'X', 0.8),
+        _candidate('C', 'Z', 0.7, days=2),
+        _candidate('C', 'W', 0.7, days=1),   # same score, closer date wins
+    ]
+    reconciler = BankReconciliation()
+    
+    greedy = reconciler.assign_matches(candidates, method='greedy')
+    assert [(m['statement_index'], m['books_index']) for m in greedy] == [('A', 'X'), ('C', 'W')]
+    
+    try:
+        BankReconciliation(assignment='random')
+        assert False, "unknown assignment method should raise"
+    except ValueError:
+        pass
+    
+    print("✅ One-to-one assignment test passed!")
+
+def test_hungarian_assignment():
+    """Test that the Hungarian method maximizes matched pairs, then score"""
+    pytest.importorskip('scipy')
+    candidates = [
+        _candidate('A', 'X', 1.0),
+        _candidate('A', 'Y', 0.8),
+        _candidate('B', 'X', 0.8),
+    ]
+    
+    optimal = BankReconciliation(assignment='hungarian').assign_matches(candidates)
+    assert [(m['statement_index'], m['books_index']) for m in optimal] == [('A', 'Y'), ('B', 'X')]
+    
+    print("✅ Hungarian assignment test passed!")
+
+def test_subset_sum_strategies():
+    """Test the subset-sum search across its strategies"""
+    # Meet-in-the-middle (small), with mixed signs for refunds and fees
+    values = [12000, -350, 4500, 999, 30000, -1200]
+    subset = find_subset_sum(values, 12000 - 350 + 4500 - 1200)
+    assert sum(values[i] for i in subset) == 14950 and len(subset) >= 2
+    assert find_subset_sum([500, 700], 500) is None  # a single entry is not a batch
+    
+    # Dynamic programming (many same-sign candidates) and pruned search (mixed signs)
+    many = [1000 + 7 * i for i in range(60)]
+    assert sum(many[i] for i in find_subset_sum(many, many[3] + many[41] + many[59])) == many[3] + many[41] + many[59]
+    mixed = many[:-1] + [-250]
+    subset = find_subset_sum(mixed, many[10] + many[20] - 250)
+    assert sum(mixed[i] for i in subset) == many[10] + many[20] - 250
+    
+    # No exact subset
+    assert find_subset_sum([1000, 2000, 4000], 3500) is None
+    
+    print("✅ Subset-sum test passed!")
+
+def test_batched_payout_report():
+    """Test that a payout deposit is matched to the book entries it covers"""
+    statement = _transactions([
+        ('2024-11-08', 'Stripe Transfer', 300.00),
+        ('2024-11-09', 'AWS', -20.00),
+    ])
+    books = _transactions([
+        ('2024-11-03', 'Stripe', 100.00),
+        ('2024-11-05', 'Stripe', 150.00),
+        ('2024-11-06', 'Stripe', 50.00),
+        ('2024-11-20', 'Stripe', 75.00),   # after the payout: not part of it
+        ('2024-11-09', 'AWS', -20.00),
+    ])
+    reconciler = BankReconciliation()
+    
+    payouts = reconciler.find_payout_matches(statement, books)
+    assert len(payouts) == 1
+    assert payouts[0]['statement_index'] == 0
+    assert payouts[0]['books_index'] == [0, 1, 2]
+    
+    report = reconciler.generate_reconciliation_report(statement, books, 280.00)
+    assert "Batched Payouts:                 1" in report
+    assert "Statement Only:                  0" in report
+    assert "Books Only:                      1" in report
+    
+    # Constituents carry customer names; withdrawals are not searched
+    statement = _transactions([
+        ('2024-11-08', 'Stripe Transfer', 300.00),
+        ('2024-11-08', 'Bill Pay', -300.00),
+    ])
+    books = _transactions([
+        ('2024-11-03', 'Acme Corp', 100.00),
+        ('2024-11-05', 'Jane Doe', 200.00),
+        ('2024-11-04', 'Rent', -100.00),
+        ('2024-11-06', 'Utilities', -200.00),
+    ])
+    matcher = PayoutMatcher()
+    payouts = matcher.find_matches(statement, books)
+    assert [(m['statement_index'], m['books_index']) for m in payouts] == [(0, [0, 1])]
+    
+    # An exhausted total budget leaves the remaining deposits unsearched
+    matcher = PayoutMatcher(total_budget=0)
+    assert matcher.find_matches(statement, books) == []
+    assert matcher.skipped == 1
+    
+    # A deposit not from a payout processor is left alone, even when some
+    # subset of the vendor lines happens to add up to it
+    vendors = _transactions([
+        (f'2024-11-{day:02d}', f'Vendor {i}', amount)
+        for i, (day, amount) in enumerate([(2, -412.17), (3, 230.00), (4, -88.40), (5, 1290.55), (6, -61.00)])
+    ])
+    wire = _transactions([('2024-11-07', 'Wire from client', 230.00 + 1290.55 - 88.40)])
+    assert PayoutMatcher().find_matches(wire, vendors) == []
+    assert len(PayoutMatcher(processors=None).find_matches(wire, vendors)) == 1
+    report = reconciler.generate_reconciliation_report(wire, vendors, 0)
+    assert "Batched Payouts:                 0" in report
+    assert "Books Only:                      5" in report
+    
+    print("✅ Batched payout test passed!")
+
+def test_result_renderers():
+    """Test that one reconciliation result renders to every format"""
+    statement = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-05', 'Amazon', -89.45),
+        ('2024-11-10', 'Upwork', -1200.00),
+    ])
+    books = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-06', 'Amazon Inc', -89.45),
+        ('2024-11-30', 'Check #1043', -350.00),
+    ])
+    reconciler = BankReconciliation()
+    result = reconciler.reconcile(statement, books, 2450.00)
+    
+    assert len(result.exact_matches) == 1 and len(result.fuzzy_matches) == 1
+    assert result.variance_cents == 0 and result.reconciled
+    assert "✅ Books are RECONCILED" in result.to_text()
+    assert result.to_text().splitlines()[5:] == reconciler.generate_reconciliation_report(statement, books, 2450.00).splitlines()[5:]
+    
+    data = json.loads(result.to_json())
+    assert data['summary']['outstanding_checks'] == -439.45
+    assert data['potential_matches'][0]['books_payee'] == 'Amazon Inc'
+    assert [item['side'] for item in data['open_items']] == ['statement', 'statement', 'books', 'books']
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        result.save(os.path.join(tmp, 'open_items.csv'))
+        open_items = pd.read_csv(os.path.join(tmp, 'open_items.csv'))
+        assert open_items['amount_cents'].tolist() == [-8945, -120000, -8945, -35000]
+        
+        try:
+            result.save(os.path.join(tmp, 'report.pdf'))
+            assert False, "unknown format should raise"
+        except ValueError:
+            pass
+        
+        pytest.importorskip('openpyxl')
+        result.save(os.path.join(tmp, 'reconciliation.xlsx'))
+        sheets = pd.read_excel(os.path.join(tmp, 'reconciliation.xlsx'), sheet_name=None)
+        assert len(sheets['Open Items']) == 4 and len(sheets['Exact Matches']) == 1
+    
+    print("✅ Result renderers test passed!")
+
+def test_incremental_reconciliation():
+    """Test that daily feeds reconcile against open items and persist"""
+    day1_statement = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-01', 'AWS', -120.00),
+        ('2024-11-02', 'Amazon', -89.45),
+    ])
+    day1_books = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-02', 'Gusto', -5000.00),   # clears the bank tomorrow
+    ])
+    day2_statement = _transactions([('2024-11-02', 'Gusto', -5000.00)])
+    day2_books = _transactions([
+        ('2024-11-01', 'AWS', -120.00),
+        ('2024-11-03', 'Amazon Inc', -89.45),
+    ])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'state.pkl')
+        reconciler = BankReconciliation()
+        
+        state = ReconciliationState(path)
+        first = reconciler.reconcile_incremental(day1_statement, day1_books, state)
+        assert first['exact_matches'] == [(0, 0)]
+        assert (first['open_statement'], first['open_books']) == (2, 1)
+        state.save()
+        
+        # A new process picks up where the last run stopped
+        state = ReconciliationState(path)
+        second = reconciler.reconcile_incremental(day2_statement, day2_books, state)
+        assert sorted(second['exact_matches']) == [(1, 2), (3, 1)]
+        assert [(m['statement_payee'], m['books_payee']) for m in second['fuzzy_matches']] == [('Amazon', 'Amazon Inc')]
+        assert (second['open_statement'], second['open_books']) == (1, 1)
+        assert state.book_balance_cents == 245000 - 500000 - 12000 - 8945
+        assert len(state.matches) == 3
+        state.save()
+        
+        # Items with a pending proposal are not proposed again
+        state = ReconciliationState(path)
+        third = reconciler.reconcile_incremental(_transactions([('2024-11-03', 'Amazon.com', -89.45)]), _transactions([]), state)
+        assert third['fuzzy_matches'] == []
+        assert state.proposed == {'statement': {2}, 'books': {3}}
+        
+        # Old open items can be expired
+        expired_stmt, expired_books = state.expire('2024-11-03')
+        assert expired_stmt['payee'].tolist() == ['Amazon']
+        assert expired_books.empty and len(state.open['books']) == 1
+        assert state.proposed == {'statement': set(), 'books': {3}}
+        
+        # Runs can expire what the match window has passed; expired book
+        # lines still count in the balance check
+        fourth = reconciler.reconcile_incremental(
+            _transactions([('2024-11-20', 'Client Corp', 5000.00)]), _transactions([]), state, expire_days=match_window_days()
+        )
+        assert fourth['expired_books']['payee'].tolist() == ['Amazon Inc']
+        assert fourth['expired_statement']['payee'].tolist() == ['Amazon.com']
+        assert (fourth['open_statement'], fourth['open_books']) == (1, 0)
+        assert state.expired_cents == {'outstanding_checks': -8945, 'deposits_in_transit': 0}
+        report = generate_incremental_report(fourth, state, 2450.00 - 120.00 - 5000.00)
+        assert 'Expired Books:                   1' in report
+        assert 'Variance:                     $        0.00' in report
+    
+    print("✅ Incremental reconciliation test passed!")
+
+def test_streaming_reconciliation():
+    """Test that small chunks give the same totals as reconciling in memory"""
+    statement = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-02', 'AWS', -120.00),
+        ('2024-11-05', 'Amazon', -89.45),
+        ('2024-11-08', 'Stripe Transfer', 300.00),
+        ('2024-11-20', 'Client Corp', 5000.00),
+        ('2024-11-28', 'Gusto', -5000.00),
+    ])
+    books = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-02', 'AWS', -120.00),
+        ('2024-11-03', 'Stripe', 100.00),
+        ('2024-11-06', 'Stripe', 200.00),
+        ('2024-11-07', 'Amazon Inc', -89.45),
+        ('2024-11-28', 'Gusto', -5000.00),
+        ('2024-11-30', 'Check #1043', -350.00),
+    ])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        statement_file = os.path.join(tmp, 'statement.csv')
+        books_file = os.path.join(tmp, 'books.csv')
+        statement.to_csv(statement_file, index=False)
+        books.to_csv(books_file, index=False)
+        
+        streamer = StreamingReconciler(chunksize=2)
+        steps = list(streamer.stream(statement_file, books_file))
+        totals = streamer.totals
+        assert len(steps) > 1
+        assert sum(len(step['exact_matches']) for step in steps) == totals['exact_matches'] == 3
+        assert totals['batched_payouts'] == 1
+        assert totals['potential_matches'] == 1
+        assert (totals['statement_only'], totals['books_only']) == (2, 2)
+        assert totals['outstanding_checks_cents'] == -35000 - 8945
+        assert totals['book_balance_cents'] == int(round(books['amount'].sum() * 100))
+        
+        # Same summary as the in-memory report
+        report = BankReconciliation().generate_reconciliation_report(statement, books, 0)
+        assert "Exact Matches:                   3" in report
+        assert "Statement Only:                  2" in report
+        assert "Books Only:                      2" in report
+        
+        # An open item is proposed once, even when candidates arrive in later steps
+        _transactions([
+            ('2024-12-01', 'Amazon', -50.00),
+            ('2024-12-05', 'Amazon', -50.00),
+        ]).to_csv(statement_file, index=False)
+        _transactions([
+            ('2024-12-03', 'Amazon Inc', -50.00),
+            ('2024-12-10', 'Gusto', -5000.00),
+        ]).to_csv(books_file, index=False)
+        totals = StreamingReconciler(chunksize=1).reconcile(statement_file, books_file)
+        assert totals['potential_matches'] == 1
+        assert (totals['statement_only'], totals['books_only']) == (2, 2)
+        
+        # Files must be in date order
+        books.iloc[::-1].to_csv(books_file, index=False)
+        try:
+            StreamingReconciler(chunksize=2).reconcile(statement_file, books_file)
+            assert False, "unsorted input should raise"
+        except ValueError:
+            pass
+    
+    print("✅ Streaming reconciliation test passed!")
+
+def test_batch_runner_isolates_failures():
+    """Test that a batch reconciles each account and reports failures per job"""
+    statement = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-02', 'AWS', -120.00),
+    ])
+    books = _transactions([
+        ('2024-11-01', 'Stripe', 2450.00),
+        ('2024-11-02', 'AWS', -120.00),
+        ('2024-11-30', 'Check #1043', -350.00),
+    ])
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        statement.to_csv(os.path.join(tmp, 'statement.csv'), index=False)
+        books.to_csv(os.path.join(tmp, 'books.csv'), index=False)
+        manifest = os.path.join(tmp, 'manifest.csv')
+        with open(manifest, 'w') as f:
+            f.write("account,statement,books,ending_balance\n")
+            f.write("Operating,statement.csv,books.csv,2330.00\n")
+            f.write("Savings,missing.csv,books.csv,100.00\n")
+            f.write("Card,statement.csv,books.csv,2000.00\n")
+        
+        jobs = load_manifest(manifest)
+        assert [job['account'] for job in jobs] == ['Operating', 'Savings', 'Card']
+        
+        results = run_batch(jobs, workers=2)
+        assert [r['account'] for r in results] == ['Operating', 'Savings', 'Card']
+        assert [r['status'] for r in results] == ['ok', 'failed', 'ok']
+        assert 'FileNotFoundError' in results[1]['error']
+        assert results[0]['exact_matches'] == 2 and results[0]['books_only'] == 1
+        assert results[0]['reconciled'] and results[2]['variance_cents'] == -33000
+        assert all(r['seconds'] >= 0 for r in results)
+        
+        summary = summarize_batch(results)
+        assert "Reconciled:                      1" in summary
+        assert "Failed:                          1" in summary
+    
+    print("✅ Batch runner test passed!")
+
+def test_batch_runner_survives_worker_crash():
+    """Test that a job killing its worker fails alone and the rest still run"""
+    if multiprocessing.get_start_method() != 'fork':
+        pytest.skip("the crashing job is patched in, which needs forked workers")
+    statement = _transactions([('2024-11-01', 'Stripe', 2450.00)])
+    
+    run_job = batch_reconciliation.run_job
+    def crash_on_card(job, reconciler=None):
+        if job['account'] == 'Card':
+            os._exit(1)
+        return run_job(job, reconciler)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        statement.to_csv(os.path.join(tmp, 'statement.csv'), index=False)
+        manifest = os.path.join(tmp, 'manifest.csv')
+        with open(manifest, 'w') as f:
+            f.write("account,statement,books,ending_balance\n")
+            for account in ['Operating', 'Card'] + [f'Store {i}' for i in range(10)]:
+                f.write(f"{account},statement.csv,statement.csv,2450.00\n")
+        
+        results_file = os.path.join(tmp, 'results.csv')
+        batch_reconciliation.run_job = crash_on_card
+        try:
+            results = reconcile_batch_from_manifest(manifest, workers=2, results_file=results_file)
+        finally:
+            batch_reconciliation.run_job = run_job
+        
+        assert [r['status'] for r in results] == ['ok', 'failed'] + ['ok'] * 10
+        assert 'BrokenProcessPool' in results[1]['error']
+        ok = [r for r in results if r['status'] == 'ok']
+        assert all(r['reconciled'] for r in ok)
+        # Only the jobs in flight were retried alone; the rest shared a fresh pool
+        assert len({r['pid'] for r in ok}) < len(ok)
+        saved = pd.read_csv(results_file)
+        assert saved['status'].tolist() == ['ok', 'failed'] + ['ok'] * 10
+        assert 'pid' not in saved.columns
+    
+    print("✅ Batch worker crash test passed!")
+
+def test_duplicate_clusters():
+    """Test that a charge posted three times across days is one cluster"""
+    df = _transactions([
+        ('2024-11-01', 'Netflix', -15.99),
+        ('2024-11-02', 'NETFLIX', -15.99),
+        ('2024-11-03', 'Netflix', -15.99),
+        ('2024-11-20', 'Netflix', -15.99),   # a month later: a new charge
+        ('2024-11-02', 'Spotify', -15.99),   # same amount, different payee
+        ('2024-11-05', 'AWS', -120.00),
+        ('2024-11-05', 'AWS', -120.01),      # different amount
+    ])
+    
+    clusters = BankReconciliation().detect_duplicates(df)
+    assert len(clusters) == 1
+    assert clusters[0]['index'] == [0, 1, 2]
+    assert clusters[0]['size'] == 3
+    assert clusters[0]['amount'] == -15.99
+    assert clusters[0]['date'] == pd.Timestamp('2024-11-01')
+    
+    # Same-day only: the chain breaks up
+    assert BankReconciliation().detect_duplicates(df, days_window=0) == []
+    
+    print("✅ Duplicate clustering test passed!")
+
+def test_duplicates_across_files():
+    """Test cross-file duplicate detection from narrow columns"""
+    with tempfile.TemporaryDirectory() as tmp:
+        october = os.path.join(tmp, 'october.csv')
+        november = os.path.join(tmp, 'november.csv')
+        with open(october, 'w') as f:
+            f.write("date,payee,description,amount\n2024-10-31,Adobe,Creative Cloud,-54.99\n2024-10-15,Gusto,Payroll,-5000\n")
+        with open(november, 'w') as f:
+            f.write("date,payee,description,amount\n2024-11-01,Adobe Inc,Creative Cloud,-54.99\n")
+        
+        clusters = DuplicateDetector().scan_files([october, november])
+        assert len(clusters) == 1
+        assert clusters[0]['sources'] == [(october, 0), (november, 0)]
+        assert clusters[0]['payees'] == ['Adobe', 'Adobe Inc']
+    
+    print("✅ Cross-file duplicate test passed!")
+
+def test_duplicate_scan_across_chunks():
+    """Test that clusters spanning chunk and file boundaries are found in a streamed scan"""
+    with tempfile.TemporaryDirectory() as tmp:
+        first = os.path.join(tmp, 'first.csv')
+        second = os.path.join(tmp, 'second.csv')
+        with open(first, 'w') as f:
+            f.write("date,payee,description,amount\n"
+                    "2024-10-01,Gusto,Payroll,-5000\n"
+                    "2024-10-02,Netflix,Plan,-15.99\n"       # chunk 1
+                    "2024-10-03,NETFLIX,Plan,-15.99\n"       # chunk 2
+                    "2024-10-30,Zoom,Meetings,-14.99\n"
+                    "2024-10-31,Adobe,Creative Cloud,-54.99\n")
+        with open(second, 'w') as f:
+            f.write("date,payee,description,amount\n"
+                    "2024-11-01,Adobe Inc,Creative Cloud,-54.99\n"
+                    "2024-11-01,Slack,Chat,-8.75\n"
+                    "2024-11-02,Adobe,Creative Cloud,-54.99\n"
+                    "2024-11-09,Netflix,Plan,-15.99\n")
+        
+        detector = DuplicateDetector(days_window=1)
+        expected = detector.scan_files([first, second], chunksize=1000)
+        for chunksize in (1, 2, 3):
+            assert detector.scan_files([first, second], chunksize=chunksize) == expected
+        
+        assert [c['index'] for c in expected] == [[1, 2], [4, 5, 7]]
+        assert expected[1]['sources'] == [(first, 4), (second, 0), (second, 2)]
+        assert expected[1]['payees'] == ['Adobe', 'Adobe Inc', 'Adobe']
+        
+        # Files out of date order cannot be scanned in one pass
+        try:
+            detector.scan_files([second, first], chunksize=2)
+            assert False, "out-of-order files should be rejected"
+        except ValueError:
+            pass
+    
+    print("✅ Streamed duplicate scan test passed!")
+
+if __name__ == '__main__':
+    print("Running FinGuard Reconciliation Tests...\n")
+    
+    try:
+        test_exact_matches_respect_multiplicity()
+        test_exact_matches_across_load_paths()
+        test_fuzzy_tolerance_is_exact_in_cents()
+        test_fuzzy_candidates_sweep()
+        test_one_to_one_assignment()
+        test_hungarian_assignment()
+        test_subset_sum_strategies()
+        test_batched_payout_report()
+        test_result_renderers()
+        test_incremental_reconciliation()
+        test_streaming_reconciliation()
+        test_batch_runner_isolates_failures()
+        test_batch_runner_survives_worker_crash()
+        test_duplicate_clusters()
+        test_duplicates_across_files()
+        test_duplicate_scan_across_chunks()
+        
+        print("\n✅ All tests passed successfully!")
+        sys.exit(0)
+    
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+    
+    except Exception as e:
+        print(f"\n❌ Error running tests: {e}")
+        sys.exit(1)
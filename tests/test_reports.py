@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Tests for FinGuard financial reports
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'skill', 'scripts'))
+
+import tempfile
+import pandas as pd
+from generate_financial_reports import FinancialReporter
+from ledger_io import REPORT_COLUMNS, HAS_PYARROW, load_transactions
+from rollup_cube import RollupCube
+
+def _ledger(rows):
+    return pd.DataFrame(rows, columns=['date', 'category', 'amount']).assign(
+        date=lambda df: pd.to_datetime(df['date'])
+    )
+
+def test_cash_flow_sections():
+    """Test cash-flow classification by chart-of-accounts section and keyword"""
+    df = _ledger([
+        ('2024-11-03', 'Sales / Service', 5000.00),
+        ('2024-11-01', 'Software & Tools', -189.23),
+        ('2024-11-05', 'Equipment Purchase', -2400.00),
+        ('2024-11-06', 'Fixed Asset Sale', 300.00),
+        ('2024-11-07', 'Loan Proceeds', 10000.00),
+        ('2024-11-08', 'Owner Equity', 2500.00),
+        ('2024-11-09', 'Uncategorized - Review Needed', -45.10),
+    ])
+    before = df.copy()
+    reporter = FinancialReporter()
+    
+    assert reporter.cash_flow_section('Payroll & Benefits') == 'Operating'
+    assert reporter.cash_flow_section('Equipment Purchase') == 'Investing'
+    assert reporter.cash_flow_section('Loan Proceeds') == 'Financing'
+    
+    report = reporter.generate_cash_flow(df, "November 2024")
+    assert "Net cash from operations   $    4,765.67" in report
+    assert "Net cash from investing    $   -2,100.00" in report
+    assert "Net cash from financing    $   12,500.00" in report
+    assert "Ending Cash Balance:        $   15,165.67" in report
+    
+    # The caller's frame is neither sorted nor given extra columns
+    assert df.equals(before)
+    
+    print("✅ Cash flow sections test passed!")
+
+def test_report_plan():
+    """Test that every report renders from one shared aggregation plan"""
+    df = _ledger([
+        ('2024-11-01', 'Sales / Service', 5000.00),
+        ('2024-11-02', 'Other Income', 120.50),
+        ('2024-11-04', 'Subcontractors', -800.00),
+        ('2024-11-09', 'Software & Tools', -189.23),
+        ('2024-11-20', 'Loan Proceeds', 3000.00),
+        ('2024-11-30', 'Uncategorized - Review Needed', -45.10),
+    ])
+    reporter = FinancialReporter()
+    plan = reporter.plan(df)
+    
+    assert plan.category_totals['Software & Tools'] == -18923
+    assert plan.section_totals['Revenue'] == 512050
+    assert plan.section_totals['Unmapped'] == 295490
+    assert plan.cash_flow_totals['Financing'] == 300000
+    assert plan.kpi_revenue == 512050
+    assert (plan.positive_sum, plan.negative_sum, plan.count) == (812050, -103433, 6)
+    assert (plan.first_date, plan.last_date) == (pd.Timestamp('2024-11-01'), pd.Timestamp('2024-11-30'))
+    
+    assert reporter.generate_profit_loss(plan, "Nov") == reporter.generate_profit_loss(df, "Nov")
+    assert reporter.generate_cash_flow(plan, "Nov") == reporter.generate_cash_flow(df, "Nov")
+    assert reporter.generate_kpis(plan) == reporter.generate_kpis(df)
+    assert "Total Revenue:              $    5,120.50" in reporter.generate_kpis(plan)
+    
+    print("✅ Report plan test passed!")
+
+def test_period_comparison():
+    """Test the category x period comparison with period and YoY changes"""
+    df = _ledger([
+        ('2023-01-10', 'Sales / Service', 1000.00),
+        ('2023-01-20', 'Software & Tools', -100.00),
+        ('2023-02-10', 'Sales / Service', 1500.00),
+        ('2023-12-05', 'Sales / Service', 2000.00),
+        ('2024-01-10', 'Sales / Service', 1200.00),
+        ('2024-01-15', 'Software & Tools', -150.00),
+        ('2024-02-01', 'Other Income', 50.00),
+    ])
+    reporter = FinancialReporter()
+    table = reporter.period_comparison(df, 'M')
+    jan, feb = pd.Period('2024-01', 'M'), pd.Period('2024-02', 'M')
+    
+    # Months without transactions are zero, not missing
+    assert table['amount'].shape == (4, 14)
+    assert table.loc['Sales / Service', ('amount', pd.Period('2023-06', 'M'))] == 0
+    assert table.loc['Sales / Service', ('change', jan)] == -800.00
+    assert table.loc['Sales / Service', ('change_pct', jan)] == -40.0
+    assert table.loc['Sales / Service', ('yoy_change', jan)] == 200.00
+    assert table.loc['Software & Tools', ('yoy_pct', jan)] == 50.0
+    assert table.loc['Other Income', ('change_pct', feb)] == 0.0
+    assert table.loc['TOTAL', ('amount', jan)] == 1050.00
+    
+    trailing = reporter.period_comparison(df, 'M', periods=2)
+    assert list(trailing['amount'].columns) == [jan, feb]
+    assert trailing.loc['Sales / Service', ('change', jan)] == -800.00
+    
+    yearly = reporter.period_comparison(df, 'Y')
+    assert yearly.loc['TOTAL', ('yoy_change', pd.Period('2024', 'Y'))] == 1100.00 - 4400.00
+    
+    # The two-month report is the same comparison, rendered
+    report = reporter.generate_monthly_comparison(
+        df[df['date'].dt.year == 2024], df[df['date'].dt.year == 2023], "2024", "2023"
+    )
+    assert "Sales / Service                     $     4,500.00 $     1,200.00 $ -3,300.00 (-73.3%)" in report
+    assert "Other Income                        $         0.00 $        50.00 $     50.00 (  0.0%)" in report
+    assert "TOTAL                               $     4,400.00 $     1,100.00 $ -3,300.00 (-75.0%)" in report
+    
+    print("✅ Period comparison test passed!")
+
+def test_chunked_reports():
+    """Test that reports aggregated chunk by chunk match the in-memory reports"""
+    df = _ledger([
+        ('2024-10-30', 'Sales / Service', 4000.00),
+        ('2024-11-01', 'Software & Tools', -189.23),
+        ('2024-11-02', 'Sales / Service', 1250.10),
+        ('2024-11-05', 'Subcontractors', -600.00),
+        ('2024-11-09', None, -45.10),
+        ('2024-11-12', 'Other Income', 80.00),
+        ('2024-12-01', 'Software & Tools', -20.00),
+    ])
+    reporter = FinancialReporter()
+    
+    def render(data):
+        return (
+            reporter.generate_profit_loss(data, "Q4") +
+            reporter.generate_cash_flow(data, "Q4") +
+            reporter.generate_kpis(data)
+        )
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ledger.csv')
+        df.to_csv(path, index=False)
+        expected = render(load_transactions(path, REPORT_COLUMNS, columns=REPORT_COLUMNS, cents=True))
+        
+        chunks = load_transactions(path, REPORT_COLUMNS, chunksize=2, columns=REPORT_COLUMNS, cents=True)
+        plan = reporter.plan_chunks(chunks)
+        assert render(plan) == expected
+        assert (plan.count, plan.first_date, plan.last_date) == (7, pd.Timestamp('2024-10-30'), pd.Timestamp('2024-12-01'))
+        assert plan.category_totals['Software & Tools'] == -20923
+        
+        if HAS_PYARROW:
+            from ledger_store import write_ledger
+            ledger = os.path.join(tmp, 'ledger')
+            write_ledger(df, ledger)
+            chunks = load_transactions(ledger, REPORT_COLUMNS, chunksize=3, columns=REPORT_COLUMNS, cents=True)
+            assert render(reporter.plan_chunks(chunks)) == expected
+    
+    print("✅ Chunked reports test passed!")
+
+def test_rollup_cube_reports():
+    """Test that reports from the cube match reports from raw transactions"""
+    df = _ledger([
+        ('2024-10-02', 'Sales / Service', 4000.00),
+        ('2024-10-15', 'Payroll & Benefits', -2500.00),
+        ('2024-10-20', 'Subcontractors', -600.00),
+        ('2024-11-01', 'Sales / Service', 5200.00),
+        ('2024-11-03', 'Software & Tools', -189.23),
+        ('2024-11-03', 'Software & Tools', -45.10),
+        ('2024-11-12', 'Other Income', 80.00),
+        ('2024-11-28', 'Equipment Purchase', -1400.00),
+        ('2024-12-01', 'Sales / Service', 900.00),
+    ])
+    reporter = FinancialReporter()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'cube.pkl')
+        cube = RollupCube(path, reporter.chart_of_accounts)
+        assert cube.update(df.iloc[:4]) == ['2024-10', '2024-11']
+        cube.save()
+        
+        # A later run adds the new rows without rescanning the old ones
+        cube = RollupCube(path, reporter.chart_of_accounts)
+        assert cube.update(df.iloc[4:]) == ['2024-11', '2024-12']
+        
+        software = cube.table().set_index(['period', 'category']).loc[('2024-11', 'Software & Tools')]
+        assert (software['sum'], software['count'], software['min'], software['max']) == (-23433, 2, -18923, -4510)
+        assert software['section'] == 'Operating Expenses'
+        
+        november = df[df['date'].dt.month == 11]
+        view = cube.view('2024-11', '2024-11')
+        assert reporter.generate_profit_loss(view, "Nov") == reporter.generate_profit_loss(november, "Nov")
+        assert reporter.generate_cash_flow(view, "Nov") == reporter.generate_cash_flow(november, "Nov")
+        assert reporter.generate_kpis(view) == reporter.generate_kpis(november)
+        assert reporter.generate_kpis(cube.view()) == reporter.generate_kpis(df)
+        
+        october = df[df['date'].dt.month == 10]
+        assert (
+            reporter.generate_monthly_comparison(view, cube.view('2024-10', '2024-10'), "Nov", "Oct") ==
+            reporter.generate_monthly_comparison(november, october, "Nov", "Oct")
+        )
+        
+        # Rows already folded in are skipped, so the whole ledger can be fed again
+        before = cube.cells.copy()
+        assert cube.update(df) == []
+        pd.testing.assert_frame_equal(cube.cells, before)
+        
+        # Rows are recognised however they were loaded (extra columns, CSV or
+        # Parquet, whole or in chunks)
+        ledger_csv = os.path.join(tmp, 'ledger.csv')
+        df.assign(payee='Vendor').to_csv(ledger_csv, index=False)
+        assert cube.update(load_transactions(ledger_csv, REPORT_COLUMNS)) == []
+        for chunk in load_transactions(ledger_csv, REPORT_COLUMNS, chunksize=4, columns=REPORT_COLUMNS, cents=True):
+            assert cube.update(chunk) == []
+        if HAS_PYARROW:
+            from ledger_store import write_ledger
+            write_ledger(df, os.path.join(tmp, 'ledger'))
+            assert cube.update(load_transactions(os.path.join(tmp, 'ledger'), REPORT_COLUMNS)) == []
+        pd.testing.assert_frame_equal(cube.cells, before)
+        
+        # A row that really occurs twice is added once more
+        october_seen = cube.seen['2024-10']
+        assert cube.update(pd.concat([df, df.iloc[[8]]])) == ['2024-12']
+        assert cube.seen['2024-10'] is october_seen   # other periods are not touched
+        assert reporter.generate_kpis(cube.view()) == reporter.generate_kpis(pd.concat([df, df.iloc[[8]]]))
+        
+        # Closed periods reject late rows instead of being recomputed
+        cube.close(['2024-10'])
+        cube.update(df.iloc[:1])
+        try:
+            cube.update(_ledger([('2024-10-30', 'Travel & Meals', -50.00)]))
+            assert False, "closed period should reject new rows"
+        except ValueError:
+            pass
+    
+    print("✅ Rollup cube test passed!")
+
+def test_rollup_cube_missing_values():
+    """Test that cube-fed reports count rows with a missing amount or date"""
+    df = _ledger([
+        ('2024-11-01', 'Sales / Service', 5200.00),
+        ('2024-11-03', 'Software & Tools', None),
+        ('2024-11-03', 'Software & Tools', -45.10),
+        (None, 'Other Income', 80.00),
+        (None, 'Software & Tools', None),
+        ('2024-12-01', 'Sales / Service', 900.00),
+    ])
+    reporter = FinancialReporter()
+    cube = RollupCube(chart_of_accounts=reporter.chart_of_accounts)
+    cube.update(df)
+    
+    kpis = reporter.generate_kpis(cube.view())
+    assert kpis == reporter.generate_kpis(df)
+    assert "Number of Transactions:                6" in kpis
+    assert reporter.generate_profit_loss(cube.view(), "All") == reporter.generate_profit_loss(df, "All")
+    assert reporter.generate_cash_flow(cube.view(), "All") == reporter.generate_cash_flow(df, "All")
+    
+    # A period range holds only the dated rows in it
+    november = df[df['date'].dt.month == 11]
+    assert reporter.generate_kpis(cube.view('2024-11', '2024-11')) == reporter.generate_kpis(november)
+    
+    print("✅ Rollup cube missing values test passed!")
+
+if __name__ == '__main__':
+    print("Running FinGuard Report Tests...\n")
+    
+    try:
+        test_cash_flow_sections()
+        test_report_plan()
+        test_period_comparison()
+        test_chunked_reports()
+        test_rollup_cube_reports()
+        test_rollup_cube_missing_values()
+        
+        print("\n✅ All tests passed successfully!")
+        sys.exit(0)
+    
+    except AssertionError as e:
+        print(f"\n❌ Test failed: {e}")
+        sys.exit(1)
+    
+    except Exception as e:
+        print(f"\n❌ Error running tests: {e}")
+        sys.exit(1)